@@ -7,7 +7,8 @@ from logging.config import fileConfig
 import os
 from sqlalchemy import engine_from_config, pool
 from alembic import context
-from database.models import Base
+from database.models import Base, init_db
+from database.group_indexes import GROUP_INDEX_NAME
 
 config = context.config
 config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
@@ -15,10 +16,15 @@ config.set_main_option("sqlalchemy.url", os.getenv("DATABASE_URL"))
 fileConfig(config.config_file_name)
 target_metadata = Base.metadata  
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # Per-group vector indexes are created at runtime, not declared on the models.
+    return not (type_ == "index" and reflected and GROUP_INDEX_NAME.match(name or ""))
+
 def run_migrations_offline():
     print(Base)
     url = config.get_main_option("sqlalchemy.url")
-    context.configure(url=url, target_metadata=target_metadata, literal_binds=True)
+    context.configure(url=url, target_metadata=target_metadata, literal_binds=True, include_object=include_object)
     with context.begin_transaction():
         context.run_migrations()
 
@@ -31,7 +37,11 @@ def run_migrations_online():
         poolclass=pool.NullPool
     )
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        # The schema has historically been created from the models; keep creating
+        # missing tables here so migrations always run against existing tables.
+        init_db(bind=connection)
+        connection.commit()
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
         with context.begin_transaction():
             context.run_migrations()
 
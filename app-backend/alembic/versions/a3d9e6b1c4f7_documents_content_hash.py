@@ -0,0 +1,37 @@
+"""documents content hash
+
+Revision ID: a3d9e6b1c4f7
+Revises: f5c81e3a6d42
+Create Date: 2026-10-18 16:02:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9e6b1c4f7'
+down_revision: Union[str, None] = 'f5c81e3a6d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash varchar(64)")
+    # Same digest as pipeline.ingest.chunk_hash: sha256 of the UTF-8 chunk text, hex encoded.
+    op.execute(
+        "UPDATE documents SET content_hash = encode(sha256(convert_to(text, 'UTF8')), 'hex') "
+        "WHERE content_hash IS NULL"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_documents_filename_id_content_hash ON documents (filename_id, content_hash)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_documents_filename_id_content_hash")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS content_hash")
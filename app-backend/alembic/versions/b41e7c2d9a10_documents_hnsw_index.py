@@ -0,0 +1,38 @@
+"""documents hnsw index
+
+Revision ID: b41e7c2d9a10
+Revises: 6ca7717f12a8
+Create Date: 2026-10-18 10:12:04.511230
+
+"""
+from typing import Sequence, Union
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b41e7c2d9a10'
+down_revision: Union[str, None] = '6ca7717f12a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Build parameters; recall/latency at query time is tuned per request with hnsw.ef_search.
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 64))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_documents_embedding_hnsw ON documents "
+        f"USING hnsw (embedding vector_cosine_ops) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_documents_group_id ON documents (group_id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_documents_group_id")
+    op.execute("DROP INDEX IF EXISTS ix_documents_embedding_hnsw")
@@ -0,0 +1,40 @@
+"""documents per-group vector indexes
+
+Revision ID: b8e2f4a7d915
+Revises: a3d9e6b1c4f7
+Create Date: 2026-10-18 17:20:48.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.group_indexes import create_group_index_sql, drop_group_index_sql
+from database.models import GROUP_VECTOR_INDEXES
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f4a7d915'
+down_revision: Union[str, None] = 'a3d9e6b1c4f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not GROUP_VECTOR_INDEXES:
+        return
+    group_ids = op.get_bind().execute(sa.text("SELECT id FROM groups ORDER BY id")).scalars().all()
+    # CONCURRENTLY keeps documents writable while existing groups are indexed; it cannot run in a transaction.
+    with op.get_context().autocommit_block():
+        for group_id in group_ids:
+            op.execute(create_group_index_sql(group_id))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    group_ids = op.get_bind().execute(sa.text("SELECT id FROM groups ORDER BY id")).scalars().all()
+    with op.get_context().autocommit_block():
+        for group_id in group_ids:
+            op.execute(drop_group_index_sql(group_id))
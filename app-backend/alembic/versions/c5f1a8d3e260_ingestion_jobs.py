@@ -0,0 +1,58 @@
+"""ingestion jobs
+
+Revision ID: c5f1a8d3e260
+Revises: b8e2f4a7d915
+Create Date: 2026-10-18 19:41:05.362817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5f1a8d3e260'
+down_revision: Union[str, None] = 'b8e2f4a7d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingestion_jobs (
+            id SERIAL PRIMARY KEY,
+            status varchar(16) NOT NULL DEFAULT 'queued',
+            group_id integer NOT NULL REFERENCES groups (id),
+            user_id integer REFERENCES users (id),
+            sha256 varchar(64) NOT NULL,
+            filename varchar NOT NULL,
+            content_type varchar,
+            description text,
+            file_id integer REFERENCES files (id),
+            pages_total integer,
+            pages_done integer NOT NULL DEFAULT 0,
+            chunks_done integer NOT NULL DEFAULT 0,
+            attempts integer NOT NULL DEFAULT 0,
+            cancel_requested boolean NOT NULL DEFAULT false,
+            error text,
+            worker_id varchar,
+            created_at timestamptz DEFAULT now(),
+            started_at timestamptz,
+            heartbeat_at timestamptz,
+            finished_at timestamptz
+        )
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_id ON ingestion_jobs (id)")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_queued ON ingestion_jobs (id) WHERE status = 'queued'")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_running_group_id ON ingestion_jobs (group_id) WHERE status = 'running'"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TABLE IF EXISTS ingestion_jobs")
@@ -0,0 +1,28 @@
+"""groups content version
+
+Revision ID: d2b7c9e4f18a
+Revises: c5f1a8d3e260
+Create Date: 2026-10-19 10:12:37.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2b7c9e4f18a'
+down_revision: Union[str, None] = 'c5f1a8d3e260'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE groups ADD COLUMN IF NOT EXISTS content_version integer NOT NULL DEFAULT 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE groups DROP COLUMN IF EXISTS content_version")
@@ -0,0 +1,33 @@
+"""documents text search
+
+Revision ID: d7a24f6c3e81
+Revises: b41e7c2d9a10
+Create Date: 2026-10-18 11:03:47.208915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a24f6c3e81'
+down_revision: Union[str, None] = 'b41e7c2d9a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS text_search tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(text, ''))) STORED"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_documents_text_search ON documents USING gin (text_search)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_documents_text_search")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS text_search")
@@ -0,0 +1,60 @@
+"""files blob store
+
+Revision ID: e93b5a1f0c27
+Revises: d7a24f6c3e81
+Create Date: 2026-10-18 13:26:51.904417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from core.storage.blob_store import get_blob_store
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e93b5a1f0c27'
+down_revision: Union[str, None] = 'd7a24f6c3e81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # init_db() (create_all) runs first, so on a fresh database these columns already exist.
+    op.execute("ALTER TABLE files ADD COLUMN IF NOT EXISTS sha256 varchar(64)")
+    op.execute("ALTER TABLE files ADD COLUMN IF NOT EXISTS size bigint")
+
+    # Move existing payloads into the blob store one row at a time.
+    conn = op.get_bind()
+    store = get_blob_store()
+    file_ids = conn.execute(sa.text("SELECT id FROM files WHERE sha256 IS NULL ORDER BY id")).scalars().all()
+    for file_id in file_ids:
+        data = conn.execute(sa.text("SELECT data FROM files WHERE id = :id"), {"id": file_id}).scalar_one()
+        blob = store.put(bytes(data))
+        conn.execute(
+            sa.text("UPDATE files SET sha256 = :sha256, size = :size WHERE id = :id"),
+            {"sha256": blob.sha256, "size": blob.size, "id": file_id},
+        )
+
+    op.alter_column('files', 'sha256', nullable=False)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_files_sha256 ON files (sha256)")
+    op.execute("ALTER TABLE files DROP COLUMN IF EXISTS data")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE files ADD COLUMN IF NOT EXISTS data bytea")
+
+    conn = op.get_bind()
+    store = get_blob_store()
+    rows = conn.execute(sa.text("SELECT id, sha256 FROM files ORDER BY id")).all()
+    for file_id, sha256 in rows:
+        with store.open(sha256) as f:
+            conn.execute(sa.text("UPDATE files SET data = :data WHERE id = :id"), {"data": f.read(), "id": file_id})
+
+    op.alter_column('files', 'data', nullable=False)
+    op.execute("DROP INDEX IF EXISTS ix_files_sha256")
+    op.execute("ALTER TABLE files DROP COLUMN IF EXISTS size")
+    op.execute("ALTER TABLE files DROP COLUMN IF EXISTS sha256")
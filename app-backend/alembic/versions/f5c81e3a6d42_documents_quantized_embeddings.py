@@ -0,0 +1,44 @@
+"""documents quantized embeddings
+
+Revision ID: f5c81e3a6d42
+Revises: e93b5a1f0c27
+Create Date: 2026-10-18 14:41:09.377512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from database.models import EMBEDDING_STORAGE, EMBEDDING_STORAGE_INDEXES, HNSW_M, HNSW_EF_CONSTRUCTION
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c81e3a6d42'
+down_revision: Union[str, None] = 'e93b5a1f0c27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep a single ANN index, over the configured storage mode, so only that one has to fit in RAM.
+    # The quantized modes index a cast of `embedding`, so no quantized copy is stored per row.
+    for storage, (name, expression, ops) in EMBEDDING_STORAGE_INDEXES.items():
+        if storage == EMBEDDING_STORAGE:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_documents_{name}_hnsw ON documents USING hnsw ({expression} {ops}) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+            )
+        else:
+            op.execute(f"DROP INDEX IF EXISTS ix_documents_{name}_hnsw")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_documents_embedding_hnsw ON documents USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+    )
+    op.execute("DROP INDEX IF EXISTS ix_documents_embedding_bit_hnsw")
+    op.execute("DROP INDEX IF EXISTS ix_documents_embedding_half_hnsw")
@@ -0,0 +1,132 @@
+"""
+Auth path benchmark: login (bcrypt) and authenticated request throughput, before and after.
+
+"before" verifies passwords in the shared threadpool and decodes the JWT on every request;
+"after" uses the bounded bcrypt process pool and the validated-token cache.
+While logins are running, a cheap endpoint is polled to show how much the burst delays other traffic.
+
+    python -m benchmarks.auth_bench --logins 200 --requests 5000 --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("API_SECRET", "benchmark-secret")
+
+import httpx
+import numpy as np
+from fastapi import Depends, FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from core.settings import token
+from core.settings.token import TokenData, get_current_user
+from routes.user_auth import utils
+
+PASSWORD = "correct horse battery staple"
+
+
+def build_app(hashed: str, mode: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "before":
+            valid = await run_in_threadpool(utils.verify_password, PASSWORD, hashed)
+        else:
+            try:
+                valid = await utils.verify_password_async(PASSWORD, hashed)
+            except utils.PasswordHashingBusy:
+                raise HTTPException(status_code=503)
+        if not valid:
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.get("/me")
+    async def me(user: TokenData = Depends(get_current_user)):
+        return {"user_id": user.user_id}
+
+    @app.get("/ping")
+    async def ping():
+        return {}
+
+    return app
+
+
+async def drive(client: httpx.AsyncClient, method: str, url: str, total: int, concurrency: int, headers=None) -> dict:
+    latencies = []
+    statuses = {}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.request(method, url, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    return {
+        "requests": total,
+        "per_second": round(total / elapsed, 1),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "statuses": statuses,
+    }
+
+
+async def run_mode(mode: str, hashed: str, access_token: str, args) -> dict:
+    token._token_cache.clear()
+    token.TOKEN_CACHE_SIZE = 0 if mode == "before" else int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+
+    app = build_app(hashed, mode)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        if mode == "after":
+            # Start the worker processes outside the measured window.
+            await utils.verify_password_async(PASSWORD, hashed)
+
+        stop = asyncio.Event()
+        ping_latencies = []
+
+        async def poll_ping():
+            while not stop.is_set():
+                started = time.perf_counter()
+                await client.get("/ping")
+                ping_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.01)
+
+        poller = asyncio.create_task(poll_ping())
+        login = await drive(client, "POST", "/login", args.logins, args.concurrency)
+        stop.set()
+        await poller
+        login["ping_during_burst_p95_ms"] = round(float(np.percentile(ping_latencies, 95)), 2) if ping_latencies else None
+
+        headers = {"Authorization": f"Bearer {access_token}"}
+        authenticated = await drive(client, "GET", "/me", args.requests, args.concurrency, headers=headers)
+
+    return {"login": login, "authenticated": authenticated}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    hashed = utils.hash_password(PASSWORD)
+    access_token = token.create_access_token({"sub": "bench", "user_id": "1"})
+
+    results = {}
+    for mode in ("before", "after"):
+        results[mode] = asyncio.run(run_mode(mode, hashed, access_token, args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Synthetic document corpus for retrieval benchmarks.
+
+Rows are written into the real `documents` table under dedicated `bench-<tag>-*` groups and
+files, so run benchmarks against a scratch database. Embeddings are drawn around random cluster
+centres and normalized, which gives ANN indexes realistic structure unlike uniform noise.
+"""
+from typing import List, Tuple
+import hashlib
+import io
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+DIM = 1024
+
+
+class SyntheticCorpus:
+    def __init__(self, engine, rows: int, groups: int = 1, dim: int = DIM, clusters: int = 256, noise: float = 0.35, seed: int = 0, tag: str = "corpus"):
+        self.engine = engine
+        self.rows = rows
+        self.groups = groups
+        self.dim = dim
+        self.noise = noise
+        self.tag = tag
+        self.rng = np.random.default_rng(seed)
+        self.centers = self._normalize(self.rng.standard_normal((clusters, dim)).astype(np.float32))
+        self.group_ids: List[int] = []
+        self.file_ids: List[int] = []
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def sample(self, n: int) -> np.ndarray:
+        centers = self.centers[self.rng.integers(0, len(self.centers), n)]
+        noise = self.rng.standard_normal((n, self.dim)).astype(np.float32) * (self.noise / np.sqrt(self.dim))
+        return self._normalize(centers + noise)
+
+    def seed(self, batch_size: int = 5000) -> float:
+        """Create groups/files and COPY `rows` documents; returns the load time in seconds."""
+        started = time.perf_counter()
+        with self.engine.begin() as conn:
+            for i in range(self.groups):
+                name = f"bench-{self.tag}-{i}"
+                self.group_ids.append(conn.execute(
+                    text("INSERT INTO groups (name, is_active) VALUES (:name, true) RETURNING id"), {"name": name}
+                ).scalar_one())
+                self.file_ids.append(conn.execute(
+                    text("INSERT INTO files (filename, sha256, size) VALUES (:name, :sha256, 0) RETURNING id"),
+                    {"name": name, "sha256": hashlib.sha256(name.encode()).hexdigest()},
+                ).scalar_one())
+
+        vector_format = "[" + ",".join(["%.6f"] * self.dim) + "]"
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for offset in range(0, self.rows, batch_size):
+                count = min(batch_size, self.rows - offset)
+                embeddings = self.sample(count)
+                buffer = io.StringIO()
+                for i, embedding in enumerate(embeddings, start=offset):
+                    group = i % self.groups
+                    vector = vector_format % tuple(embedding)
+                    buffer.write(f"synthetic chunk {i}\t{vector}\t{self.group_ids[group]}\t{self.file_ids[group]}\n")
+                buffer.seek(0)
+                cursor.copy_expert("COPY documents (text, embedding, group_id, filename_id) FROM STDIN", buffer)
+            raw.commit()
+        finally:
+            raw.close()
+
+        with self.engine.begin() as conn:
+            conn.execute(text("ANALYZE documents"))
+        return time.perf_counter() - started
+
+    def queries(self, n: int) -> List[Tuple[np.ndarray, int]]:
+        """Query vectors from the corpus distribution, each paired with a group to filter on."""
+        groups = self.rng.integers(0, self.groups, n)
+        return [(embedding, self.group_ids[g]) for embedding, g in zip(self.sample(n), groups)]
+
+    def drop(self) -> None:
+        with self.engine.begin() as conn:
+            conn.execute(text("DELETE FROM documents WHERE group_id = ANY(:ids)"), {"ids": self.group_ids})
+            conn.execute(text("DELETE FROM files WHERE id = ANY(:ids)"), {"ids": self.file_ids})
+            conn.execute(text("DELETE FROM groups WHERE id = ANY(:ids)"), {"ids": self.group_ids})
+
+
+def run_query(conn, stmt, settings: dict) -> Tuple[List[int], float]:
+    """Run a search statement with transaction-local settings; returns the ids and the elapsed seconds."""
+    with conn.begin():
+        for name, value in settings.items():
+            conn.execute(text("SELECT set_config(:name, :value, true)"), {"name": name, "value": str(value)})
+        started = time.perf_counter()
+        ids = [row.id for row in conn.execute(stmt)]
+        return ids, time.perf_counter() - started
+
+
+def percentile_ms(seconds: List[float], q: float) -> float:
+    return round(float(np.percentile(np.array(seconds) * 1000, q)), 3) if seconds else 0.0
+
+
+def recall(found: List[int], expected: List[int]) -> float:
+    return len(set(found) & set(expected)) / len(expected) if expected else 1.0
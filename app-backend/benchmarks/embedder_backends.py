@@ -0,0 +1,84 @@
+"""
+Parity and throughput of the PyTorch and ONNX Runtime (fp32 / int8) embedder backends.
+
+Every ONNX variant must reach a minimum cosine similarity with the PyTorch embedding of each
+text; the script exits non-zero when a variant falls below its threshold.
+
+    EMBEDDING_MODEL=sdadas/mmlw-retrieval-roberta-large-v2 python -m benchmarks.embedder_backends --texts corpus.txt
+"""
+import argparse
+import json
+import sys
+import time
+
+import numpy as np
+
+from core.models.embedder import SentenceTransformerEmbedder
+from core.models.onnx_embedder import OnnxEmbedder
+
+SAMPLE_TEXTS = [
+    "zapytanie: Jak złożyć wniosek o urlop wypoczynkowy?",
+    "Pracownik składa wniosek urlopowy w systemie kadrowym najpóźniej 7 dni przed planowanym terminem.",
+    "zapytanie: Jaki jest numer części zaworu bezpieczeństwa VB-2041?",
+    "Zawór bezpieczeństwa VB-2041 należy wymieniać co 24 miesiące lub po 10 000 cykli pracy.",
+    "Regulamin pracy zdalnej określa zasady zwrotu kosztów energii elektrycznej i internetu.",
+    "W przypadku awarii serwera należy niezwłocznie powiadomić dział IT pod numerem wewnętrznym 112.",
+]
+
+
+def throughput(embedder, texts, batch_size: int, repeats: int) -> float:
+    embedder.embed(texts[:batch_size])
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for offset in range(0, len(texts), batch_size):
+            embedder.embed(texts[offset:offset + batch_size])
+    return len(texts) * repeats / (time.perf_counter() - started)
+
+
+def cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--texts", help="file with one text per line (defaults to a small built-in sample)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--fp32-threshold", type=float, default=0.999)
+    parser.add_argument("--int8-threshold", type=float, default=0.98)
+    args = parser.parse_args()
+
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = SAMPLE_TEXTS * 16
+
+    reference = SentenceTransformerEmbedder()
+    expected = np.asarray(reference.embed(texts))
+    report = {"texts": len(texts), "batch_size": args.batch_size, "backends": {
+        "torch": {"texts_per_second": round(throughput(reference, texts, args.batch_size, args.repeats), 1)},
+    }}
+
+    passed = True
+    for quantize, threshold in (("none", args.fp32_threshold), ("int8", args.int8_threshold)):
+        embedder = OnnxEmbedder(quantize=quantize)
+        similarity = cosine(np.asarray(embedder.embed(texts)), expected)
+        ok = bool(similarity.min() >= threshold)
+        passed &= ok
+        report["backends"][f"onnx-{quantize}"] = {
+            "texts_per_second": round(throughput(embedder, texts, args.batch_size, args.repeats), 1),
+            "cosine_min": round(float(similarity.min()), 5),
+            "cosine_mean": round(float(similarity.mean()), 5),
+            "threshold": threshold,
+            "parity": ok,
+        }
+
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Recall@k versus latency across pgvector index configurations and corpus sizes.
+
+For every scale a synthetic multi-tenant corpus is seeded, then each variant is built on
+`documents.embedding` on its own: no index (exact search, used as ground truth), IVFFlat with
+each `--ivfflat-lists` and HNSW with each `--hnsw` m:ef_construction pair. Every index is queried
+at each probes / ef_search setting with the same group-filtered queries the API runs.
+The default HNSW index is dropped for the duration of the run and rebuilt afterwards, so
+use a scratch database:
+
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.index_sweep \\
+        --scales 10000,100000,1000000 --groups 200 --json sweep.json --csv sweep.csv
+"""
+from typing import List
+import argparse
+import csv
+import json
+import time
+
+import numpy as np
+from sqlalchemy import Index, text
+
+from benchmarks.corpus import SyntheticCorpus, percentile_ms, recall, run_query
+from database.models import Document, engine, vector_index
+from routes.agent.rag import vector_search_statement
+
+FIELDS = ["rows", "groups", "index", "params", "search_setting", "build_seconds", "index_bytes", "recall", "p50_ms", "p99_ms"]
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def index_variants(args) -> list:
+    variants = []
+    for lists in args.ivfflat_lists:
+        variants.append((
+            "ivfflat",
+            {"lists": lists},
+            Index(f"bench_documents_embedding_ivfflat_{lists}", Document.embedding, postgresql_using="ivfflat",
+                  postgresql_with={"lists": lists}, postgresql_ops={"embedding": "vector_cosine_ops"}),
+            [("ivfflat.probes", probes) for probes in args.ivfflat_probes if probes <= lists],
+        ))
+    for pair in args.hnsw:
+        m, ef_construction = (int(v) for v in pair.split(":"))
+        variants.append((
+            "hnsw",
+            {"m": m, "ef_construction": ef_construction},
+            Index(f"bench_documents_embedding_hnsw_{m}_{ef_construction}", Document.embedding, postgresql_using="hnsw",
+                  postgresql_with={"m": m, "ef_construction": ef_construction}, postgresql_ops={"embedding": "vector_cosine_ops"}),
+            [("hnsw.ef_search", ef_search) for ef_search in args.ef_search],
+        ))
+    return variants
+
+
+def measure(conn, queries, top_k: int, settings: dict, expected=None):
+    latencies, found = [], []
+    for embedding, group_id in queries:
+        ids, seconds = run_query(conn, vector_search_statement(embedding, [group_id], top_k, "float32"), settings)
+        latencies.append(seconds)
+        found.append(ids)
+    recalls = [recall(ids, truth) for ids, truth in zip(found, expected)] if expected is not None else [1.0]
+    return found, round(float(np.mean(recalls)), 4), percentile_ms(latencies, 50), percentile_ms(latencies, 99)
+
+
+def run_scale(rows: int, args) -> List[dict]:
+    corpus = SyntheticCorpus(engine, rows, groups=args.groups, tag=f"sweep-{rows}", seed=args.seed)
+    load_seconds = corpus.seed()
+    print(f"Seeded {rows} rows in {load_seconds:.1f} s")
+    base = {"rows": rows, "groups": args.groups}
+    results = []
+    try:
+        with engine.connect() as conn:
+            conn.commit()
+            queries = corpus.queries(args.queries)
+            expected, score, p50, p99 = measure(conn, queries, args.top_k, {})
+            results.append({**base, "index": "none", "params": "", "search_setting": "", "build_seconds": 0.0,
+                            "index_bytes": 0, "recall": score, "p50_ms": p50, "p99_ms": p99})
+
+            for kind, params, index, settings in index_variants(args):
+                conn.execute(text("SELECT set_config('maintenance_work_mem', :value, false)"), {"value": args.maintenance_work_mem})
+                started = time.perf_counter()
+                index.create(conn)
+                conn.commit()
+                build_seconds = round(time.perf_counter() - started, 2)
+                size = conn.execute(text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": index.name}).scalar()
+                try:
+                    for name, value in settings:
+                        _, score, p50, p99 = measure(conn, queries, args.top_k, {name: value}, expected)
+                        results.append({**base, "index": kind, "params": json.dumps(params), "search_setting": f"{name}={value}",
+                                        "build_seconds": build_seconds, "index_bytes": size, "recall": score, "p50_ms": p50, "p99_ms": p99})
+                        print(f"{rows} rows {kind} {params} {name}={value}: recall {score}, p50 {p50} ms")
+                finally:
+                    index.drop(conn)
+                    conn.commit()
+    finally:
+        corpus.drop()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int_list, default=[10000, 100000, 1000000])
+    parser.add_argument("--groups", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ivfflat-lists", type=int_list, default=[100, 1000])
+    parser.add_argument("--ivfflat-probes", type=int_list, default=[1, 10, 40])
+    parser.add_argument("--hnsw", type=lambda v: v.split(","), default=["16:64", "32:128"], help="comma-separated m:ef_construction pairs")
+    parser.add_argument("--ef-search", type=int_list, default=[40, 100, 200])
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write the results as JSON to this file")
+    parser.add_argument("--csv", help="write the results as CSV to this file")
+    args = parser.parse_args()
+
+    default_index = vector_index("float32")
+    with engine.connect() as conn:
+        had_default = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default_index.name}).scalar()
+        if had_default:
+            default_index.drop(conn)
+            conn.commit()
+
+    results = []
+    try:
+        for rows in args.scales:
+            results.extend(run_scale(rows, args))
+    finally:
+        if had_default:
+            with engine.connect() as conn:
+                default_index.create(conn)
+                conn.commit()
+
+    report = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"), "top_k": args.top_k, "queries": args.queries, "results": results}
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
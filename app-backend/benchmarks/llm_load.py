@@ -0,0 +1,151 @@
+"""
+Load test of the streaming /llm/response endpoint against the local stub provider.
+
+Starts the stub (benchmarks.llm_stub) and the response router on their own uvicorn threads, then
+streams `--requests` prompts through `--concurrency` clients. Reports time to first chunk,
+inter-chunk gaps, throughput and how late the app's event loop wakes up while under load.
+
+    python -m benchmarks.llm_load --concurrency 100 --requests 500 --tokens-per-second 80 --jitter-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("API_KEY", "stub")
+os.environ.setdefault("API_SECRET", "benchmark-secret")
+# Only imported, never connected to: load-test prompts carry no group_id, so nothing is retrieved.
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://benchmark@localhost/benchmark")
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+
+from benchmarks.corpus import percentile_ms
+from benchmarks.llm_stub import BackgroundServer, add_stub_arguments, build_stub_app, stub_config_from_args
+
+
+class LoopLagMonitor:
+    """Sleeps `interval` seconds in a loop and records how late each wake-up is."""
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+def build_app(monitor: LoopLagMonitor) -> FastAPI:
+    # Imported after LLM_URL points at the stub.
+    from core.models.llm_wrapper import close_async_llm_client
+    from routes.agent.response import response_router
+
+    app = FastAPI()
+    app.include_router(response_router)
+    app.router.on_startup.append(monitor.start)
+    app.router.on_shutdown.append(monitor.stop)
+    app.router.on_shutdown.append(close_async_llm_client)
+    return app
+
+
+async def stream_one(client: httpx.AsyncClient, prompt: str) -> dict:
+    started = time.perf_counter()
+    arrivals = []
+    async with client.stream("POST", "/llm/response", json={"prompt": prompt, "use_cache": False}) as response:
+        async for line in response.aiter_lines():
+            if line:
+                arrivals.append(time.perf_counter())
+        status = response.status_code
+    return {"status": status, "started": started, "arrivals": arrivals, "finished": time.perf_counter()}
+
+
+async def drive(base_url: str, requests: int, concurrency: int, monitor: LoopLagMonitor) -> dict:
+    results = []
+    remaining = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        # The first request creates the LLM client; keep that one-off cost out of the numbers.
+        await stream_one(client, "warm-up")
+        monitor.lags.clear()
+
+        async def worker():
+            for i in remaining:
+                try:
+                    results.append(await stream_one(client, f"benchmark prompt {i}"))
+                except httpx.HTTPError as e:
+                    results.append({"status": type(e).__name__, "arrivals": []})
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r["status"] == 200 and r["arrivals"]]
+    first_chunk = [r["arrivals"][0] - r["started"] for r in ok]
+    gaps = [gap for r in ok for gap in np.diff(r["arrivals"])]
+    durations = [r["finished"] - r["started"] for r in ok]
+    chunks = sum(len(r["arrivals"]) for r in results)
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "statuses": statuses,
+        "elapsed_seconds": round(elapsed, 2),
+        "requests_per_second": round(len(ok) / elapsed, 2),
+        "chunks_per_second": round(chunks / elapsed, 1),
+        "time_to_first_chunk_ms": {q: percentile_ms(first_chunk, q) for q in (50, 95, 99)},
+        "inter_chunk_ms": {q: percentile_ms(gaps, q) for q in (50, 95, 99)} | {"max": percentile_ms(gaps, 100)},
+        "request_duration_ms": {q: percentile_ms(durations, q) for q in (50, 95, 99)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--lag-interval-ms", type=float, default=10.0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    config = stub_config_from_args(args)
+    monitor = LoopLagMonitor(args.lag_interval_ms / 1000)
+    with BackgroundServer(build_stub_app(config)) as stub:
+        os.environ["LLM_URL"] = f"{stub.url}/v1"
+        with BackgroundServer(build_app(monitor)) as app:
+            report = asyncio.run(drive(app.url, args.requests, args.concurrency, monitor))
+        report["stub"] = {
+            "tokens": config.tokens,
+            "reasoning_tokens": config.reasoning_tokens,
+            "tokens_per_second": config.tokens_per_second,
+            "first_token_ms": config.first_token_ms,
+            "jitter_ms": config.jitter_ms,
+            "upstream_requests": stub.server.config.app.state.requests - 1,
+        }
+
+    report["event_loop_lag_ms"] = {q: percentile_ms(monitor.lags, q) for q in (50, 95, 99)} | {"max": percentile_ms(monitor.lags, 100)}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
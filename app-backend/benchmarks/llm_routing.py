@@ -0,0 +1,124 @@
+"""
+Time to first token of the LLM router (core.models.llm_router) against local stub providers.
+
+Starts three stubs (benchmarks.llm_stub): a fast "primary" with occasional slow first tokens, a
+steady but slower "secondary" and a "flaky" one failing `--flaky-error-rate` of its requests.
+The same prompts are streamed through:
+
+  single    the primary only, as with one LLM_URL
+  router    all three by weight, retrying failures before the first token
+  hedged    as router, plus a second request after `--hedge-after-ms` without a first chunk
+
+    python -m benchmarks.llm_routing --requests 300 --concurrency 20 --tail-rate 0.1 --tail-ms 2000
+"""
+from contextlib import ExitStack
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("API_KEY", "stub")
+
+from prometheus_client import REGISTRY
+
+from benchmarks.corpus import percentile_ms
+from benchmarks.llm_stub import BackgroundServer, StubConfig, build_stub_app
+from core.models.llm_router import LLMRouter
+
+
+def counter(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def drive(router: LLMRouter, requests: int, concurrency: int) -> dict:
+    ttft, errors = [], {}
+    remaining = iter(range(requests))
+
+    async def worker():
+        for i in remaining:
+            started = time.perf_counter()
+            first = None
+            try:
+                async for _ in router.stream_generate("stub", f"benchmark prompt {i}"):
+                    if first is None:
+                        first = time.perf_counter() - started
+            except Exception as e:
+                errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                continue
+            if first is not None:
+                ttft.append(first)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    await router.aclose()
+    return {
+        "ok": len(ttft),
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 2),
+        "ttft_ms": {q: percentile_ms(ttft, q) for q in (50, 95, 99)} | {"max": percentile_ms(ttft, 100)},
+        "breakers": {endpoint.name: endpoint.breaker.state for endpoint in router.endpoints},
+    }
+
+
+def run_mode(name: str, endpoints: list, stubs: dict, args, hedge_after_ms: float = 0) -> dict:
+    before = {stub: server.server.config.app.state.requests for stub, server in stubs.items()}
+    hedges, retries = counter("kb_llm_hedges_total"), counter("kb_llm_retries_total")
+    router = LLMRouter(endpoints, hedge_after_ms=hedge_after_ms, max_attempts=args.max_attempts, seed=args.seed)
+    report = asyncio.run(drive(router, args.requests, args.concurrency))
+    report["upstream_requests"] = {stub: server.server.config.app.state.requests - before[stub] for stub, server in stubs.items()}
+    report["hedges"] = int(counter("kb_llm_hedges_total") - hedges)
+    report["retries"] = int(counter("kb_llm_retries_total") - retries)
+    print(f"{name}: TTFT p50 {report['ttft_ms'][50]} ms, p99 {report['ttft_ms'][99]} ms, errors {report['errors']}")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--first-token-ms", type=float, default=100.0, help="primary stub")
+    parser.add_argument("--tail-rate", type=float, default=0.1, help="primary stub")
+    parser.add_argument("--tail-ms", type=float, default=2000.0, help="primary stub")
+    parser.add_argument("--secondary-first-token-ms", type=float, default=250.0)
+    parser.add_argument("--flaky-error-rate", type=float, default=0.5)
+    parser.add_argument("--hedge-after-ms", type=float, default=400.0)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    configs = {
+        "primary": StubConfig(args.tokens, tokens_per_second=1000, first_token_ms=args.first_token_ms,
+                              tail_rate=args.tail_rate, tail_ms=args.tail_ms, seed=args.seed),
+        "secondary": StubConfig(args.tokens, tokens_per_second=1000, first_token_ms=args.secondary_first_token_ms, seed=args.seed),
+        "flaky": StubConfig(args.tokens, tokens_per_second=1000, first_token_ms=args.first_token_ms,
+                            error_rate=args.flaky_error_rate, seed=args.seed),
+    }
+    with ExitStack() as stack:
+        servers = {name: stack.enter_context(BackgroundServer(build_stub_app(config))) for name, config in configs.items()}
+
+        def endpoint(name: str, weight: float) -> dict:
+            return {"name": name, "url": f"{servers[name].url}/v1", "api_key": "stub", "weight": weight}
+
+        everything = [endpoint("primary", 3), endpoint("secondary", 1), endpoint("flaky", 1)]
+        report = {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "hedge_after_ms": args.hedge_after_ms,
+            "single": run_mode("single", [endpoint("primary", 1)], servers, args),
+            "router": run_mode("router", everything, servers, args),
+            "hedged": run_mode("hedged", everything, servers, args, args.hedge_after_ms),
+        }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+OpenAI-compatible stub completion server for load tests.
+
+Streams `tokens` content chunks (optionally preceded by `reasoning_tokens` reasoning chunks) at
+`tokens_per_second`, after `first_token_ms`, with up to `jitter_ms` of random extra delay per
+chunk. Point the backend at it with LLM_URL=http://127.0.0.1:<port>/v1.
+
+    python -m benchmarks.llm_stub --port 9100 --tokens-per-second 50 --reasoning-tokens 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class StubConfig:
+    def __init__(
+        self,
+        tokens: int = 200,
+        reasoning_tokens: int = 0,
+        tokens_per_second: float = 50.0,
+        first_token_ms: float = 200.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        tail_rate: float = 0.0,
+        tail_ms: float = 0.0,
+        seed: int = None,
+    ):
+        self.tokens = tokens
+        self.reasoning_tokens = reasoning_tokens
+        self.tokens_per_second = tokens_per_second
+        self.first_token_ms = first_token_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # Share of requests whose first token takes `tail_ms` longer (provider tail latency).
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+        self.rng = random.Random(seed)
+
+    def delay(self, base_seconds: float) -> float:
+        return base_seconds + self.rng.uniform(0, self.jitter_ms) / 1000
+
+
+def _chunk(completion_id: str, model: str, delta: dict, finish_reason: str = None) -> str:
+    event = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(event)}\n\n"
+
+
+def build_stub_app(config: StubConfig) -> FastAPI:
+    app = FastAPI(title="LLM stub")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        app.state.requests += 1
+
+        if config.rng.random() < config.error_rate:
+            return JSONResponse({"error": {"message": "stub overloaded", "type": "server_error"}}, status_code=503)
+
+        if not body.get("stream"):
+            await asyncio.sleep(config.delay(config.first_token_ms / 1000 + config.tokens / config.tokens_per_second))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "token " * config.tokens}, "finish_reason": "stop"}],
+            }
+
+        first_token_ms = config.first_token_ms + (config.tail_ms if config.rng.random() < config.tail_rate else 0.0)
+
+        async def stream():
+            await asyncio.sleep(config.delay(first_token_ms / 1000))
+            yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+            for i in range(config.reasoning_tokens):
+                yield _chunk(completion_id, model, {"reasoning": f"think{i} "})
+                await asyncio.sleep(config.delay(1 / config.tokens_per_second))
+            for i in range(config.tokens):
+                yield _chunk(completion_id, model, {"content": f"token{i} "})
+                await asyncio.sleep(config.delay(1 / config.tokens_per_second))
+            yield _chunk(completion_id, model, {}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+class BackgroundServer:
+    """
+    Uvicorn server running on its own thread and event loop, so it does not compete with the
+    code under test for the caller's loop.
+    """
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--reasoning-tokens", type=int, default=0)
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--first-token-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--tail-rate", type=float, default=0.0)
+    parser.add_argument("--tail-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int)
+
+
+def stub_config_from_args(args) -> StubConfig:
+    return StubConfig(
+        tokens=args.tokens,
+        reasoning_tokens=args.reasoning_tokens,
+        tokens_per_second=args.tokens_per_second,
+        first_token_ms=args.first_token_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        tail_rate=args.tail_rate,
+        tail_ms=args.tail_ms,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(build_stub_app(stub_config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
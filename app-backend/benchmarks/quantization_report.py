@@ -0,0 +1,96 @@
+"""
+Recall and latency of the float32, halfvec and binary (+ re-rank) embedding storage modes.
+
+Seeds a synthetic corpus, builds an HNSW index for every storage mode, and compares each mode's
+top-k against exact float32 search (sequential scan). Index sizes are reported as well.
+Run it against a scratch database:
+
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.quantization_report --rows 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from benchmarks.corpus import SyntheticCorpus, percentile_ms, recall, run_query
+from database.models import Document, engine, vector_index, EMBEDDING_STORAGE, EMBEDDING_STORAGE_INDEXES
+from routes.agent.rag import vector_search_statement, BINARY_OVERFETCH
+
+MODES = ("float32", "halfvec", "binary")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=100)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    corpus = SyntheticCorpus(engine, args.rows, tag="quantization")
+    report = {"rows": args.rows, "top_k": args.top_k, "ef_search": args.ef_search, "load_seconds": round(corpus.seed(), 2), "modes": {}}
+    created = []
+    try:
+        with engine.connect() as conn:
+            conn.commit()
+            for mode in MODES:
+                # The configured mode's index is already part of Document's table; the others are attached to it.
+                index = next((i for i in Document.__table__.indexes if i.name == vector_index(mode).name), None)
+                index = index if index is not None else vector_index(mode, Document.__table__)
+                exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": index.name}).scalar()
+                if not exists:
+                    started = time.perf_counter()
+                    index.create(conn)
+                    conn.commit()
+                    created.append(index)
+                    report["modes"][mode] = {"build_seconds": round(time.perf_counter() - started, 2)}
+                else:
+                    report["modes"][mode] = {}
+                report["modes"][mode]["index_bytes"] = conn.execute(
+                    text("SELECT pg_relation_size(CAST(:name AS regclass))"), {"name": index.name}
+                ).scalar()
+            conn.commit()
+
+            queries = corpus.queries(args.queries)
+            exact_settings = {"enable_indexscan": "off", "enable_bitmapscan": "off"}
+            exact_latency, expected = [], []
+            for embedding, group_id in queries:
+                ids, seconds = run_query(conn, vector_search_statement(embedding, [group_id], args.top_k, "float32"), exact_settings)
+                expected.append(ids)
+                exact_latency.append(seconds)
+            report["exact"] = {"p50_ms": percentile_ms(exact_latency, 50), "p99_ms": percentile_ms(exact_latency, 99)}
+
+            for mode in MODES:
+                candidates = args.top_k * BINARY_OVERFETCH if mode == "binary" else args.top_k
+                settings = {"hnsw.ef_search": max(args.ef_search, candidates)}
+                latencies, recalls = [], []
+                for (embedding, group_id), truth in zip(queries, expected):
+                    ids, seconds = run_query(conn, vector_search_statement(embedding, [group_id], args.top_k, mode), settings)
+                    latencies.append(seconds)
+                    recalls.append(recall(ids, truth))
+                report["modes"][mode].update({
+                    "expression": EMBEDDING_STORAGE_INDEXES[mode][1],
+                    f"recall@{args.top_k}": round(float(np.mean(recalls)), 4),
+                    "p50_ms": percentile_ms(latencies, 50),
+                    "p99_ms": percentile_ms(latencies, 99),
+                })
+    finally:
+        with engine.connect() as conn:
+            for index in created:
+                if index.name != vector_index(EMBEDDING_STORAGE).name:
+                    index.drop(conn)
+            conn.commit()
+        corpus.drop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Group-filtered top-k latency and recall as the number of groups grows: global vs per-group HNSW.
+
+For each `--groups` count a corpus of `--rows-per-group` rows per group is seeded, and the same
+single-group queries run against the global HNSW index only and then against per-group partial
+indexes (database.group_indexes). With a global graph, a selective filter has to be post-filtered
+(recall drops as groups grow); with per-group graphs latency and recall should stay flat.
+Use a scratch database:
+
+    DATABASE_URL=postgresql+psycopg2://... python -m benchmarks.tenant_scaling --groups 10,100,1000 --rows-per-group 1000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from benchmarks.corpus import SyntheticCorpus, percentile_ms, recall, run_query
+from benchmarks.index_sweep import int_list
+from database.group_indexes import create_group_index_sql, drop_group_index_sql
+from database.models import engine, vector_index, EMBEDDING_STORAGE
+from routes.agent.rag import vector_search_statement
+
+
+def measure(conn, queries, top_k: int, settings: dict, expected=None) -> dict:
+    latencies, found = [], []
+    for embedding, group_id in queries:
+        ids, seconds = run_query(conn, vector_search_statement(embedding, [group_id], top_k, EMBEDDING_STORAGE), settings)
+        latencies.append(seconds)
+        found.append(ids)
+    result = {"p50_ms": percentile_ms(latencies, 50), "p99_ms": percentile_ms(latencies, 99), "found": found}
+    if expected is not None:
+        result[f"recall@{top_k}"] = round(float(np.mean([recall(ids, truth) for ids, truth in zip(found, expected)])), 4)
+    return result
+
+
+def run_groups(groups: int, args) -> dict:
+    corpus = SyntheticCorpus(engine, groups * args.rows_per_group, groups=groups, tag=f"tenants-{groups}", seed=args.seed)
+    report = {"groups": groups, "rows": corpus.rows, "load_seconds": round(corpus.seed(), 2)}
+    ann_settings = {"hnsw.ef_search": args.ef_search}
+    try:
+        # Index DDL runs in autocommit; queries need transactions for their set_config(..., true) settings.
+        with engine.connect() as conn, engine.connect().execution_options(isolation_level="AUTOCOMMIT") as ddl:
+            # Indexes the ORM hooks may have built for the corpus groups are measured separately below.
+            for group_id in corpus.group_ids:
+                ddl.execute(text(drop_group_index_sql(group_id)))
+
+            queries = corpus.queries(args.queries)
+            exact = measure(conn, queries, args.top_k, {"enable_indexscan": "off", "enable_bitmapscan": "off"})
+            expected = exact.pop("found")
+            report["exact"] = exact
+
+            global_index = measure(conn, queries, args.top_k, ann_settings, expected)
+            global_index.pop("found")
+            report["global"] = global_index
+
+            started = time.perf_counter()
+            for group_id in corpus.group_ids:
+                ddl.execute(text(create_group_index_sql(group_id, concurrently=False)))
+            ddl.execute(text("ANALYZE documents"))
+            per_group = measure(conn, queries, args.top_k, ann_settings, expected)
+            per_group.pop("found")
+            per_group["build_seconds"] = round(time.perf_counter() - started, 2)
+            report["per_group"] = per_group
+    finally:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            for group_id in corpus.group_ids:
+                conn.execute(text(drop_group_index_sql(group_id)))
+        corpus.drop()
+    print(f"{groups} groups: global p50 {report['global']['p50_ms']} ms, per-group p50 {report['per_group']['p50_ms']} ms")
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int_list, default=[10, 100, 1000])
+    parser.add_argument("--rows-per-group", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": vector_index(EMBEDDING_STORAGE).name}).scalar():
+            raise SystemExit("The global vector index is missing; run the migrations first.")
+
+    report = {"storage": EMBEDDING_STORAGE, "top_k": args.top_k, "ef_search": args.ef_search,
+              "runs": [run_groups(groups, args) for groups in args.groups]}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from typing import List, Optional, Union
+import numpy as np
+import asyncio
+import logging
+import time
+import os
+
+from core.models.embedder import get_embedder
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+_batching_instance = None
+
+
+class BatchStats:
+    """
+    Running statistics of the micro-batching embedder.
+    Keeps totals plus a window of recent queue waits for percentiles.
+    """
+    def __init__(self, window: int = 1024):
+        self.batches = 0
+        self.items = 0
+        self.max_batch_size = 0
+        self.encode_seconds = 0.0
+        self.queue_waits = deque(maxlen=window)
+
+    def record(self, batch_size: int, waits: List[float], encode_seconds: float) -> None:
+        self.batches += 1
+        self.items += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.encode_seconds += encode_seconds
+        self.queue_waits.extend(waits)
+
+    def snapshot(self) -> dict:
+        waits = np.fromiter(self.queue_waits, dtype=np.float64) * 1000
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "avg_encode_ms": self.encode_seconds * 1000 / self.batches if self.batches else 0.0,
+            "queue_wait_ms": {
+                "avg": float(waits.mean()) if waits.size else 0.0,
+                "p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                "p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                "max": float(waits.max()) if waits.size else 0.0,
+            },
+        }
+
+
+class BatchingEmbedder:
+    """
+    Async front-end for the sentence embedder.
+    Concurrent callers are queued and coalesced into batches of up to `max_batch_size`
+    texts, waiting at most `max_wait_ms` for a batch to fill. Batches are encoded in
+    a dedicated single-thread executor so the event loop is never blocked.
+    """
+    def __init__(self, embedder=None, max_batch_size: int = None, max_wait_ms: float = None, max_queue: int = None):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBED_MAX_BATCH_SIZE", 32))
+        if max_wait_ms is None:
+            max_wait_ms = float(os.getenv("EMBED_MAX_WAIT_MS", 5))
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("EMBED_MAX_QUEUE", 0))
+        self.stats = BatchStats()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_started(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.cancel()
+
+    async def embed(self, texts: Union[str, List[str]]) -> np.ndarray:
+        """
+        Embed text(s) without blocking the event loop.
+        Returns a single vector for str input and a 2-D array for a list.
+        """
+        single_input = isinstance(texts, str)
+        items = [texts] if single_input else list(texts)
+        if not items:
+            return np.empty((0, 0), dtype=np.float32)
+
+        self._ensure_started()
+        loop = asyncio.get_running_loop()
+        with span("embed", texts=len(items)):
+            futures = []
+            for text in items:
+                future = loop.create_future()
+                await self._queue.put((text, future, time.perf_counter()))
+                futures.append(future)
+
+            rows = await asyncio.gather(*futures)
+        return rows[0] if single_input else np.stack(rows)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        if self.embedder is None:
+            self.embedder = get_embedder()
+        return np.asarray(self.embedder.embed(texts))
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return [item for item in batch if not item[1].done()]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            waits = [started - enqueued for _, _, enqueued in batch]
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self._encode, [text for text, _, _ in batch])
+            except Exception as e:
+                logger.exception(f"Error during batched embedding: {e}")
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.stats.record(len(batch), waits, time.perf_counter() - started)
+            for (_, future, _), row in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(row)
+
+
+def get_batching_embedder() -> BatchingEmbedder:
+    global _batching_instance
+    if _batching_instance is None:
+        _batching_instance = BatchingEmbedder()
+    return _batching_instance
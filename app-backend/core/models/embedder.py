@@ -1,9 +1,11 @@
 from typing import List, Union
-from sentence_transformers import SentenceTransformer
 import numpy as np
 import logging
 import os
 
+from core.models.embedding_cache import CachedEmbedder
+from core.tracing import span
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 _embedder_instance = None
@@ -13,8 +15,10 @@ class SentenceTransformerEmbedder:
     def __init__(self, model_name: str = None):
         try:
             self.model_name = model_name or os.environ['EMBEDDING_MODEL']
-            logger.info(f"Loading embedding model: {model_name}")
-            self.model = SentenceTransformer(model_name)
+            logger.info(f"Loading embedding model: {self.model_name}")
+            # Imported here: torch/transformers take seconds to import and are only needed once the model loads.
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name)
             logger.info("Embedding model loaded successfully")
         except Exception as e:
             logger.exception(f"Error during embedding model initialization: {e}")
@@ -25,18 +29,44 @@ class SentenceTransformerEmbedder:
             texts = [texts]
             single_input = True
         else:
-            single_input = False,
+            single_input = False
             
         try:
             logger.debug("Embeddings generation --- ")
-            embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+            with span("embed_encode", texts=len(texts)):
+                embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
             return embeddings[0] if single_input else embeddings
         except Exception as e:
             logger.exception(f"Error during generation: {e}")
             raise
 
-def get_embedder() -> SentenceTransformerEmbedder:
+def load_local_embedder() -> Union[SentenceTransformerEmbedder, CachedEmbedder]:
+    """
+    Load the model in this process, wrapped in the content-hash cache unless EMBEDDING_CACHE=0.
+    EMBEDDING_BACKEND=onnx selects the ONNX Runtime backend instead of PyTorch.
+    """
+    if os.getenv("EMBEDDING_BACKEND", "torch") == "onnx":
+        from core.models.onnx_embedder import OnnxEmbedder
+        embedder = OnnxEmbedder()
+    else:
+        embedder = SentenceTransformerEmbedder()
+    if os.getenv("EMBEDDING_CACHE", "1") != "0":
+        embedder = CachedEmbedder(embedder)
+    return embedder
+
+
+def get_embedder():
+    """
+    Shared embedder instance.
+    With EMBEDDING_SERVER_SOCKET set this is a client of the shared embedding server
+    (core.models.embedding_server), which falls back to loading the model in-process.
+    """
     global _embedder_instance
     if _embedder_instance is None:
-        _embedder_instance = SentenceTransformerEmbedder()
-    return _embedder_instance
\ No newline at end of file
+        socket_path = os.getenv("EMBEDDING_SERVER_SOCKET")
+        if socket_path:
+            from core.models.embedding_server import EmbeddingClient
+            _embedder_instance = EmbeddingClient(socket_path, fallback=load_local_embedder)
+        else:
+            _embedder_instance = load_local_embedder()
+    return _embedder_instance
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+from pathlib import Path
+import numpy as np
+import unicodedata
+import threading
+import hashlib
+import logging
+import fcntl
+import json
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+KEY_SIZE = hashlib.sha256().digest_size
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize text and collapse whitespace so trivially different inputs share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model_name: str, text: str) -> bytes:
+    return hashlib.sha256(f"{model_name}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+
+class LRUCache:
+    """
+    Bounded in-memory mapping evicting the least recently used entry.
+    """
+    def __init__(self, max_items: int):
+        self.max_items = max_items
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value) -> None:
+        if self.max_items <= 0:
+            return
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DiskEmbeddingStore:
+    """
+    Persistent, append-only embedding tier.
+    Vectors live in a raw memory-mapped array file and their keys in a parallel file of
+    fixed-size digests, so the index is rebuilt on start-up by reading keys only.
+    Appends are serialized with an exclusive file lock so several workers can share a directory.
+    """
+    def __init__(self, directory: Union[str, Path], dtype: str = "float32"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+
+        # Every file is per dtype: rows of one dtype's vectors file only line up with its own keys.
+        self._keys_path = self.directory / f"keys.{self.dtype.name}.bin"
+        self._vectors_path = self.directory / f"vectors.{self.dtype.name}.bin"
+        self._meta_path = self.directory / f"meta.{self.dtype.name}.json"
+        self._lock_path = self.directory / ".lock"
+        self._index: Dict[bytes, int] = {}
+        self._keys_read = 0
+        self._vectors: Optional[np.memmap] = None
+
+        if self._meta_path.exists():
+            meta = json.loads(self._meta_path.read_text())
+            if meta.get("dtype", self.dtype.name) != self.dtype.name:
+                raise ValueError(f"{self._meta_path} describes a {meta['dtype']} cache, not {self.dtype.name}")
+            self.dim = meta["dim"]
+            self._refresh()
+
+    def __len__(self):
+        return len(self._index)
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def _complete_rows(self) -> int:
+        keys = self._keys_path.stat().st_size // KEY_SIZE if self._keys_path.exists() else 0
+        rows = self._vectors_path.stat().st_size // self._row_bytes() if self._vectors_path.exists() else 0
+        return min(keys, rows)
+
+    def _refresh(self) -> None:
+        """Index keys appended since the last read, including those written by other processes."""
+        rows = self._complete_rows()
+        if rows <= self._keys_read:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_read * KEY_SIZE)
+            data = f.read((rows - self._keys_read) * KEY_SIZE)
+        for i in range(0, len(data), KEY_SIZE):
+            self._index[data[i:i + KEY_SIZE]] = self._keys_read + i // KEY_SIZE
+        self._keys_read = rows
+        self._vectors = np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        row = self._index.get(key)
+        if row is None and self.dim is not None:
+            self._refresh()
+            row = self._index.get(key)
+        if row is None:
+            return None
+        return np.array(self._vectors[row], dtype=np.float32)
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        if not keys:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._meta_path.write_text(json.dumps({"dim": self.dim, "dtype": self.dtype.name}))
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self.dim}")
+
+        with open(self._lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Drop a partially written tail left behind by a crashed writer.
+            rows = self._complete_rows()
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(rows * self._row_bytes())
+                f.write(vectors.tobytes())
+            with open(self._keys_path, "ab") as f:
+                f.truncate(rows * KEY_SIZE)
+                f.write(b"".join(keys))
+        self._refresh()
+
+
+class CachedEmbedder:
+    """
+    Embedder wrapper caching vectors by (model_name, normalized text) hash.
+    Lookups go to a bounded in-memory LRU first, then to the optional on-disk tier;
+    only misses reach the wrapped model, in a single batch.
+    """
+    def __init__(self, embedder, memory_items: int = None, disk_dir: str = None, disk_dtype: str = None):
+        self.embedder = embedder
+        self.model_name = getattr(embedder, "cache_namespace", embedder.model_name)
+        self.memory = LRUCache(memory_items if memory_items is not None else int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 10000)))
+
+        disk_dir = disk_dir if disk_dir is not None else os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+        self.disk = None
+        if disk_dir:
+            model_dir = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)
+            self.disk = DiskEmbeddingStore(Path(disk_dir) / model_dir, disk_dtype or os.getenv("EMBEDDING_CACHE_DTYPE", "float32"))
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.hits_memory += 1
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get(key)
+            if vector is not None:
+                self.hits_disk += 1
+                self.memory.put(key, vector)
+                return vector
+        return None
+
+    def embed(self, texts: Union[str, List[str]]) -> Union[np.ndarray, List[np.ndarray]]:
+        single_input = isinstance(texts, str)
+        items = [texts] if single_input else list(texts)
+        keys = [cache_key(self.model_name, text) for text in items]
+
+        results: List[Optional[np.ndarray]] = [None] * len(items)
+        missing: Dict[bytes, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._lookup(key)
+                if vector is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    results[i] = vector
+
+        if missing:
+            miss_keys = list(missing)
+            embeddings = np.asarray(self.embedder.embed([items[missing[key][0]] for key in miss_keys]), dtype=np.float32)
+            with self._lock:
+                self.misses += len(miss_keys)
+                for key, vector in zip(miss_keys, embeddings):
+                    self.memory.put(key, vector)
+                    for i in missing[key]:
+                        results[i] = vector
+                if self.disk is not None:
+                    try:
+                        self.disk.put_many(miss_keys, embeddings)
+                    except OSError as e:
+                        logger.warning(f"Could not persist embeddings to disk cache: {e}")
+
+        if single_input:
+            return results[0]
+        return np.stack(results) if results else np.empty((0, 0), dtype=np.float32)
+
+    def cache_stats(self) -> dict:
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        return {
+            "hits_memory": self.hits_memory,
+            "hits_disk": self.hits_disk,
+            "misses": self.misses,
+            "hit_rate": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+            "memory_items": len(self.memory),
+            "disk_items": len(self.disk) if self.disk is not None else 0,
+        }
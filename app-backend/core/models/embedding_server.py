@@ -0,0 +1,304 @@
+"""
+Local embedding server shared by all uvicorn workers.
+
+One process owns the model (and the embedding cache) and listens on a Unix socket; workers talk
+to it through EmbeddingClient, whose embed() has the same signature as the in-process embedders.
+Requests from every connection go through one BatchingEmbedder, so workers' texts are encoded
+together.
+
+Framing (network byte order, no JSON):
+    request:  u32 count, then count x (u32 length, UTF-8 bytes); count 0 is a ping
+    response: u8 status, u32 rows, u32 dim, then rows x dim little-endian float32
+              on error status is 1 and `dim` is the length of the UTF-8 message that follows
+
+    EMBEDDING_SERVER_SOCKET=/tmp/kb-embedder.sock python -m core.models.embedding_server
+"""
+from typing import Callable, List, Optional, Set, Union
+import numpy as np
+import threading
+import asyncio
+import logging
+import socket
+import signal
+import struct
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+COUNT = struct.Struct("!I")
+RESPONSE = struct.Struct("!BII")
+STATUS_OK = 0
+STATUS_ERROR = 1
+WIRE_DTYPE = np.dtype("<f4")
+MAX_TEXTS = int(os.getenv("EMBEDDING_SERVER_MAX_TEXTS", 4096))
+MAX_TEXT_BYTES = int(os.getenv("EMBEDDING_SERVER_MAX_TEXT_BYTES", 1 << 20))
+# While on the in-process fallback, ping the server after this long, doubling up to the maximum.
+PROBE_SECONDS = float(os.getenv("EMBEDDING_SERVER_PROBE_SECONDS", 5))
+PROBE_MAX_SECONDS = float(os.getenv("EMBEDDING_SERVER_PROBE_MAX_SECONDS", 300))
+# The server is not running (no socket file, nobody listening); other socket errors are transient.
+UNAVAILABLE_ERRORS = (FileNotFoundError, ConnectionRefusedError)
+
+
+def encode_request(texts: List[str]) -> bytes:
+    parts = [COUNT.pack(len(texts))]
+    for text in texts:
+        data = text.encode("utf-8")
+        parts.append(COUNT.pack(len(data)))
+        parts.append(data)
+    return b"".join(parts)
+
+
+def encode_response(embeddings: np.ndarray) -> bytes:
+    embeddings = np.ascontiguousarray(embeddings, dtype=WIRE_DTYPE)
+    rows, dim = embeddings.shape if embeddings.size else (0, 0)
+    return RESPONSE.pack(STATUS_OK, rows, dim) + embeddings.tobytes()
+
+
+def encode_error(message: str) -> bytes:
+    data = message.encode("utf-8")
+    return RESPONSE.pack(STATUS_ERROR, 0, len(data)) + data
+
+
+class EmbeddingServer:
+    """
+    asyncio Unix-socket server answering embedding requests from a shared BatchingEmbedder.
+    """
+    def __init__(self, socket_path: str, batching=None):
+        self.socket_path = socket_path
+        self.batching = batching
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._ready: Optional[asyncio.Future] = None
+
+    async def start(self) -> None:
+        """Listen right away; requests wait until the model has loaded, pings are answered at once."""
+        await self._remove_stale_socket()
+        loop = asyncio.get_running_loop()
+        if self.batching is None:
+            from core.models.batching import BatchingEmbedder
+            from core.models.embedder import load_local_embedder
+            self.batching = BatchingEmbedder(embedder=None)
+            self._ready = loop.run_in_executor(None, load_local_embedder)
+        else:
+            self._ready = loop.create_future()
+            self._ready.set_result(self.batching.embedder)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Embedding server listening on {self.socket_path}")
+
+    async def _remove_stale_socket(self) -> None:
+        """Unlink a socket left behind by a dead server; refuse to take over one that still answers."""
+        try:
+            _, writer = await asyncio.open_unix_connection(self.socket_path)
+        except UNAVAILABLE_ERRORS:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            return
+        writer.close()
+        raise RuntimeError(f"Another embedding server is already listening on {self.socket_path}")
+
+    async def _embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=WIRE_DTYPE)
+        self.batching.embedder = await asyncio.shield(self._ready)
+        return await self.batching.embed(texts)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batching.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _read_texts(self, reader: asyncio.StreamReader) -> List[str]:
+        (count,) = COUNT.unpack(await reader.readexactly(COUNT.size))
+        if count > MAX_TEXTS:
+            raise ValueError(f"Too many texts in one request: {count} > {MAX_TEXTS}")
+        texts = []
+        for _ in range(count):
+            (length,) = COUNT.unpack(await reader.readexactly(COUNT.size))
+            if length > MAX_TEXT_BYTES:
+                raise ValueError(f"Text too long: {length} bytes > {MAX_TEXT_BYTES}")
+            texts.append((await reader.readexactly(length)).decode("utf-8"))
+        return texts
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    texts = await self._read_texts(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                except ValueError as e:
+                    # The rest of the frame cannot be trusted, so answer and drop the connection.
+                    writer.write(encode_error(str(e)))
+                    await writer.drain()
+                    break
+
+                try:
+                    embeddings = await self._embed(texts)
+                    writer.write(encode_response(embeddings))
+                except Exception as e:
+                    logger.exception(f"Error during embedding request: {e}")
+                    writer.write(encode_error(str(e)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class EmbeddingClient:
+    """
+    Thin blocking client of the embedding server with the embedder `embed()` signature.
+    Each thread keeps its own connection; a request that fails on a dropped or timed-out
+    connection is retried once on a new one. When the server is not running the client loads
+    the model in-process and uses it meanwhile, pinging the server with a growing backoff and
+    releasing the local model once it answers again.
+    """
+    def __init__(self, socket_path: str, fallback: Callable = None, timeout: float = None,
+                 probe_seconds: float = PROBE_SECONDS, probe_max_seconds: float = PROBE_MAX_SECONDS):
+        self.socket_path = socket_path
+        self.model_name = os.getenv("EMBEDDING_MODEL")
+        self.timeout = timeout if timeout is not None else float(os.getenv("EMBEDDING_SERVER_TIMEOUT_SECONDS", 120))
+        self.probe_seconds = probe_seconds
+        self.probe_max_seconds = probe_max_seconds
+        self._fallback_factory = fallback
+        self._fallback = None
+        self._fallback_lock = threading.Lock()
+        self._probe_interval = probe_seconds
+        self._next_probe = 0.0
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+
+    def _disconnect(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            n = sock.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Embedding server closed the connection")
+            received += n
+        return bytes(buffer)
+
+    def _request(self, texts: List[str]) -> np.ndarray:
+        sock = self._connect()
+        try:
+            sock.sendall(encode_request(texts))
+            status, rows, dim = RESPONSE.unpack(self._recv_exactly(sock, RESPONSE.size))
+            if status != STATUS_OK:
+                raise RuntimeError(f"Embedding server error: {self._recv_exactly(sock, dim).decode('utf-8')}")
+            data = self._recv_exactly(sock, rows * dim * WIRE_DTYPE.itemsize)
+        except OSError:
+            self._disconnect()
+            raise
+        return np.frombuffer(data, dtype=WIRE_DTYPE).reshape(rows, dim).astype(np.float32)
+
+    def _request_retrying(self, texts: List[str]) -> np.ndarray:
+        try:
+            return self._request(texts)
+        except UNAVAILABLE_ERRORS:
+            raise
+        except OSError as e:
+            # Reset, broken pipe or timeout, e.g. a kept-alive connection to a restarted server.
+            logger.warning(f"Embedding server request failed ({e!r}), retrying on a new connection")
+            return self._request(texts)
+
+    def ping(self) -> bool:
+        try:
+            self._request([])
+            return True
+        except OSError:
+            return False
+
+    def _fallback_embedder(self):
+        with self._fallback_lock:
+            if self._fallback is None:
+                logger.warning(f"Embedding server at {self.socket_path} is unavailable, loading the model in-process")
+                self._fallback = self._fallback_factory()
+                self._probe_interval = self.probe_seconds
+                self._next_probe = time.monotonic() + self._probe_interval
+        return self._fallback
+
+    def _probe(self) -> bool:
+        """
+        On the fallback, whether to use the server again: pings it when the backoff has elapsed
+        (one thread at a time) and releases the in-process model when it answers.
+        """
+        with self._fallback_lock:
+            if self._fallback is None:
+                return True
+            now = time.monotonic()
+            if now < self._next_probe:
+                return False
+            # Claim this probe: other threads keep using the fallback until it is over.
+            self._next_probe = now + self._probe_interval
+        if not self.ping():
+            with self._fallback_lock:
+                self._probe_interval = min(self._probe_interval * 2, self.probe_max_seconds)
+                self._next_probe = time.monotonic() + self._probe_interval
+            return False
+        with self._fallback_lock:
+            if self._fallback is not None:
+                logger.info(f"Embedding server at {self.socket_path} is back, releasing the in-process model")
+                self._fallback = None
+        return True
+
+    def embed(self, texts: Union[str, List[str]]) -> Union[np.ndarray, List[np.ndarray]]:
+        single_input = isinstance(texts, str)
+        items = [texts] if single_input else list(texts)
+        fallback = self._fallback
+        if fallback is not None and not self._probe():
+            return fallback.embed(texts)
+        try:
+            embeddings = self._request_retrying(items)
+        except UNAVAILABLE_ERRORS:
+            if self._fallback_factory is None:
+                raise
+            return self._fallback_embedder().embed(texts)
+        return embeddings[0] if single_input else embeddings
+
+
+async def serve(socket_path: str) -> None:
+    server = EmbeddingServer(socket_path)
+    await server.start()
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(os.getenv("EMBEDDING_SERVER_SOCKET", "/tmp/kb-embedder.sock")))
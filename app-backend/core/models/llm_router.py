@@ -0,0 +1,326 @@
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import random
+import json
+import time
+import os
+
+from core.models.llm_wrapper import _delta_chunks
+from core.tracing import (
+    span, record_llm_stream,
+    LLM_ENDPOINT_TTFT, LLM_ENDPOINT_ATTEMPTS, LLM_HEDGES, LLM_RETRIES, LLM_BREAKER_STATE,
+)
+
+logger = logging.getLogger(__name__)
+
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", 3))
+LLM_RETRY_BASE_MS = float(os.getenv("LLM_RETRY_BASE_MS", 100))
+LLM_RETRY_MAX_MS = float(os.getenv("LLM_RETRY_MAX_MS", 2000))
+# Start a second upstream request when the first chunk has not arrived after this long; 0 disables.
+LLM_HEDGE_AFTER_MS = float(os.getenv("LLM_HEDGE_AFTER_MS", 0))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", 30))
+
+# Rate limits, timeouts and server errors are worth another endpoint; other 4xx would fail anywhere.
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class NoEndpointAvailable(RuntimeError):
+    """Raised when the circuit breakers of all endpoints are open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    After `failures` failures in a row the endpoint is skipped for `cooldown` seconds, then one
+    probe request is let through (half-open): success closes the breaker, failure opens it again.
+    """
+    CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+    def __init__(self, name: str, failures: int = LLM_BREAKER_FAILURES, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.name = name
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+        self._set_state(self.CLOSED)
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        LLM_BREAKER_STATE.labels(self.name).set((self.CLOSED, self.HALF_OPEN, self.OPEN).index(state))
+
+    def available(self) -> bool:
+        """Whether a request may be sent now; doesn't reserve the half-open probe."""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self._set_state(self.HALF_OPEN)
+        return self.state == self.CLOSED or (self.state == self.HALF_OPEN and not self.probing)
+
+    def acquire(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self.probing = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.probing = False
+        if self.state != self.CLOSED:
+            logger.info(f"LLM endpoint {self.name} recovered")
+            self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probing = False
+        if self.state == self.HALF_OPEN or self.failures >= self.max_failures:
+            if self.state != self.OPEN:
+                logger.warning(f"LLM endpoint {self.name} unavailable for {self.cooldown}s after {self.failures} failures")
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """The probe ended without a verdict (e.g. it lost a hedge race)."""
+        self.probing = False
+
+
+class LLMEndpoint:
+    """
+    One OpenAI-compatible upstream. `model` replaces the requested model name when the provider
+    names the same model differently.
+    """
+    def __init__(self, name: str, base_url: str, api_key: str, http_client, weight: float = 1.0, model: str = None):
+        from openai import AsyncOpenAI
+        self.name = name
+        self.weight = weight
+        self.model = model
+        # Retries are the router's job, across endpoints.
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+        self.breaker = CircuitBreaker(name)
+
+    def __repr__(self):
+        return f"<LLMEndpoint {self.name}: weight {self.weight}, breaker {self.breaker.state}>"
+
+
+def load_endpoint_config() -> List[dict]:
+    """
+    LLM_ENDPOINTS as a JSON list of {"name", "url", "api_key" or "api_key_env", "weight", "model"};
+    without it, the single LLM_URL / API_KEY endpoint.
+    """
+    raw = os.getenv("LLM_ENDPOINTS")
+    if not raw:
+        return [{"name": "default", "url": os.getenv("LLM_URL"), "api_key": os.getenv("API_KEY")}]
+    config = json.loads(raw)
+    for i, endpoint in enumerate(config):
+        endpoint.setdefault("name", f"endpoint{i}")
+        if "api_key" not in endpoint:
+            endpoint["api_key"] = os.getenv(endpoint.get("api_key_env", "API_KEY"))
+    return config
+
+
+def is_retryable(error: BaseException) -> bool:
+    import openai
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    return status is not None and (status in RETRYABLE_STATUS or status >= 500)
+
+
+class _Attempt:
+    """
+    One upstream streaming request, opened until its first content chunk.
+    """
+    def __init__(self, endpoint: LLMEndpoint, model: str, messages: list, hedge: bool):
+        self.endpoint = endpoint
+        self.model = endpoint.model or model
+        self.messages = messages
+        self.hedge = hedge
+        self.started = time.perf_counter()
+        self.stream = None
+        self.events = None
+
+    async def first_chunks(self) -> List[dict]:
+        self.stream = await self.endpoint.client.chat.completions.create(model=self.model, messages=self.messages, stream=True)
+        self.events = self.stream.__aiter__()
+        async for event in self.events:
+            chunks = list(_delta_chunks(event))
+            if chunks:
+                LLM_ENDPOINT_TTFT.labels(self.endpoint.name).observe(time.perf_counter() - self.started)
+                return chunks
+        return []
+
+    async def close(self) -> None:
+        if self.stream is not None:
+            await self.stream.close()
+
+
+class LLMRouter:
+    """
+    Async LLM client over several OpenAI-compatible endpoints, with the interface of AsyncLLMClient.
+    Each request goes to an endpoint picked by weight among those whose circuit breaker is closed.
+    Until the first chunk arrives, failures are retried on another endpoint after a jittered
+    backoff, and with hedging a slow first chunk starts a second request whose loser is closed.
+    Once content has been streamed to the caller nothing is retried.
+    """
+    def __init__(
+        self,
+        endpoints: List[dict] = None,
+        sys_prompt: str = None,
+        max_concurrency: int = None,
+        max_connections: int = None,
+        timeout: float = None,
+        max_attempts: int = LLM_MAX_ATTEMPTS,
+        hedge_after_ms: float = LLM_HEDGE_AFTER_MS,
+        retry_base_ms: float = LLM_RETRY_BASE_MS,
+        retry_max_ms: float = LLM_RETRY_MAX_MS,
+        seed: int = None,
+    ) -> None:
+        import httpx
+
+        max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", 256))
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_SECONDS", 30)),
+            ),
+            timeout=httpx.Timeout(timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", 120)), connect=10.0),
+        )
+        self.endpoints: List[LLMEndpoint] = []
+        for config in endpoints or load_endpoint_config():
+            if not config.get("api_key"):
+                raise ValueError(f"API key is required for LLM endpoint {config['name']}")
+            self.endpoints.append(LLMEndpoint(
+                config["name"], config.get("url"), config["api_key"], self.http_client,
+                weight=float(config.get("weight", 1.0)), model=config.get("model"),
+            ))
+        self.sys_prompt = sys_prompt
+        self.semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", 256)))
+        self.max_attempts = max_attempts
+        self.hedge_after = hedge_after_ms / 1000
+        self.retry_base = retry_base_ms / 1000
+        self.retry_max = retry_max_ms / 1000
+        self.rng = random.Random(seed)
+
+    def _messages(self, prompt: str) -> list:
+        sys = self.sys_prompt or "You are a helpful AI assistant."
+        return [
+            {"role": "system", "content": sys},
+            {"role": "user", "content": prompt}
+        ]
+
+    def pick(self, exclude: Tuple[LLMEndpoint, ...] = ()) -> Optional[LLMEndpoint]:
+        """Weighted choice among available endpoints, preferring ones not in `exclude`."""
+        available = [endpoint for endpoint in self.endpoints if endpoint.breaker.available()]
+        candidates = [endpoint for endpoint in available if endpoint not in exclude] or available
+        if not candidates:
+            return None
+        endpoint = self.rng.choices(candidates, weights=[endpoint.weight for endpoint in candidates])[0]
+        endpoint.breaker.acquire()
+        return endpoint
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter exponential backoff."""
+        return self.rng.uniform(0, min(self.retry_max, self.retry_base * 2 ** retry))
+
+    async def _open(self, model: str, messages: list) -> Tuple[_Attempt, List[dict]]:
+        """Race upstream requests until one yields its first chunks; returns it with them."""
+        running: Dict[asyncio.Task, _Attempt] = {}
+        tried: List[LLMEndpoint] = []
+        retries = 0
+        hedging = self.hedge_after > 0
+        last_error: Optional[BaseException] = None
+
+        def launch(hedge: bool = False) -> bool:
+            endpoint = self.pick(tuple(tried))
+            if endpoint is None:
+                return False
+            tried.append(endpoint)
+            attempt = _Attempt(endpoint, model, messages, hedge)
+            running[asyncio.ensure_future(attempt.first_chunks())] = attempt
+            return True
+
+        try:
+            launch()
+            while running:
+                timeout = None
+                if hedging and len(running) == 1 and len(tried) < self.max_attempts:
+                    timeout = max(0.0, next(iter(running.values())).started + self.hedge_after - time.perf_counter())
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if launch(hedge=True):
+                        LLM_HEDGES.inc()
+                    else:
+                        # Every breaker is open: wait for the request already running.
+                        hedging = False
+                    continue
+
+                for task in done:
+                    attempt = running.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        attempt.endpoint.breaker.record_success()
+                        LLM_ENDPOINT_ATTEMPTS.labels(attempt.endpoint.name, "hedge_won" if attempt.hedge else "won").inc()
+                        return attempt, task.result()
+                    last_error = error
+                    await attempt.close()
+                    if not is_retryable(error):
+                        LLM_ENDPOINT_ATTEMPTS.labels(attempt.endpoint.name, "rejected").inc()
+                        attempt.endpoint.breaker.release()
+                        raise error
+                    attempt.endpoint.breaker.record_failure()
+                    LLM_ENDPOINT_ATTEMPTS.labels(attempt.endpoint.name, "failed").inc()
+                    logger.warning(f"LLM endpoint {attempt.endpoint.name} failed before the first chunk: {error!r}")
+
+                if not running and len(tried) < self.max_attempts:
+                    await asyncio.sleep(self.backoff(retries))
+                    retries += 1
+                    if launch():
+                        LLM_RETRIES.inc()
+            raise last_error or NoEndpointAvailable("All LLM endpoints are unavailable")
+        finally:
+            # Losers of a hedge race, or everything when the caller gave up.
+            for task, attempt in running.items():
+                task.cancel()
+            for task, attempt in running.items():
+                await asyncio.gather(task, return_exceptions=True)
+                attempt.endpoint.breaker.release()
+                LLM_ENDPOINT_ATTEMPTS.labels(attempt.endpoint.name, "cancelled").inc()
+                await asyncio.shield(attempt.close())
+
+    async def generate(self, model: str, prompt: str) -> str:
+        """
+        Standard completion, retried on another endpoint like a stream that has not started.
+        """
+        chunks = []
+        async for chunk in self.stream_generate(model, prompt):
+            if chunk["type"] == "content":
+                chunks.append(chunk["text"])
+        return "".join(chunks)
+
+    async def stream_generate(self, model: str, prompt: str):
+        """
+        Streaming completion async generator.
+        Closing the generator (e.g. when the client disconnects) closes the upstream stream.
+        """
+        started = time.perf_counter()
+        async with self.semaphore:
+            queued = time.perf_counter() - started
+            with span("llm_route", model=model) as attrs:
+                attempt, chunks = await self._open(model, self._messages(prompt))
+                attrs.update(endpoint=attempt.endpoint.name, hedge=attempt.hedge)
+            first_chunk = time.perf_counter()
+            count = 0
+            try:
+                for chunk in chunks:
+                    count += 1
+                    yield chunk
+                async for event in attempt.events:
+                    for chunk in _delta_chunks(event):
+                        count += 1
+                        yield chunk
+            finally:
+                record_llm_stream(model, started, first_chunk if count else None, time.perf_counter(), count, queued)
+                # Shielded so the upstream response is released even when the caller is being cancelled.
+                await asyncio.shield(attempt.close())
+
+    async def aclose(self) -> None:
+        await self.http_client.aclose()
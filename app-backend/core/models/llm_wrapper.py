@@ -1,5 +1,22 @@
 import os
-from openai import OpenAI
+import time
+import asyncio
+
+from core.tracing import span, record_llm_stream
+
+_async_client_instance = None
+
+
+def _delta_chunks(event):
+    """Translate one streamed completion event into content/think chunks."""
+    for choice in event.choices:
+        delta = getattr(choice, "delta", {})
+
+        if hasattr(delta, "content") and delta.content:
+            yield {"type": "content", "text": delta.content}
+
+        if hasattr(delta, "reasoning") and delta.reasoning:
+            yield {"type": "think", "text": delta.reasoning}
 
 
 class BaseLLMClient:
@@ -14,6 +31,7 @@ class BaseLLMClient:
         if not self.api_key:
             raise ValueError("API key is required")
 
+        from openai import OpenAI
         self.client = OpenAI(api_key=self.api_key, base_url=self.base_url)
         self.sys_prompt = sys_prompt
         
@@ -22,13 +40,14 @@ class BaseLLMClient:
         Standard completion.
         """
         sys = self.sys_prompt or "You are a helpful AI assistant."
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": sys},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with span("llm_generate", model=model):
+            response = self.client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": sys},
+                    {"role": "user", "content": prompt}
+                ]
+            )
         return response.choices[0].message.content
         
     def stream_generate(self, model: str, prompt: str):
@@ -37,6 +56,7 @@ class BaseLLMClient:
         Yields text chunks as they arrive.
         """
         sys = self.sys_prompt or "You are a helpful AI assistant."
+        started = time.perf_counter()
         stream = self.client.chat.completions.create(
             model=model,
             messages=[
@@ -46,13 +66,115 @@ class BaseLLMClient:
             stream=True
         )
 
-        for event in stream:
-            for choice in event.choices:
-                delta = getattr(choice, "delta", {})
-                
-                if hasattr(delta, "content") and delta.content:
-                    yield {"type": "content", "text": delta.content}
+        first_chunk = None
+        chunks = 0
+        try:
+            for event in stream:
+                for chunk in _delta_chunks(event):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter()
+                    chunks += 1
+                    yield chunk
+        finally:
+            record_llm_stream(model, started, first_chunk, time.perf_counter(), chunks)
+
+
+class AsyncLLMClient:
+    """
+    Non-blocking LLM wrapper on AsyncOpenAI.
+    All requests share one keep-alive httpx connection pool, and at most
+    `max_concurrency` completions run upstream at once; the rest wait their turn.
+    """
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        sys_prompt: str = None,
+        max_concurrency: int = None,
+        max_connections: int = None,
+        timeout: float = None,
+    ) -> None:
+        """Initialize async LLM client wrapper"""
+        self.api_key = api_key or os.getenv("API_KEY")
+        self.base_url = base_url or os.getenv('LLM_URL')
+
+        if not self.api_key:
+            raise ValueError("API key is required")
+
+        # Imported lazily: the openai package is slow to import and not needed until the first request.
+        import httpx
+        from openai import AsyncOpenAI
+
+        max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", 256))
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_SECONDS", 30)),
+            ),
+            timeout=httpx.Timeout(timeout or float(os.getenv("LLM_TIMEOUT_SECONDS", 120)), connect=10.0),
+        )
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self.http_client)
+        self.sys_prompt = sys_prompt
+        self.semaphore = asyncio.Semaphore(max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", 256)))
+
+    def _messages(self, prompt: str) -> list:
+        sys = self.sys_prompt or "You are a helpful AI assistant."
+        return [
+            {"role": "system", "content": sys},
+            {"role": "user", "content": prompt}
+        ]
+
+    async def generate(self, model: str, prompt: str) -> str:
+        """
+        Standard completion.
+        """
+        async with self.semaphore:
+            with span("llm_generate", model=model):
+                response = await self.client.chat.completions.create(model=model, messages=self._messages(prompt))
+        return response.choices[0].message.content
+
+    async def stream_generate(self, model: str, prompt: str):
+        """
+        Streaming completion async generator.
+        Closing the generator (e.g. when the client disconnects) closes the upstream stream.
+        """
+        started = time.perf_counter()
+        async with self.semaphore:
+            queued = time.perf_counter() - started
+            stream = await self.client.chat.completions.create(model=model, messages=self._messages(prompt), stream=True)
+            first_chunk = None
+            chunks = 0
+            try:
+                async for event in stream:
+                    for chunk in _delta_chunks(event):
+                        if first_chunk is None:
+                            first_chunk = time.perf_counter()
+                        chunks += 1
+                        yield chunk
+            finally:
+                record_llm_stream(model, started, first_chunk, time.perf_counter(), chunks, queued)
+                # Shielded so the upstream response is released even when the caller is being cancelled.
+                await asyncio.shield(stream.close())
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+def get_async_llm_client() -> AsyncLLMClient:
+    """Shared client; an LLMRouter over several endpoints when LLM_ENDPOINTS is set."""
+    global _async_client_instance
+    if _async_client_instance is None:
+        if os.getenv("LLM_ENDPOINTS"):
+            from core.models.llm_router import LLMRouter
+            _async_client_instance = LLMRouter()
+        else:
+            _async_client_instance = AsyncLLMClient()
+    return _async_client_instance
 
-                if hasattr(delta, "reasoning") and delta.reasoning:
-                    yield {"type": "think", "text": delta.reasoning}
 
+async def close_async_llm_client() -> None:
+    global _async_client_instance
+    if _async_client_instance is not None:
+        await _async_client_instance.aclose()
+        _async_client_instance = None
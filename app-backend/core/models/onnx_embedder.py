@@ -0,0 +1,54 @@
+from pathlib import Path
+import logging
+import re
+import os
+
+from core.models.embedder import SentenceTransformerEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+class OnnxEmbedder(SentenceTransformerEmbedder):
+    """
+    CPU embedder running the sentence-transformers model on ONNX Runtime.
+    The model is exported once and cached on disk; with `quantize="int8"` a dynamically
+    int8-quantized copy is produced as well. `embed()` behaves exactly like the PyTorch embedder.
+    """
+    def __init__(self, model_name: str = None, quantize: str = None, cache_dir: str = None, quantization_config: str = None):
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model_name = model_name or os.environ['EMBEDDING_MODEL']
+            self.quantize = quantize or os.getenv("EMBEDDING_ONNX_QUANTIZE", "none")
+            if self.quantize not in ("none", "int8"):
+                raise ValueError(f"Unsupported EMBEDDING_ONNX_QUANTIZE: {self.quantize}")
+            quantization_config = quantization_config or os.getenv("EMBEDDING_ONNX_QCONFIG", "avx2")
+
+            export_dir = Path(cache_dir or os.getenv("EMBEDDING_ONNX_CACHE", ".cache/onnx")) / re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)
+            if not (export_dir / "onnx" / "model.onnx").exists():
+                logger.info(f"Exporting {self.model_name} to ONNX in {export_dir}")
+                SentenceTransformer(self.model_name, backend="onnx").save_pretrained(str(export_dir))
+
+            file_name = "onnx/model.onnx"
+            if self.quantize == "int8":
+                file_name = f"onnx/model_qint8_{quantization_config}.onnx"
+                if not (export_dir / file_name).exists():
+                    from sentence_transformers import export_dynamic_quantized_onnx_model
+                    logger.info(f"Quantizing ONNX model to int8 ({quantization_config})")
+                    export_dynamic_quantized_onnx_model(
+                        SentenceTransformer(str(export_dir), backend="onnx"),
+                        quantization_config,
+                        str(export_dir),
+                    )
+
+            # Embeddings differ slightly from the PyTorch ones, so they get their own cache namespace.
+            self.cache_namespace = f"{self.model_name}@onnx-{self.quantize}"
+            logger.info(f"Loading ONNX embedding model: {export_dir / file_name}")
+            self.model = SentenceTransformer(
+                str(export_dir),
+                backend="onnx",
+                model_kwargs={"file_name": file_name, "provider": "CPUExecutionProvider"},
+            )
+            logger.info("Embedding model loaded successfully")
+        except Exception as e:
+            logger.exception(f"Error during embedding model initialization: {e}")
+            raise
@@ -0,0 +1,99 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+import threading
+import asyncio
+import hashlib
+import logging
+import time
+import os
+
+from core.models.embedding_cache import LRUCache, normalize_text
+from core.tracing import span
+
+logger = logging.getLogger(__name__)
+_reranker_instance = None
+_reranker_lock = threading.Lock()
+
+# Polish cross-encoder trained on the same retrieval data as the mmlw embedders.
+DEFAULT_RERANK_MODEL = "sdadas/polish-reranker-base-ranknet"
+
+
+class RerankResult:
+    def __init__(self, order: List[int], scores: List[Optional[float]], scored: int, cached: int, deadline_hit: bool):
+        # Candidate indices best first, and the cross-encoder score of each (None when not scored in time).
+        self.order = order
+        self.scores = scores
+        self.scored = scored
+        self.cached = cached
+        self.deadline_hit = deadline_hit
+
+
+class CrossEncoderReranker:
+    """
+    Scores (query, chunk) pairs with a local cross-encoder on CPU.
+    Pairs are scored in batches best-retrieval-rank first; when the deadline passes, the remaining
+    candidates keep their retrieval order below the scored ones. Scores are cached per pair.
+    """
+    def __init__(self, model_name: str = None, batch_size: int = None, max_length: int = None, cache_items: int = None):
+        self.model_name = model_name or os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL)
+        self.batch_size = batch_size or int(os.getenv("RERANK_BATCH_SIZE", 16))
+        logger.info(f"Loading re-rank model: {self.model_name}")
+        # Imported here for the same reason as in SentenceTransformerEmbedder.
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(self.model_name, max_length=max_length or int(os.getenv("RERANK_MAX_LENGTH", 512)), device="cpu")
+        self.cache = LRUCache(cache_items if cache_items is not None else int(os.getenv("RERANK_CACHE_ITEMS", 20000)))
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reranker")
+
+    def _pair_key(self, query: str, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{normalize_text(query)}\0{normalize_text(text)}".encode("utf-8")).digest()
+
+    def rerank(self, query: str, texts: List[str], deadline: float = None) -> RerankResult:
+        """Score `texts` against `query`; `deadline` is a time.perf_counter() value."""
+        keys = [self._pair_key(query, text) for text in texts]
+        scores: List[Optional[float]] = [None] * len(texts)
+        with self._lock:
+            for i, key in enumerate(keys):
+                scores[i] = self.cache.get(key)
+        cached = sum(score is not None for score in scores)
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        deadline_hit = False
+        for offset in range(0, len(pending), self.batch_size):
+            if deadline is not None and time.perf_counter() >= deadline:
+                deadline_hit = True
+                break
+            batch = pending[offset:offset + self.batch_size]
+            with span("rerank_batch", pairs=len(batch)):
+                batch_scores = self.model.predict([(query, texts[i]) for i in batch], batch_size=len(batch), show_progress_bar=False)
+            with self._lock:
+                for i, score in zip(batch, np.asarray(batch_scores, dtype=np.float32).reshape(-1)):
+                    scores[i] = float(score)
+                    self.cache.put(keys[i], scores[i])
+
+        scored = [i for i, score in enumerate(scores) if score is not None]
+        unscored = [i for i, score in enumerate(scores) if score is None]
+        order = sorted(scored, key=lambda i: scores[i], reverse=True) + unscored
+        return RerankResult(order, scores, len(scored) - cached, cached, deadline_hit)
+
+    async def rerank_async(self, query: str, texts: List[str], deadline_ms: float = None) -> RerankResult:
+        """Run `rerank` on the dedicated executor; the deadline counts from this call, queueing included."""
+        deadline = time.perf_counter() + deadline_ms / 1000 if deadline_ms else None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.rerank, query, texts, deadline)
+
+
+def reranker_enabled() -> bool:
+    return os.getenv("RERANK", "0") == "1"
+
+
+def get_reranker(load: bool = True) -> Optional[CrossEncoderReranker]:
+    """Shared re-ranker, or None unless RERANK=1; with `load=False` only if it is already loaded."""
+    global _reranker_instance
+    if _reranker_instance is None and load and reranker_enabled():
+        # Concurrent first requests would otherwise each load the model in their own thread.
+        with _reranker_lock:
+            if _reranker_instance is None:
+                _reranker_instance = CrossEncoderReranker()
+    return _reranker_instance
@@ -0,0 +1,130 @@
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+_response_cache_instance = None
+
+
+class _Scope:
+    """Cached responses of one (model, group) pair with their normalized prompt embeddings."""
+    def __init__(self, version: Optional[int] = None):
+        # Content version of the group the responses were generated from.
+        self.version = version
+        self.embeddings: List[np.ndarray] = []
+        self.chunks: List[List[dict]] = []
+        self.created: List[float] = []
+        self.last_used: List[float] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            self._matrix = np.stack(self.embeddings)
+        return self._matrix
+
+    def remove(self, indices: List[int]) -> None:
+        for i in sorted(indices, reverse=True):
+            for values in (self.embeddings, self.chunks, self.created, self.last_used):
+                del values[i]
+        self._matrix = None
+
+    def __len__(self):
+        return len(self.embeddings)
+
+
+class SemanticResponseCache:
+    """
+    Completion cache keyed by prompt embedding.
+    A prompt hits when its cosine similarity to a cached prompt of the same model and group
+    reaches `threshold`; the stored chunk stream is then replayed instead of calling the LLM.
+    Entries expire after `ttl_seconds` and each scope keeps at most `max_entries` (LRU).
+    `version` is the group's content version (`Group.content_version`): once a lookup or store
+    sees a newer one, the group's entries were answered from outdated documents and are dropped.
+    """
+    def __init__(self, threshold: float = None, ttl_seconds: float = None, max_entries: int = None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", 3600))
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 1000))
+        self._scopes: Dict[Tuple[str, Optional[int]], _Scope] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _expire(self, scope: _Scope, now: float) -> None:
+        expired = [i for i, created in enumerate(scope.created) if now - created > self.ttl_seconds]
+        if expired:
+            scope.remove(expired)
+            self.evictions += len(expired)
+
+    def _scope(self, model: str, group_id: Optional[int], version: Optional[int], create: bool = False) -> Optional[_Scope]:
+        """The scope for this content version, emptied first when it was filled from an older one."""
+        scope = self._scopes.get((model, group_id))
+        if scope is not None and version is not None and (scope.version is None or version > scope.version):
+            self.evictions += len(scope)
+            scope = None
+            del self._scopes[(model, group_id)]
+        if scope is None and create:
+            scope = self._scopes[(model, group_id)] = _Scope(version)
+        return scope
+
+    def lookup(self, model: str, group_id: Optional[int], embedding: np.ndarray, version: Optional[int] = None) -> Optional[List[dict]]:
+        scope = self._scope(model, group_id, version)
+        now = time.monotonic()
+        if scope is not None:
+            self._expire(scope, now)
+        if not scope:
+            self.misses += 1
+            return None
+
+        similarities = scope.matrix() @ self._normalize(embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        scope.last_used[best] = now
+        return scope.chunks[best]
+
+    def store(self, model: str, group_id: Optional[int], embedding: np.ndarray, chunks: List[dict], version: Optional[int] = None) -> None:
+        scope = self._scope(model, group_id, version, create=True)
+        if version is not None and scope.version is not None and version < scope.version:
+            # The group changed while this answer was being generated.
+            return
+        now = time.monotonic()
+        scope.embeddings.append(self._normalize(embedding))
+        scope.chunks.append(chunks)
+        scope.created.append(now)
+        scope.last_used.append(now)
+        scope._matrix = None
+        if len(scope) > self.max_entries:
+            lru = int(np.argmin(scope.last_used))
+            scope.remove([lru])
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": sum(len(scope) for scope in self._scopes.values()),
+            "scopes": len(self._scopes),
+        }
+
+
+def get_response_cache() -> Optional[SemanticResponseCache]:
+    """Shared cache instance, or None unless SEMANTIC_CACHE=1."""
+    global _response_cache_instance
+    if _response_cache_instance is None and os.getenv("SEMANTIC_CACHE", "0") == "1":
+        _response_cache_instance = SemanticResponseCache()
+    return _response_cache_instance
@@ -1,2 +1,17 @@
-from openai import OpenAI
+from functools import lru_cache
+import os
 
+
+class Settings:
+    """
+    Application settings read from the environment.
+    """
+    def __init__(self) -> None:
+        self.secret_key = os.environ['API_SECRET']
+        self.jwt_algorithm = os.getenv("JWT_ALGORITHM", "HS256")
+        self.access_token_expire_minutes = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
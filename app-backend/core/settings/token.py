@@ -2,17 +2,57 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import BaseModel
-from settings import get_settings
+from core.settings.settings import get_settings
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from typing import Optional, Tuple
+import time
+import os
 
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/", auto_error=False)
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 60))
+
+# token -> (TokenData, monotonic deadline); entries never outlive the token's own `exp`.
+_token_cache: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
 
 class TokenData(BaseModel):
     user_id: str
 
 
-def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
+def _cached_token(token: str):
+    cached = _token_cache.get(token)
+    if cached is None:
+        return None
+    if cached[1] <= time.monotonic():
+        del _token_cache[token]
+        return None
+    _token_cache.move_to_end(token)
+    return cached[0]
+
+
+def _cache_token(token: str, data: TokenData, exp) -> None:
+    if TOKEN_CACHE_SIZE <= 0 or TOKEN_CACHE_TTL_SECONDS <= 0:
+        return
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if exp is not None:
+        ttl = min(ttl, float(exp) - time.time())
+    if ttl <= 0:
+        return
+    _token_cache[token] = (data, time.monotonic() + ttl)
+    _token_cache.move_to_end(token)
+    while len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
+    cached = _cached_token(token)
+    if cached is not None:
+        return cached
+
     settings = get_settings()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,11 +69,19 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> TokenData:
         user_id: str = payload.get("user_id")  
         if user_id is None:
             raise credentials_exception
-        return TokenData(user_id=user_id)
+        token_data = TokenData(user_id=user_id)
+        _cache_token(token, token_data, payload.get("exp"))
+        return token_data
     except JWTError:
         raise credentials_exception
 
 
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[TokenData]:
+    """Like get_current_user, but anonymous requests get None instead of a 401."""
+    if token is None:
+        return None
+    return await get_current_user(token)
+
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     settings = get_settings()
@@ -46,4 +94,4 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.jwt_algorithm)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt
@@ -0,0 +1,38 @@
+from contextlib import contextmanager
+from typing import Dict, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """
+    Cold-start bookkeeping: per-phase timings and whether the app is ready for traffic.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.embedder_ready = False
+        self.error: Optional[str] = None
+        # Only /llm/response needs the LLM client, so it does not gate readiness.
+        self.llm_ready = False
+        self.llm_error: Optional[str] = None
+
+    def record(self, name: str, seconds: float) -> None:
+        self.phases[name] = round(seconds * 1000, 1)
+        logger.info(f"Startup phase '{name}' took {self.phases[name]} ms")
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def summary(self) -> dict:
+        return {"phases_ms": self.phases, "since_start_ms": round((time.perf_counter() - self.started) * 1000, 1)}
+
+
+startup_state = StartupState()
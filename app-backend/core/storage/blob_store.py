@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Optional, Union
+from pathlib import Path
+import tempfile
+import hashlib
+import logging
+import mmap
+import os
+
+logger = logging.getLogger(__name__)
+_blob_store_instance = None
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobInfo:
+    def __init__(self, sha256: str, size: int, created: bool):
+        self.sha256 = sha256
+        self.size = size
+        self.created = created
+
+    def __repr__(self):
+        return f"<BlobInfo {self.sha256[:12]}: {self.size} bytes{' (new)' if self.created else ''}>"
+
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage for uploaded files.
+    Blobs are keyed by the hex SHA-256 of their content, so identical uploads are stored once.
+    """
+    @abstractmethod
+    def put(self, source: Union[bytes, str, Path, BinaryIO]) -> BlobInfo:
+        """Store bytes, a file path or a readable binary stream and return its digest."""
+
+    @abstractmethod
+    def open(self, sha256: str) -> BinaryIO:
+        """Readable binary stream of a blob."""
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, sha256: str) -> None:
+        ...
+
+    @abstractmethod
+    def stat(self, sha256: str) -> Optional[BlobInfo]:
+        """Digest and size of a stored blob, or None if there is no such blob."""
+
+    def mmap(self, sha256: str) -> mmap.mmap:
+        """Read-only memory map for random access without reading the blob into memory."""
+        with self.open(sha256) as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def local_path(self, sha256: str) -> Optional[Path]:
+        """Filesystem path of a blob if the backend keeps one, so it can be handed to converters as is."""
+        return None
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store on the local filesystem, sharded as <root>/ab/cd/<sha256>.
+    Writes go to a temporary file that is hashed while streaming and atomically renamed into place.
+    """
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._tmp = self.root / "tmp"
+        self._tmp.mkdir(exist_ok=True)
+
+    def _path(self, sha256: str) -> Path:
+        if len(sha256) != 64 or not all(c in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"Invalid blob digest: {sha256!r}")
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def put(self, source: Union[bytes, str, Path, BinaryIO]) -> BlobInfo:
+        if isinstance(source, (str, Path)):
+            with open(source, "rb") as f:
+                return self.put(f)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                if isinstance(source, (bytes, bytearray, memoryview)):
+                    digest.update(source)
+                    out.write(source)
+                    size = len(source)
+                else:
+                    while chunk := source.read(READ_CHUNK_SIZE):
+                        digest.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self._path(sha256)
+            if path.exists():
+                return BlobInfo(sha256, size, created=False)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_name, path)
+            return BlobInfo(sha256, size, created=True)
+        finally:
+            Path(tmp_name).unlink(missing_ok=True)
+
+    def open(self, sha256: str) -> BinaryIO:
+        return open(self._path(sha256), "rb")
+
+    def exists(self, sha256: str) -> bool:
+        return self._path(sha256).exists()
+
+    def delete(self, sha256: str) -> None:
+        self._path(sha256).unlink(missing_ok=True)
+
+    def stat(self, sha256: str) -> Optional[BlobInfo]:
+        try:
+            return BlobInfo(sha256, self._path(sha256).stat().st_size, created=False)
+        except FileNotFoundError:
+            return None
+
+    def local_path(self, sha256: str) -> Optional[Path]:
+        return self._path(sha256)
+
+
+def get_blob_store() -> BlobStore:
+    global _blob_store_instance
+    if _blob_store_instance is None:
+        backend = os.getenv("BLOB_STORE_BACKEND", "local")
+        if backend != "local":
+            raise ValueError(f"Unsupported blob store backend: {backend}")
+        _blob_store_instance = LocalBlobStore(os.getenv("BLOB_STORE_PATH", "data/blobs"))
+    return _blob_store_instance
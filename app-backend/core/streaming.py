@@ -0,0 +1,178 @@
+"""
+Framing for streamed chat responses.
+
+Upstream deltas are read by a producer task into a bounded queue and written by the response in
+flushes: consecutive `content`/`think` deltas are merged for up to STREAM_COALESCE_MS or
+STREAM_COALESCE_CHARS, and everything collected in one flush goes out as a single body write.
+When the client reads slowly, the response blocks in `send`, the queue fills up and the producer
+stops reading upstream, so a slow client holds back the LLM stream instead of buffering it in memory.
+
+Frames are one JSON object per line: NDJSON (`{...}\\n`) or SSE (`data: {...}\\n\\n`, ending with
+`data: [DONE]`); the chunk objects are the same as before coalescing, only with longer texts.
+"""
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterable, List, Optional, Union
+import asyncio
+import json
+import time
+import os
+
+from core.tracing import STREAM_FRAMES, STREAM_WRITES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+STREAM_FORMAT = os.getenv("STREAM_FORMAT", "ndjson")
+# 0 disables waiting; deltas that are already queued are still merged.
+STREAM_COALESCE_MS = float(os.getenv("STREAM_COALESCE_MS", 25))
+STREAM_COALESCE_CHARS = int(os.getenv("STREAM_COALESCE_CHARS", 1024))
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", 64))
+
+STREAM_FORMATS = ("ndjson", "sse")
+DELTA_TYPES = ("content", "think")
+_END = object()
+
+
+def dumps(obj) -> bytes:
+    """Compact JSON as UTF-8 bytes; orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class Framer:
+    """
+    Encodes chunk dicts as NDJSON lines or SSE events.
+    """
+    def __init__(self, format: str = STREAM_FORMAT):
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"Unsupported stream format: {format}")
+        self.format = format
+        self.media_type = "text/event-stream" if format == "sse" else "application/json"
+
+    def frame(self, chunk: dict) -> bytes:
+        if self.format == "sse":
+            return b"data: " + dumps(chunk) + b"\n\n"
+        return dumps(chunk) + b"\n"
+
+    def end(self) -> bytes:
+        return b"data: [DONE]\n\n" if self.format == "sse" else b""
+
+
+def coalesce(chunks: List[dict], max_chars: int = STREAM_COALESCE_CHARS) -> List[dict]:
+    """Merge runs of consecutive deltas of the same type, up to `max_chars` of text per chunk."""
+    merged: List[dict] = []
+    for chunk in chunks:
+        previous = merged[-1] if merged else None
+        if (
+            previous is not None
+            and chunk.get("type") in DELTA_TYPES
+            and previous.get("type") == chunk["type"]
+            and previous.keys() == chunk.keys()
+            and len(previous["text"]) + len(chunk["text"]) <= max_chars
+        ):
+            merged[-1] = {**previous, "text": previous["text"] + chunk["text"]}
+        else:
+            merged.append(chunk)
+    return merged
+
+
+async def _produce(source: AsyncIterator[dict], queue: asyncio.Queue) -> None:
+    try:
+        async for chunk in source:
+            await queue.put(chunk)
+    except Exception as e:
+        await queue.put(e)
+        return
+    finally:
+        # Cancelled while waiting for room in the queue: close the source (and the upstream stream) now.
+        if hasattr(source, "aclose"):
+            await source.aclose()
+    await queue.put(_END)
+
+
+async def framed_stream(
+    source: Union[AsyncIterator[dict], Iterable[dict]],
+    framer: Framer = None,
+    coalesce_ms: float = STREAM_COALESCE_MS,
+    max_chars: int = STREAM_COALESCE_CHARS,
+    queue_size: int = STREAM_QUEUE_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Body of a streamed response: `source` chunks, coalesced and framed, one bytes object per write.
+    The first chunk is written as soon as it arrives; later flushes wait up to `coalesce_ms` for more.
+    An exception raised by `source` is re-raised here after the chunks before it have been written.
+    """
+    framer = framer or Framer()
+    if not hasattr(source, "__aiter__"):
+        # Replayed chunks: everything is available, so framing is the only work left.
+        frames = [framer.frame(chunk) for chunk in coalesce(list(source), max_chars)]
+        STREAM_FRAMES.labels(framer.format).inc(len(frames))
+        STREAM_WRITES.labels(framer.format).inc()
+        yield b"".join(frames) + framer.end()
+        return
+
+    queue: asyncio.Queue = asyncio.Queue(queue_size)
+    producer = asyncio.ensure_future(_produce(source, queue))
+    frames_metric = STREAM_FRAMES.labels(framer.format)
+    writes_metric = STREAM_WRITES.labels(framer.format)
+    # Kept across flushes: cancelling a queue.get() that timed out could drop an item it just took.
+    getter: Optional[asyncio.Future] = None
+    first, finished = True, False
+    error: Optional[BaseException] = None
+    try:
+        while not finished:
+            pending: List[dict] = []
+            chars = 0
+            deadline = None
+            while True:
+                if getter is None and not queue.empty():
+                    item = queue.get_nowait()
+                else:
+                    if getter is None:
+                        getter = asyncio.ensure_future(queue.get())
+                    if deadline is None:
+                        await asyncio.wait({getter})
+                    else:
+                        remaining = deadline - time.perf_counter()
+                        if remaining > 0:
+                            await asyncio.wait({getter}, timeout=remaining)
+                        if not getter.done():
+                            break
+                    item, getter = getter.result(), None
+                if item is _END:
+                    finished = True
+                    break
+                if isinstance(item, BaseException):
+                    finished, error = True, item
+                    break
+                pending.append(item)
+                chars += len(item.get("text", ""))
+                if deadline is None:
+                    deadline = time.perf_counter() + (0 if first else coalesce_ms / 1000)
+                if chars >= max_chars:
+                    break
+            first = False
+
+            end = framer.end() if finished and error is None else b""
+            if pending or end:
+                frames = [framer.frame(chunk) for chunk in coalesce(pending, max_chars)]
+                frames_metric.inc(len(frames))
+                writes_metric.inc()
+                yield b"".join(frames) + end
+        if error is not None:
+            raise error
+    finally:
+        for task in (producer, getter):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+
+def framed_response(source, format: str = None, **options) -> StreamingResponse:
+    """StreamingResponse over `framed_stream`; `format` defaults to STREAM_FORMAT."""
+    framer = Framer(format or STREAM_FORMAT)
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"} if framer.format == "sse" else None
+    return StreamingResponse(framed_stream(source, framer, **options), media_type=framer.media_type, headers=headers)
@@ -0,0 +1,170 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+import logging
+import uuid
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Requests slower than this are logged with all their spans as one JSON line; 0 disables.
+TRACE_SLOW_REQUEST_MS = float(os.getenv("TRACE_SLOW_REQUEST_MS", 0))
+TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", 200))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_SECONDS = Histogram(
+    "kb_request_seconds", "HTTP request duration, including streamed response bodies",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram("kb_stage_seconds", "Duration of instrumented stages", ["stage"], buckets=LATENCY_BUCKETS)
+STAGE_ERRORS = Counter("kb_stage_errors_total", "Instrumented stages that raised", ["stage"])
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "kb_llm_time_to_first_token_seconds", "Time from request to the first streamed chunk", ["model"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "kb_llm_tokens_per_second", "Streamed chunks per second after the first one", ["model"],
+    buckets=(1, 5, 10, 20, 40, 60, 80, 100, 150, 200, 400),
+)
+LLM_CHUNKS = Counter("kb_llm_chunks_total", "Streamed completion chunks", ["model"])
+LLM_ENDPOINT_TTFT = Histogram(
+    "kb_llm_endpoint_ttft_seconds", "Time from an upstream request to its first chunk, per endpoint", ["endpoint"],
+    buckets=LATENCY_BUCKETS,
+)
+LLM_ENDPOINT_ATTEMPTS = Counter(
+    "kb_llm_endpoint_attempts_total", "Upstream requests by outcome (won, hedge_won, failed, rejected, cancelled)",
+    ["endpoint", "outcome"],
+)
+LLM_HEDGES = Counter("kb_llm_hedges_total", "Hedged upstream requests started after a slow first chunk")
+LLM_RETRIES = Counter("kb_llm_retries_total", "Upstream requests retried after a failure before the first chunk")
+LLM_BREAKER_STATE = Gauge("kb_llm_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open", ["endpoint"])
+STREAM_FRAMES = Counter("kb_stream_frames_total", "Frames sent in streamed responses, after coalescing", ["format"])
+STREAM_WRITES = Counter("kb_stream_writes_total", "Body writes of streamed responses", ["format"])
+
+
+class Trace:
+    """
+    Spans recorded while serving one request.
+    """
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.spans: List[dict] = []
+        self.dropped = 0
+
+    def add(self, stage: str, started: float, seconds: float, attrs: dict) -> None:
+        if len(self.spans) >= TRACE_MAX_SPANS:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "stage": stage,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round(seconds * 1000, 2),
+            **attrs,
+        })
+
+    def to_dict(self, status: int, seconds: float) -> dict:
+        return {
+            "trace_id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 2),
+            "spans": self.spans,
+            "dropped_spans": self.dropped,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """
+    Time a block: observed in the `kb_stage_seconds` histogram and, inside a request, added to its trace.
+    The yielded dict can be filled with attributes that are only known at the end of the block.
+    """
+    started = time.perf_counter()
+    try:
+        yield attrs
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(stage, started, seconds, attrs)
+
+
+def record_llm_stream(model: str, started: float, first_chunk: Optional[float], finished: float, chunks: int, queued_seconds: float = 0.0) -> None:
+    """Time to first token and streaming rate of one completion."""
+    attrs = {"model": model, "chunks": chunks, "queued_ms": round(queued_seconds * 1000, 2)}
+    LLM_CHUNKS.labels(model).inc(chunks)
+    if first_chunk is not None:
+        LLM_TIME_TO_FIRST_TOKEN.labels(model).observe(first_chunk - started)
+        attrs["ttft_ms"] = round((first_chunk - started) * 1000, 2)
+        if chunks > 1 and finished > first_chunk:
+            LLM_TOKENS_PER_SECOND.labels(model).observe((chunks - 1) / (finished - first_chunk))
+            attrs["tokens_per_second"] = round((chunks - 1) / (finished - first_chunk), 1)
+    STAGE_SECONDS.labels("llm_stream").observe(finished - started)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add("llm_stream", started, finished - started, attrs)
+
+
+def instrument_engine(engine) -> None:
+    """Record every statement executed through a (sync) engine as a `db_query` span."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context._span_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - context._span_started
+        STAGE_SECONDS.labels("db_query").observe(seconds)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add("db_query", context._span_started, seconds, {"statement": " ".join(statement.split())[:120]})
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware timing whole requests, streamed bodies included, per route template.
+    Plain ASGI rather than BaseHTTPMiddleware so streaming responses are not buffered.
+    """
+    def __init__(self, app, slow_request_ms: float = None):
+        self.app = app
+        self.slow_request_ms = TRACE_SLOW_REQUEST_MS if slow_request_ms is None else slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_trace.reset(token)
+            seconds = time.perf_counter() - trace.started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, str(status_code)).observe(seconds)
+            if self.slow_request_ms and seconds * 1000 >= self.slow_request_ms:
+                logger.warning(f"Slow request trace: {json.dumps(trace.to_dict(status_code, seconds), ensure_ascii=False)}")
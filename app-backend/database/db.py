@@ -1,4 +1,4 @@
-from .models import SessionLocal
+from .models import SessionLocal, AsyncSessionLocal
 
 def get_db():
     db = SessionLocal()
@@ -7,3 +7,13 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def run_in_session(fn, *args):
+    """Await fn(db, *args) on a session of its own, so independent queries can run concurrently."""
+    async with AsyncSessionLocal() as db:
+        return await fn(db, *args)
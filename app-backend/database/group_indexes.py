@@ -0,0 +1,120 @@
+"""
+Per-group partial HNSW indexes.
+
+Every group gets `CREATE INDEX ... WHERE group_id = N` over the configured embedding expression, so a
+search filtered to one group walks a graph that only contains that group's rows instead of
+post-filtering the global graph. Indexes are created after a transaction inserting a Group commits
+and dropped after one deleting it; `ensure_group_indexes()` repairs anything missed (groups inserted
+with raw SQL, failed concurrent builds) and runs at startup.
+"""
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session, object_session
+from typing import List, Set
+import asyncio
+import logging
+import re
+
+from database.models import (
+    engine, async_engine, Group, EMBEDDING_STORAGE, EMBEDDING_STORAGE_INDEXES,
+    GROUP_VECTOR_INDEXES, HNSW_M, HNSW_EF_CONSTRUCTION,
+)
+
+logger = logging.getLogger(__name__)
+
+GROUP_INDEX_NAME = re.compile(r"^ix_documents_\w+_hnsw_g\d+$")
+_pending_tasks: Set[asyncio.Task] = set()
+
+
+def group_index_name(group_id: int, storage: str = EMBEDDING_STORAGE) -> str:
+    name, _, _ = EMBEDDING_STORAGE_INDEXES[storage]
+    return f"ix_documents_{name}_hnsw_g{int(group_id)}"
+
+
+def create_group_index_sql(group_id: int, storage: str = EMBEDDING_STORAGE, concurrently: bool = True) -> str:
+    _, expression, ops = EMBEDDING_STORAGE_INDEXES[storage]
+    return (
+        f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {group_index_name(group_id, storage)} "
+        f"ON documents USING hnsw ({expression} {ops}) WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}) "
+        f"WHERE group_id = {int(group_id)}"
+    )
+
+
+def drop_group_index_sql(group_id: int, storage: str = EMBEDDING_STORAGE, concurrently: bool = True) -> str:
+    return f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {group_index_name(group_id, storage)}"
+
+
+def ensure_group_indexes(bind=None) -> List[int]:
+    """Create missing (and rebuild invalid) per-group indexes; returns the group ids that were (re)built."""
+    built = []
+    with (bind or engine).connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        group_ids = conn.execute(text("SELECT id FROM groups ORDER BY id")).scalars().all()
+        existing = dict(conn.execute(text(
+            "SELECT c.relname, i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = 'documents'::regclass"
+        )).all())
+        for group_id in group_ids:
+            name = group_index_name(group_id)
+            if existing.get(name) is True:
+                continue
+            if name in existing:
+                # Left behind by an interrupted CREATE INDEX CONCURRENTLY.
+                conn.execute(text(drop_group_index_sql(group_id)))
+            conn.execute(text(create_group_index_sql(group_id)))
+            built.append(group_id)
+    if built:
+        logger.info(f"Built per-group vector indexes for groups {built}")
+    return built
+
+
+async def _run_ddl(statements: List[str]) -> None:
+    try:
+        async with async_engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            for statement in statements:
+                await conn.execute(text(statement))
+    except Exception as e:
+        logger.exception(f"Per-group vector index maintenance failed: {e}")
+
+
+def _schedule(statements: List[str]) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        with engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            for statement in statements:
+                conn.execute(text(statement))
+        return
+    # Building can take a while on a group that already has rows; don't hold up the request.
+    task = loop.create_task(_run_ddl(statements))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+@event.listens_for(Group, "after_insert")
+def _group_inserted(mapper, connection, target):
+    object_session(target).info.setdefault("inserted_group_ids", set()).add(target.id)
+
+
+@event.listens_for(Group, "after_delete")
+def _group_deleted(mapper, connection, target):
+    object_session(target).info.setdefault("deleted_group_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _maintain_group_indexes(session):
+    inserted = session.info.pop("inserted_group_ids", set())
+    deleted = session.info.pop("deleted_group_ids", set())
+    if not GROUP_VECTOR_INDEXES or not (inserted or deleted):
+        return
+    _schedule(
+        [create_group_index_sql(group_id) for group_id in sorted(inserted - deleted)]
+        + [drop_group_index_sql(group_id) for group_id in sorted(deleted)]
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_group_changes(session):
+    session.info.pop("inserted_group_ids", None)
+    session.info.pop("deleted_group_ids", None)
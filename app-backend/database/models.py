@@ -1,8 +1,12 @@
 from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, LargeBinary, Table, Boolean
+from sqlalchemy import create_engine, make_url, Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Table, Boolean, Index, Computed
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from pgvector.sqlalchemy import Vector
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text, literal_column
+
+from core.tracing import instrument_engine
 
 import os
 from dotenv import load_dotenv
@@ -10,12 +14,61 @@ from dotenv import load_dotenv
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+HNSW_M = int(os.getenv("HNSW_M", 16))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", 64))
+# ANN index storage: the HNSW index is over float32 `embedding` or over its float16 / binary-quantized
+# cast. The casts are expression indexes, so rows only store the float32 column used for exact re-ranking.
+# Name, indexed expression and operator class per mode; queries must order by the same expression.
+EMBEDDING_STORAGE = os.getenv("EMBEDDING_STORAGE", "float32")
+EMBEDDING_STORAGE_INDEXES = {
+    "float32": ("embedding", "embedding", "vector_cosine_ops"),
+    "halfvec": ("embedding_half", "(embedding::halfvec(1024))", "halfvec_cosine_ops"),
+    "binary": ("embedding_bit", "(binary_quantize(embedding)::bit(1024))", "bit_hamming_ops"),
+}
+if EMBEDDING_STORAGE not in EMBEDDING_STORAGE_INDEXES:
+    raise RuntimeError(f"Unsupported EMBEDDING_STORAGE: {EMBEDDING_STORAGE}")
+# Per-group partial HNSW indexes (database.group_indexes), so a group filter never post-filters a global graph.
+GROUP_VECTOR_INDEXES = os.getenv("GROUP_VECTOR_INDEXES", "1") != "0"
+# 'simple' keeps identifiers and part numbers verbatim; Postgres ships no Polish stemmer.
+TEXT_SEARCH_CONFIG = "simple"
 
 if not DATABASE_URL:
     raise RuntimeError("No variable DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") != "0"
+# Set to 0 when running behind a transaction-pooling pgbouncer.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+# Generic plans of prepared statements cannot match a partial index's `group_id = N` predicate.
+DB_PLAN_CACHE_MODE = os.getenv("DB_PLAN_CACHE_MODE", "force_custom_plan" if GROUP_VECTOR_INDEXES else "")
+
+pool_options = dict(
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_pre_ping=DB_POOL_PRE_PING,
+)
+
+engine = create_engine(DATABASE_URL, **pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    make_url(DATABASE_URL)
+    .set(drivername="postgresql+asyncpg")
+    .update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)}),
+    connect_args={
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        "server_settings": {"plan_cache_mode": DB_PLAN_CACHE_MODE} if DB_PLAN_CACHE_MODE else {},
+    },
+    **pool_options,
+)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 user_group_access = Table(
@@ -34,6 +87,8 @@ class Group(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
     is_active = Column(Boolean, default=True, nullable=True)
+    # Bumped whenever the group's documents change; cached answers of older versions are dropped.
+    content_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     users = relationship("User", secondary=user_group_access, back_populates="groups")
     documents = relationship("Document", back_populates="group")
@@ -60,7 +115,9 @@ class Files(Base):
     __tablename__ = "files"
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
-    data = Column(LargeBinary, nullable=False)
+    # Content lives in the blob store (core.storage.blob_store), addressed by this digest.
+    sha256 = Column(String(64), nullable=False, index=True)
+    size = Column(BigInteger, nullable=True)
 
     content_type = Column(String, nullable=True)
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=True)
@@ -68,14 +125,32 @@ class Files(Base):
     is_public = Column(Boolean, default=False, nullable=True)
 
 
+def vector_index(storage: str, table: Table = None) -> Index:
+    """HNSW index for the given storage mode; `table` attaches it outside Document's __table_args__."""
+    name, expression, ops = EMBEDDING_STORAGE_INDEXES[storage]
+    index = Index(
+        f"ix_documents_{name}_hnsw",
+        name if expression == name else literal_column(expression).label(name),
+        postgresql_using="hnsw",
+        postgresql_with={"m": HNSW_M, "ef_construction": HNSW_EF_CONSTRUCTION},
+        postgresql_ops={name: ops},
+    )
+    if table is not None:
+        table.append_constraint(index)
+    return index
+
+
 class Document(Base):
     __tablename__ = "documents"
     id = Column(Integer, primary_key=True, index=True)
     text = Column(Text, nullable=False)
+    text_search = Column(TSVECTOR, Computed(f"to_tsvector('{TEXT_SEARCH_CONFIG}', coalesce(text, ''))", persisted=True))
     embedding = Column(Vector(1024))
     page = Column(Integer, nullable=True)
+    # sha256 of `text`; lets re-ingestion of a new file version keep unchanged chunks (pipeline.ingest).
+    content_hash = Column(String(64), nullable=True)
     added = Column(DateTime(timezone=True), server_default=func.now())
-    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False, index=True)
     filename_id = Column(Integer, ForeignKey("files.id"), nullable=False)
 
     author = Column(String, nullable=True)
@@ -85,8 +160,52 @@ class Document(Base):
 
     group = relationship("Group", back_populates="documents")
     file = relationship("Files")
+
+    __table_args__ = (
+        vector_index(EMBEDDING_STORAGE),
+        Index("ix_documents_text_search", "text_search", postgresql_using="gin"),
+        Index("ix_documents_filename_id_content_hash", "filename_id", "content_hash"),
+    )
     
 
-Base.metadata.create_all(bind=engine)
+class IngestionJob(Base):
+    """
+    Queued document ingestion (pipeline.jobs); workers claim rows with FOR UPDATE SKIP LOCKED.
+    """
+    __tablename__ = "ingestion_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    # queued -> running -> succeeded | failed | cancelled
+    status = Column(String(16), nullable=False, default="queued", server_default="queued")
+    group_id = Column(Integer, ForeignKey("groups.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    # Uploaded content in the blob store; `file_id` is the file being replaced, or the one created once done.
+    sha256 = Column(String(64), nullable=False)
+    filename = Column(String, nullable=False)
+    content_type = Column(String, nullable=True)
+    description = Column(Text, nullable=True)
+    file_id = Column(Integer, ForeignKey("files.id"), nullable=True)
+
+    pages_total = Column(Integer, nullable=True)
+    pages_done = Column(Integer, nullable=False, default=0, server_default="0")
+    chunks_done = Column(Integer, nullable=False, default=0, server_default="0")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    cancel_requested = Column(Boolean, nullable=False, default=False, server_default="false")
+    error = Column(Text, nullable=True)
+    worker_id = Column(String, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_ingestion_jobs_queued", "id", postgresql_where=text("status = 'queued'")),
+        Index("ix_ingestion_jobs_running_group_id", "group_id", postgresql_where=text("status = 'running'")),
+    )
+
+
+def init_db(bind=None) -> None:
+    """Create missing tables. Called explicitly at startup instead of on import."""
+    Base.metadata.create_all(bind=bind or engine)
 
 
@@ -4,4 +4,12 @@ alembic revision --autogenerate -m "initial" || true
 
 alembic upgrade head
 
+# One model copy shared by every uvicorn worker (see core/models/embedding_server.py).
+# --reload runs a single worker, so the server only pays off with several workers and no reload.
+if [ -n "$EMBEDDING_SERVER_SOCKET" ]; then
+    python -m core.models.embedding_server &
+    for _ in $(seq 50); do [ -S "$EMBEDDING_SERVER_SOCKET" ] && break; sleep 0.2; done
+    exec uvicorn main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-2}"
+fi
+
 exec uvicorn main:app --host 0.0.0.0 --port 8000 --reload
@@ -1,19 +1,34 @@
+import time
+_import_started = time.perf_counter()
+
 import os
+import asyncio
+import logging
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from sqlalchemy import create_engine, Column, Integer, String, Text, text
-from sqlalchemy.orm import sessionmaker, declarative_base
-from pgvector.sqlalchemy import Vector
 from typing import List
-from migrations import run_migrations
-from database.models import SessionLocal, Document
+from database.models import init_db, async_engine, GROUP_VECTOR_INDEXES
+from database.group_indexes import ensure_group_indexes
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
 
 from core.models.embedder import get_embedder
+from core.models.batching import get_batching_embedder
+from core.models.reranker import get_reranker, reranker_enabled
+from core.models.llm_wrapper import get_async_llm_client, close_async_llm_client
+from core.startup import startup_state
+from core.tracing import TracingMiddleware
+from pipeline.jobs import start_worker_pool, stop_worker_pool
 
 from routes.user_auth.endpoints import register_router
 from routes.agent.response import response_router
+from routes.agent.rag import rag_router
+from routes.health import health_router
+from routes.metrics import metrics_router
+from routes.ingestion.endpoints import ingestion_router
+
+logger = logging.getLogger(__name__)
 
 class DocumentCreate(BaseModel):
     text: str
@@ -35,13 +50,83 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware)
 
 app.include_router(register_router)
 app.include_router(response_router)
+app.include_router(rag_router)
+app.include_router(health_router)
+app.include_router(metrics_router)
+app.include_router(ingestion_router)
+
+startup_state.record("imports", time.perf_counter() - _import_started)
+
+
+async def warm_up_embedder():
+    """Load the embedding model off the event loop and run one batch through it."""
+    loop = asyncio.get_running_loop()
+    try:
+        with startup_state.phase("embedder_load"):
+            await loop.run_in_executor(None, get_embedder)
+        with startup_state.phase("embedder_warmup"):
+            await get_batching_embedder().embed("rozgrzewka")
+        startup_state.embedder_ready = True
+    except Exception as e:
+        startup_state.error = f"Embedder failed to load: {e}"
+        logger.exception(startup_state.error)
+        return
+
+    # Ingestion workers share the embedder, so they only start once it is loaded; they need no LLM.
+    start_worker_pool()
 
+    if reranker_enabled():
+        try:
+            with startup_state.phase("reranker_load"):
+                await loop.run_in_executor(None, get_reranker)
+        except Exception as e:
+            # Re-ranked requests load it again on demand.
+            logger.exception(f"Reranker failed to load: {e}")
+
+    try:
+        with startup_state.phase("llm_client"):
+            # Importing openai/httpx takes long enough to stall the loop on the first /llm/response.
+            await loop.run_in_executor(None, get_async_llm_client)
+        startup_state.llm_ready = True
+    except Exception as e:
+        startup_state.llm_error = f"LLM client failed to load: {e}"
+        logger.exception(startup_state.llm_error)
+    logger.info(f"Application ready: {startup_state.summary()}")
+
+    if GROUP_VECTOR_INDEXES:
+        # After readiness: building indexes for groups created outside the ORM can take a while.
+        try:
+            with startup_state.phase("group_indexes"):
+                await run_in_threadpool(ensure_group_indexes)
+        except Exception as e:
+            logger.exception(f"Could not build per-group vector indexes: {e}")
 
 
 @app.on_event("startup")
-def startup_event():
-    get_embedder()
+async def startup_event():
+    if os.getenv("DB_CREATE_SCHEMA", "1") != "0":
+        with startup_state.phase("schema"):
+            await run_in_threadpool(init_db)
+    app.state.warmup_task = asyncio.create_task(warm_up_embedder())
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    app.state.warmup_task.cancel()
+    await stop_worker_pool()
+    await get_batching_embedder().stop()
+    await close_async_llm_client()
+    await async_engine.dispose()
+
 
+@app.get("/embeddings/stats")
+async def embedding_stats():
+    batching = get_batching_embedder()
+    stats = {"batching": batching.stats.snapshot()}
+    if hasattr(batching.embedder, "cache_stats"):
+        stats["cache"] = batching.embedder.cache_stats()
+    return stats
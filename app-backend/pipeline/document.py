@@ -1,74 +1,196 @@
-from typing import List, Union, Optional
+from typing import BinaryIO, Dict, Iterator, List, Union, Optional, Tuple
 import logging
-from docling.document_converter import DocumentConverter
 from pathlib import Path
 import io
+import os
+
+from core.tracing import span
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
+_converter_instance = None
+
+DocumentSource = Union[str, Path, bytes, BinaryIO]
+PAGES_PER_WINDOW = int(os.getenv("DOCUMENT_PAGES_PER_WINDOW", 8))
+
 
 class DocumentPage:
     """
     Represents a single page within a PDF document.
     Stores the page number and its extracted text.
     """
+    __slots__ = ("page_number", "text")
+
     def __init__(self, page_number: int, text: str):
         self.page_number = page_number
         self.text = text
-    
+
     def __repr__(self):
         return f"<DocumentPage {self.page_number}: {len(self.text)} chars>"
 
 class DocumentObject:
     """
-    Represents a PDF document loaded in memory with access to each page's text and number.
-    Uses docling.DocumentConverter to extract textual content from various document formats.
+    Represents a document converted with docling lazily, a window of pages at a time.
+    `iter_pages()` yields pages without keeping them, so memory is bounded by `pages_per_window`
+    whatever the page count; `get_page()` converts only the window holding the requested page.
+    Bytes and binary streams are converted from memory, without a temporary file; unless they are
+    a PDF, `name` must carry the file extension docling picks their format from.
+    Pass `keep_pages=True` to keep every converted page for repeated lookups.
     """
-    def __init__(self, pdf_source: Union[str, bytes]):
-        self.pages: List[DocumentPage] = []
-        try:
-            logger.info("Loading document...")
-            converter = DocumentConverter()
-            
-            if isinstance(pdf_source, str):
-                result = converter.convert(pdf_source)
-            elif isinstance(pdf_source, bytes):
-                import tempfile
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-                    tmp_file.write(pdf_source)
-                    tmp_file_path = tmp_file.name
-                
-                try:
-                    result = converter.convert(tmp_file_path)
-                finally:
-                    # Clean up temporary file
-                    Path(tmp_file_path).unlink(missing_ok=True)
+    def __init__(self, pdf_source: DocumentSource, name: str = None, pages_per_window: int = None, keep_pages: bool = False):
+        if isinstance(pdf_source, (str, Path)):
+            self.source: Union[str, bytes] = str(pdf_source)
+        elif isinstance(pdf_source, (bytes, bytearray, memoryview)):
+            self.source = bytes(pdf_source)
+        elif hasattr(pdf_source, "read"):
+            self.source = pdf_source.read()
+        else:
+            raise ValueError("Unsupported PDF source type. Use str (file path), bytes or a binary stream.")
+        # Only used for in-memory sources; docling picks their input format from the name's extension.
+        self.name = stream_name(self.source, name) if isinstance(self.source, bytes) else name
+        self.pages_per_window = pages_per_window or PAGES_PER_WINDOW
+        self.keep_pages = keep_pages
+        self.page_count = count_pages(self.source)
+        # Converted pages by number: the current window, or everything converted so far with keep_pages.
+        self._pages: Dict[int, DocumentPage] = {}
+        self._page_list: Optional[List[DocumentPage]] = None
+
+    def _window(self, number: int) -> Tuple[int, int]:
+        start = (number - 1) // self.pages_per_window * self.pages_per_window + 1
+        return start, min(start + self.pages_per_window - 1, self.page_count)
+
+    def _load(self, start: Optional[int] = None, end: Optional[int] = None) -> List[DocumentPage]:
+        pages = convert_pages(self.source, start, end, self.name)
+        if not self.keep_pages:
+            self._pages.clear()
+        self._pages.update((page.page_number, page) for page in pages)
+        return pages
+
+    def iter_pages(self, start: int = None, end: int = None) -> Iterator[DocumentPage]:
+        """Pages `start`..`end` (1-based, inclusive; the whole document by default), converted window by window."""
+        if self.page_count is None:
+            # No fixed pages (e.g. DOCX): docling can only convert the whole document at once.
+            if not self.keep_pages or not self._pages:
+                self._load()
+            pages = [page for number, page in sorted(self._pages.items()) if (start or 1) <= number <= (end or number)]
+            yield from pages
+            return
+
+        start, end = max(start or 1, 1), min(end or self.page_count, self.page_count)
+        number = start
+        while number <= end:
+            window_end = min(number + self.pages_per_window - 1, end)
+            if self.keep_pages and all(n in self._pages for n in range(number, window_end + 1)):
+                pages = [self._pages[n] for n in range(number, window_end + 1)]
             else:
-                raise ValueError("Unsupported PDF source type. Use str (file path) or bytes.")
-            
-
-            doc = result.document
-            
-            logger.info(f"Successfully loaded {len(self.pages)} pages from document.")
-            
-        except Exception as e:
-            logger.exception(f"Failed to load document: {e}")
-            raise
-    
+                pages = self._load(number, window_end)
+            yield from pages
+            number = window_end + 1
+
     def get_page(self, number: int) -> Optional[DocumentPage]:
-        for page in self.pages:
-            if page.page_number == number:
-                return page
-        return None
-    
-    def all_text(self, separator: str = "\n\n") -> str:
-        return separator.join(page.text for page in self.pages)
-    
-    def to_dict(self) -> List[dict]:
-        return [{"page_number": p.page_number, "text": p.text} for p in self.pages]
-    
+        page = self._pages.get(number)
+        if page is not None:
+            return page
+        if self.page_count is None:
+            if not self._pages:
+                self._load()
+            return self._pages.get(number)
+        if not 1 <= number <= self.page_count:
+            return None
+        self._load(*self._window(number))
+        return self._pages.get(number)
+
+    @property
+    def pages(self) -> List[DocumentPage]:
+        """
+        Every page as a list, converted on first access and kept from then on (as with keep_pages),
+        so the whole document stays in memory; prefer `iter_pages()` for a single pass.
+        """
+        if self._page_list is None:
+            self.keep_pages = True
+            self._page_list = list(self.iter_pages())
+        return self._page_list
+
+    def all_text(self, separator: str = "\n\n", start: int = None, end: int = None) -> str:
+        return separator.join(page.text for page in self.iter_pages(start, end))
+
+    def to_dict(self, start: int = None, end: int = None) -> List[dict]:
+        return [{"page_number": p.page_number, "text": p.text} for p in self.iter_pages(start, end)]
+
     def __iter__(self):
-        return iter(self.pages)
-    
+        return self.iter_pages()
+
     def __len__(self):
-        return len(self.pages)
+        if self.page_count is None:
+            if not self._pages:
+                self._load()
+            return len(self._pages)
+        return self.page_count
+
+
+def extract_pages(doc) -> List[DocumentPage]:
+    """Split a converted docling document into per-page markdown text."""
+    return [DocumentPage(page_no, doc.export_to_markdown(page_no=page_no)) for page_no in sorted(doc.pages)]
+
+
+def count_pages(source: Union[str, bytes]) -> Optional[int]:
+    """Number of pages of a PDF file path or bytes, or None for formats without fixed pages."""
+    # Sniff the header: blob store paths carry no file extension.
+    if isinstance(source, bytes):
+        header = source[:5]
+    else:
+        with open(source, "rb") as f:
+            header = f.read(5)
+    if header != b"%PDF-":
+        return None
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(source)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def stream_name(data: bytes, name: Optional[str] = None) -> str:
+    """Name for docling's DocumentStream: PDFs are recognised by their header, other formats need `name`."""
+    if name:
+        return name
+    if data[:5] == b"%PDF-":
+        return "document.pdf"
+    raise ValueError("In-memory documents other than PDF need a file name with an extension to detect their format.")
+
+
+def get_converter():
+    """One docling converter per process."""
+    global _converter_instance
+    if _converter_instance is None:
+        # Imported here: docling takes seconds to import and only the conversion workers need it.
+        from docling.document_converter import DocumentConverter
+        _converter_instance = DocumentConverter()
+    return _converter_instance
+
+
+def convert_pages(source: Union[str, bytes], start: Optional[int] = None, end: Optional[int] = None, name: str = None) -> List[DocumentPage]:
+    """
+    Convert pages `start`..`end` (1-based, inclusive) of a file path or in-memory bytes,
+    or the whole document when no range is given. `name` is required for bytes other than a PDF.
+    """
+    if isinstance(source, bytes):
+        from docling.datamodel.base_models import DocumentStream
+        # BytesIO over bytes shares the buffer, so each window costs no copy of the file.
+        source = DocumentStream(name=stream_name(source, name), stream=io.BytesIO(source))
+    converter = get_converter()
+    with span("docling_convert", start=start, end=end):
+        if start is None:
+            result = converter.convert(source)
+        else:
+            result = converter.convert(source, page_range=(start, end))
+    return extract_pages(result.document)
+
+
+def convert_page_range(path: str, start: Optional[int] = None, end: Optional[int] = None) -> List[DocumentPage]:
+    """
+    Convert pages `start`..`end` (1-based, inclusive) of a file, or the whole file when no range is given.
+    Module-level so it can be submitted to a process pool; each worker process reuses one converter.
+    """
+    return convert_pages(path, start, end)
@@ -0,0 +1,426 @@
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from pathlib import Path
+from sqlalchemy import insert, update, delete, select, exists, bindparam
+import multiprocessing
+import asyncio
+import hashlib
+import logging
+import time
+import os
+
+from core.models.embedder import get_embedder
+from core.storage.blob_store import get_blob_store, BlobInfo
+from database.models import engine, Document, Files, Group, IngestionJob
+from pipeline.document import DocumentPage, convert_page_range, count_pages
+
+logger = logging.getLogger(__name__)
+_process_pool = None
+
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", 1000))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", 200))
+CONVERT_WORKERS = int(os.getenv("INGEST_CONVERT_WORKERS", 2))
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # spawn: forked children would inherit the server's threads, their locks and the DB pool sockets.
+        _process_pool = ProcessPoolExecutor(max_workers=CONVERT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def release_blob(sha256: str) -> bool:
+    """
+    Delete a blob unless a file row or an unfinished ingestion job still points at it.
+    Returns whether it was deleted.
+    """
+    with engine.connect() as conn:
+        referenced = conn.execute(select(
+            exists().where(Files.sha256 == sha256)
+            | exists().where(IngestionJob.sha256 == sha256, IngestionJob.status.in_(("queued", "running")))
+        )).scalar()
+    if referenced:
+        return False
+    get_blob_store().delete(sha256)
+    return True
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """
+    Split text into chunks of at most ~`chunk_size` characters on word boundaries.
+    Consecutive chunks share up to `overlap` trailing characters.
+    """
+    words = text.split()
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+    for word in words:
+        if current and length + len(word) + 1 > chunk_size:
+            chunks.append(" ".join(current))
+            tail: List[str] = []
+            tail_length = 0
+            for previous in reversed(current):
+                if tail_length + len(previous) + 1 > overlap:
+                    break
+                tail.insert(0, previous)
+                tail_length += len(previous) + 1
+            current, length = tail, tail_length
+        current.append(word)
+        length += len(word) + 1
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def chunk_hash(text: str) -> str:
+    """Content hash stored in `Document.content_hash`; must match the SQL backfill in the migration."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ChunkDiff:
+    """
+    Chunk-level diff against the rows of a file version being replaced.
+    A new chunk whose hash matches an existing row claims that row instead of being embedded again;
+    rows nobody claimed are deleted once the new version has been processed. Rows stored under
+    another group than the new version's are never reused.
+    """
+    def __init__(self, rows: Iterable[Tuple[int, Optional[int], str, int]], group_id: int, unchanged: bool = False):
+        self.available: Dict[str, deque] = {}
+        self.stale: List[int] = []
+        # Groups losing rows of the replaced version, besides the new version's own group.
+        self.stale_groups: Set[int] = set()
+        for doc_id, page, content_hash, row_group_id in rows:
+            if row_group_id == group_id:
+                self.available.setdefault(content_hash, deque()).append((doc_id, page))
+            else:
+                self.stale.append(doc_id)
+                self.stale_groups.add(row_group_id)
+        self.unchanged = unchanged and not self.stale
+        self.reused = sum(len(rows) for rows in self.available.values()) if self.unchanged else 0
+        self.moved: List[dict] = []
+
+    def claim(self, content_hash: str, page_number: Optional[int]) -> bool:
+        rows = self.available.get(content_hash)
+        if not rows:
+            return False
+        doc_id, page = rows.popleft()
+        self.reused += 1
+        if page != page_number:
+            self.moved.append({"doc_id": doc_id, "new_page": page_number})
+        return True
+
+    def unclaimed_ids(self) -> List[int]:
+        return self.stale + [doc_id for rows in self.available.values() for doc_id, _ in rows]
+
+
+class StageStats:
+    """
+    Items processed by one pipeline stage and the time it spent working on them.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, items: int, seconds: float) -> None:
+        self.items += items
+        self.busy_seconds += seconds
+
+    def to_dict(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+
+class IngestProgress:
+    """
+    Live counters of one ingest, updated by the pipeline stages and read by whoever runs it (pipeline.jobs).
+    """
+    def __init__(self):
+        self.pages_total: Optional[int] = None
+        self.pages_done = 0
+        self.chunks_done = 0
+
+
+class IngestResult:
+    def __init__(self, file_id: int, pages: int, chunks: int, stats: dict, reused: int = 0, deleted: int = 0):
+        self.file_id = file_id
+        self.pages = pages
+        self.chunks = chunks
+        self.stats = stats
+        self.reused = reused
+        self.deleted = deleted
+
+    def __repr__(self):
+        return f"<IngestResult file={self.file_id}: {self.pages} pages, {self.chunks} chunks, {self.reused} reused, {self.deleted} deleted>"
+
+
+class IngestionPipeline:
+    """
+    Streaming convert -> chunk -> embed -> insert pipeline.
+    Stages are connected by bounded queues, so a slow stage applies backpressure to the ones
+    before it and at most a few page windows are held in memory regardless of document size.
+    Docling conversion runs in a process pool a window of pages at a time; the file and all of
+    its chunks are written in a single transaction with batched executemany inserts.
+    Pass an `IngestProgress` to follow pages converted and chunks stored while it runs.
+    Passing `file_id` re-ingests a new version of that file: chunks whose content hash is already
+    stored are kept, only new ones are embedded, and chunks that disappeared are deleted.
+    """
+    def __init__(
+        self,
+        embedder=None,
+        pages_per_task: int = None,
+        queue_size: int = None,
+        embed_batch_size: int = None,
+        insert_batch_size: int = None,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+    ):
+        self.embedder = embedder
+        self.pages_per_task = pages_per_task or int(os.getenv("INGEST_PAGES_PER_TASK", 4))
+        self.convert_inflight = CONVERT_WORKERS
+        self.queue_size = queue_size or int(os.getenv("INGEST_QUEUE_SIZE", 8))
+        self.embed_batch_size = embed_batch_size or int(os.getenv("INGEST_EMBED_BATCH_SIZE", 32))
+        self.insert_batch_size = insert_batch_size or int(os.getenv("INGEST_INSERT_BATCH_SIZE", 256))
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    async def ingest(
+        self,
+        path: str,
+        group_id: int,
+        filename: str = None,
+        content_type: str = None,
+        description: str = None,
+        file_id: int = None,
+        progress: IngestProgress = None,
+        sha256: str = None,
+    ) -> IngestResult:
+        loop = asyncio.get_running_loop()
+        if self.embedder is None:
+            self.embedder = await loop.run_in_executor(None, get_embedder)
+        progress = progress or IngestProgress()
+
+        stats = {name: StageStats(name) for name in ("convert", "chunk", "embed", "insert")}
+        pages_q: asyncio.Queue = asyncio.Queue(self.queue_size)
+        chunks_q: asyncio.Queue = asyncio.Queue(self.queue_size * self.embed_batch_size)
+        rows_q: asyncio.Queue = asyncio.Queue(self.queue_size * self.embed_batch_size)
+
+        # Blobs are content-addressed, so storing before the transaction is idempotent. A job's upload
+        # is already stored under its `sha256`, which saves hashing and copying it again.
+        store = get_blob_store()
+        blob = await loop.run_in_executor(None, store.stat, sha256) if sha256 else None
+        if blob is None:
+            blob = await loop.run_in_executor(None, store.put, path)
+        source = str(store.local_path(blob.sha256) or path)
+
+        conn = await loop.run_in_executor(None, engine.connect)
+        trans = conn.begin()
+        diff = None
+        previous_sha256 = None
+        deleted = 0
+        try:
+            if file_id is None:
+                file_id = await loop.run_in_executor(None, self._insert_file, conn, blob, filename or Path(path).name, content_type, description)
+            else:
+                diff, previous_sha256 = await loop.run_in_executor(None, self._replace_file, conn, file_id, group_id, blob, filename, content_type, description)
+
+            if diff is not None and diff.unchanged:
+                # Same bytes as the stored version: nothing to convert or embed.
+                await loop.run_in_executor(None, trans.commit)
+                pages = await loop.run_in_executor(None, count_pages, source)
+                progress.pages_total = progress.pages_done = pages
+                progress.chunks_done = diff.reused
+                logger.info(f"Re-ingested {filename or path}: content unchanged, {diff.reused} chunks kept")
+                return IngestResult(file_id, pages or 0, diff.reused, {}, reused=diff.reused)
+
+            await _run_stages(
+                self._convert(source, pages_q, stats["convert"], progress),
+                self._chunk(pages_q, chunks_q, stats["chunk"], progress, diff),
+                self._embed(chunks_q, rows_q, stats["embed"]),
+                self._insert(conn, rows_q, file_id, group_id, stats["insert"], progress),
+            )
+            if diff is not None:
+                deleted = await loop.run_in_executor(None, self._apply_diff, conn, diff)
+            # Last, so the group rows stay locked only for the commit.
+            changed_groups = {group_id} | (diff.stale_groups if diff is not None else set())
+            await loop.run_in_executor(None, self._bump_content_versions, conn, changed_groups)
+            await loop.run_in_executor(None, trans.commit)
+        except BaseException:
+            await loop.run_in_executor(None, trans.rollback)
+            raise
+        finally:
+            await loop.run_in_executor(None, conn.close)
+
+        if previous_sha256 is not None and previous_sha256 != blob.sha256:
+            # After the commit: until then a rollback would leave the file pointing at the old blob.
+            try:
+                await loop.run_in_executor(None, release_blob, previous_sha256)
+            except Exception as e:
+                logger.warning(f"Could not release superseded blob {previous_sha256}: {e}")
+
+        report = {name: stage.to_dict() for name, stage in stats.items()}
+        reused = diff.reused if diff is not None else 0
+        if diff is not None:
+            report["diff"] = {"reused": reused, "embedded": stats["embed"].items, "deleted": deleted, "moved": len(diff.moved)}
+        logger.info(f"Ingested {filename or path}: {report}")
+        return IngestResult(file_id, stats["convert"].items, stats["insert"].items + reused, report, reused=reused, deleted=deleted)
+
+    def _insert_file(self, conn, blob: BlobInfo, filename: str, content_type: str, description: str) -> int:
+        stmt = insert(Files).values(
+            filename=filename,
+            sha256=blob.sha256,
+            size=blob.size,
+            content_type=content_type,
+            description=description,
+        ).returning(Files.id)
+        return conn.execute(stmt).scalar_one()
+
+    def _replace_file(self, conn, file_id: int, group_id: int, blob: BlobInfo, filename: str, content_type: str, description: str) -> Tuple[ChunkDiff, str]:
+        """
+        Point the file row at the new blob and load the chunks of the version being replaced.
+        Returns the diff and the digest of the replaced blob.
+        """
+        # Row lock: concurrent re-ingests of one file would otherwise claim the same chunks.
+        previous = conn.execute(select(Files.sha256).where(Files.id == file_id).with_for_update()).scalar_one_or_none()
+        if previous is None:
+            raise ValueError(f"File {file_id} does not exist")
+
+        values = {"sha256": blob.sha256, "size": blob.size}
+        for key, value in (("filename", filename), ("content_type", content_type), ("description", description)):
+            if value is not None:
+                values[key] = value
+        conn.execute(update(Files).where(Files.id == file_id).values(**values))
+
+        rows = conn.execute(
+            select(Document.id, Document.page, Document.content_hash, Document.group_id)
+            .where(Document.filename_id == file_id)
+        ).all()
+        return ChunkDiff(rows, group_id, unchanged=previous == blob.sha256), previous
+
+    def _bump_content_versions(self, conn, group_ids: Set[int]) -> None:
+        """Mark the groups' documents as changed, which invalidates their cached answers in every process."""
+        conn.execute(update(Group).where(Group.id.in_(sorted(group_ids))).values(content_version=Group.content_version + 1))
+
+    def _apply_diff(self, conn, diff: ChunkDiff) -> int:
+        """Renumber kept chunks that moved to another page and delete the unclaimed ones."""
+        table = Document.__table__
+        if diff.moved:
+            conn.execute(update(table).where(table.c.id == bindparam("doc_id")).values(page=bindparam("new_page")), diff.moved)
+        unclaimed = diff.unclaimed_ids()
+        if unclaimed:
+            conn.execute(delete(table).where(table.c.id.in_(unclaimed)))
+        return len(unclaimed)
+
+    async def _convert(self, path: str, pages_q: asyncio.Queue, stats: StageStats, progress: IngestProgress) -> None:
+        loop = asyncio.get_running_loop()
+        pool = get_process_pool()
+        total = await loop.run_in_executor(None, count_pages, path)
+        progress.pages_total = total
+        if total is None:
+            windows = [(None, None)]
+        else:
+            windows = [(start, min(start + self.pages_per_task - 1, total)) for start in range(1, total + 1, self.pages_per_task)]
+
+        # Keep a bounded number of windows in flight and emit them in page order.
+        window_iter = iter(windows)
+        pending = deque(loop.run_in_executor(pool, convert_page_range, path, *window) for window in islice(window_iter, self.convert_inflight))
+        try:
+            started = time.perf_counter()
+            while pending:
+                pages: List[DocumentPage] = await pending.popleft()
+                next_window = next(window_iter, None)
+                if next_window is not None:
+                    pending.append(loop.run_in_executor(pool, convert_page_range, path, *next_window))
+                stats.record(len(pages), time.perf_counter() - started)
+                for page in pages:
+                    await pages_q.put(page)
+                started = time.perf_counter()
+        finally:
+            for future in pending:
+                future.cancel()
+        await pages_q.put(None)
+        stats.finished = time.perf_counter()
+
+    async def _chunk(self, pages_q: asyncio.Queue, chunks_q: asyncio.Queue, stats: StageStats, progress: IngestProgress, diff: ChunkDiff = None) -> None:
+        while (page := await pages_q.get()) is not None:
+            started = time.perf_counter()
+            chunks = []
+            for chunk in chunk_text(page.text, self.chunk_size, self.chunk_overlap):
+                content_hash = chunk_hash(chunk)
+                if diff is None or not diff.claim(content_hash, page.page_number):
+                    chunks.append((page.page_number, chunk, content_hash))
+            stats.record(len(chunks), time.perf_counter() - started)
+            for chunk in chunks:
+                await chunks_q.put(chunk)
+            progress.pages_done += 1
+        await chunks_q.put(None)
+        stats.finished = time.perf_counter()
+
+    async def _embed(self, chunks_q: asyncio.Queue, rows_q: asyncio.Queue, stats: StageStats) -> None:
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            batch = []
+            while len(batch) < self.embed_batch_size:
+                item = await chunks_q.get()
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            if not batch:
+                continue
+            started = time.perf_counter()
+            embeddings = await loop.run_in_executor(None, self.embedder.embed, [text for _, text, _ in batch])
+            stats.record(len(batch), time.perf_counter() - started)
+            for (page_number, text, content_hash), embedding in zip(batch, embeddings):
+                await rows_q.put((page_number, text, content_hash, embedding))
+        await rows_q.put(None)
+        stats.finished = time.perf_counter()
+
+    async def _insert(self, conn, rows_q: asyncio.Queue, file_id: int, group_id: int, stats: StageStats, progress: IngestProgress) -> None:
+        loop = asyncio.get_running_loop()
+        done = False
+        while not done:
+            rows = []
+            while len(rows) < self.insert_batch_size:
+                item = await rows_q.get()
+                if item is None:
+                    done = True
+                    break
+                page_number, text, content_hash, embedding = item
+                rows.append({
+                    "text": text,
+                    "content_hash": content_hash,
+                    "embedding": embedding,
+                    "page": page_number,
+                    "group_id": group_id,
+                    "filename_id": file_id,
+                })
+            if not rows:
+                continue
+            started = time.perf_counter()
+            await loop.run_in_executor(None, conn.execute, insert(Document.__table__), rows)
+            stats.record(len(rows), time.perf_counter() - started)
+            progress.chunks_done += len(rows)
+        stats.finished = time.perf_counter()
+
+
+async def _run_stages(*stages) -> None:
+    """Run pipeline stages concurrently; if one fails the others are cancelled."""
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -0,0 +1,376 @@
+"""
+Background ingestion jobs.
+
+Uploads are stored in the blob store and queued as `ingestion_jobs` rows; a pool of workers claims
+them with `FOR UPDATE SKIP LOCKED` and runs them through `IngestionPipeline`. At most
+INGEST_GROUP_CONCURRENCY jobs of one group run at a time across all workers, and submissions are
+refused once INGEST_MAX_BACKLOG jobs are waiting, so a burst of uploads queues instead of competing
+with chat requests for the CPU.
+
+Workers run inside the API process (INGEST_WORKERS > 0), or standalone with
+`python -m pipeline.jobs` and INGEST_WORKERS=0 on the API replicas.
+"""
+from sqlalchemy import select, insert, update, func, case, text
+from sqlalchemy.orm import aliased
+from datetime import timedelta
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import signal
+import socket
+import os
+
+from core.storage.blob_store import get_blob_store
+from database.models import async_engine, IngestionJob
+from pipeline.ingest import IngestionPipeline, IngestProgress, release_blob
+
+logger = logging.getLogger(__name__)
+_worker_pool_instance = None
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", 1))
+INGEST_GROUP_CONCURRENCY = int(os.getenv("INGEST_GROUP_CONCURRENCY", 1))
+INGEST_MAX_BACKLOG = int(os.getenv("INGEST_MAX_BACKLOG", 50))
+INGEST_POLL_SECONDS = float(os.getenv("INGEST_POLL_SECONDS", 2))
+INGEST_HEARTBEAT_SECONDS = float(os.getenv("INGEST_HEARTBEAT_SECONDS", 5))
+# A running job whose worker has not reported for this long is given to another worker.
+INGEST_JOB_TIMEOUT_SECONDS = float(os.getenv("INGEST_JOB_TIMEOUT_SECONDS", 120))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", 3))
+# Any constant shared by all workers; serializes claims so the per-group running count is exact.
+_CLAIM_LOCK_KEY = 0x6B62696E67
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+
+class IngestionBacklogFull(Exception):
+    """Raised when INGEST_MAX_BACKLOG jobs are already waiting."""
+
+
+def _queued_count():
+    return select(func.count()).where(IngestionJob.status == "queued")
+
+
+async def backlog_full(max_backlog: int = INGEST_MAX_BACKLOG) -> bool:
+    """Whether a submission would be refused now; `submit_job` checks again in its transaction."""
+    async with async_engine.connect() as conn:
+        return (await conn.execute(_queued_count())).scalar_one() >= max_backlog
+
+
+async def submit_job(
+    sha256: str,
+    group_id: int,
+    filename: str,
+    content_type: str = None,
+    description: str = None,
+    file_id: int = None,
+    user_id: int = None,
+    max_backlog: int = INGEST_MAX_BACKLOG,
+) -> int:
+    """Queue an already stored blob for ingestion and return the job id."""
+    async with async_engine.begin() as conn:
+        queued = (await conn.execute(_queued_count())).scalar_one()
+        if queued >= max_backlog:
+            raise IngestionBacklogFull(f"{queued} ingestion jobs are already queued")
+        job_id = (await conn.execute(
+            insert(IngestionJob).values(
+                sha256=sha256,
+                group_id=group_id,
+                filename=filename,
+                content_type=content_type,
+                description=description,
+                file_id=file_id,
+                user_id=user_id,
+            ).returning(IngestionJob.id)
+        )).scalar_one()
+    pool = _worker_pool_instance
+    if pool is not None:
+        pool.notify()
+    return job_id
+
+
+async def release_job_blob(sha256: str) -> None:
+    """
+    Release the upload of a job that ended without creating or updating a file; `release_blob`
+    keeps it while a file or another unfinished job still uses it.
+    """
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, release_blob, sha256)
+    except Exception as e:
+        logger.warning(f"Could not release blob {sha256}: {e}")
+
+
+async def get_job(job_id: int) -> Optional[IngestionJob]:
+    async with async_engine.connect() as conn:
+        return (await conn.execute(select(IngestionJob.__table__).where(IngestionJob.id == job_id))).first()
+
+
+async def queue_position(job_id: int) -> int:
+    """Number of queued jobs ahead of this one."""
+    async with async_engine.connect() as conn:
+        return (await conn.execute(
+            select(func.count()).where(IngestionJob.status == "queued", IngestionJob.id < job_id)
+        )).scalar_one()
+
+
+async def cancel_job(job_id: int) -> Optional[str]:
+    """
+    Cancel a job: a queued one is cancelled at once, a running one is flagged and stopped by its worker
+    at the next heartbeat (its transaction is rolled back). Returns the job's status afterwards.
+    """
+    queued = IngestionJob.status == "queued"
+    async with async_engine.begin() as conn:
+        row = (await conn.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.status.in_(("queued", "running")))
+            .values(
+                status=case((queued, "cancelled"), else_=IngestionJob.status),
+                finished_at=case((queued, func.now()), else_=IngestionJob.finished_at),
+                cancel_requested=True,
+            )
+            .returning(IngestionJob.status, IngestionJob.sha256)
+        )).first()
+        if row is None:
+            return (await conn.execute(select(IngestionJob.status).where(IngestionJob.id == job_id))).scalar_one_or_none()
+    if row.status == "cancelled":
+        # Was still queued; a running job's blob is released by its worker.
+        await release_job_blob(row.sha256)
+    return row.status
+
+
+async def claim_job(worker_id: str, group_concurrency: int = INGEST_GROUP_CONCURRENCY):
+    """Mark the oldest queued job of a group below its concurrency cap as running and return it."""
+    job, running = aliased(IngestionJob), aliased(IngestionJob)
+    running_in_group = (
+        select(func.count())
+        .where(running.status == "running", running.group_id == job.group_id)
+        .scalar_subquery()
+    )
+    candidate = (
+        select(job.id)
+        .where(job.status == "queued", running_in_group < group_concurrency)
+        .order_by(job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with async_engine.begin() as conn:
+        await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _CLAIM_LOCK_KEY})
+        return (await conn.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == candidate)
+            .values(
+                status="running",
+                worker_id=worker_id,
+                attempts=IngestionJob.attempts + 1,
+                started_at=func.now(),
+                heartbeat_at=func.now(),
+                pages_total=None,
+                pages_done=0,
+                chunks_done=0,
+            )
+            .returning(*IngestionJob.__table__.c)
+        )).first()
+
+
+async def heartbeat(job_id: int, worker_id: str, progress: IngestProgress) -> bool:
+    """Publish progress; False when the job was cancelled or handed to another worker meanwhile."""
+    async with async_engine.begin() as conn:
+        cancel_requested = (await conn.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.worker_id == worker_id, IngestionJob.status == "running")
+            .values(
+                heartbeat_at=func.now(),
+                pages_total=progress.pages_total,
+                pages_done=progress.pages_done,
+                chunks_done=progress.chunks_done,
+            )
+            .returning(IngestionJob.cancel_requested)
+        )).scalar_one_or_none()
+    return cancel_requested is False
+
+
+async def finish_job(job_id: int, worker_id: str, status: str, progress: IngestProgress = None, error: str = None, file_id: int = None) -> None:
+    values = dict(status=status, error=error, finished_at=func.now())
+    if progress is not None:
+        values.update(pages_total=progress.pages_total, pages_done=progress.pages_done, chunks_done=progress.chunks_done)
+    if file_id is not None:
+        values["file_id"] = file_id
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.worker_id == worker_id)
+            .values(**values)
+        )
+
+
+async def release_job(job_id: int, worker_id: str) -> None:
+    """Put a job interrupted by shutdown back in the queue without counting the attempt."""
+    async with async_engine.begin() as conn:
+        await conn.execute(
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id, IngestionJob.worker_id == worker_id, IngestionJob.status == "running")
+            .values(status="queued", worker_id=None, attempts=IngestionJob.attempts - 1)
+        )
+
+
+async def requeue_stale_jobs(timeout_seconds: float = INGEST_JOB_TIMEOUT_SECONDS, max_attempts: int = INGEST_MAX_ATTEMPTS) -> int:
+    """Return jobs of workers that died to the queue, or fail them after `max_attempts`."""
+    exhausted = IngestionJob.attempts >= max_attempts
+    async with async_engine.begin() as conn:
+        result = await conn.execute(
+            update(IngestionJob)
+            .where(
+                IngestionJob.status == "running",
+                IngestionJob.heartbeat_at < func.now() - timedelta(seconds=timeout_seconds),
+            )
+            .values(
+                status=case((IngestionJob.cancel_requested, "cancelled"), (exhausted, "failed"), else_="queued"),
+                error=case((exhausted, "Worker stopped responding"), else_=IngestionJob.error),
+                finished_at=case((IngestionJob.cancel_requested | exhausted, func.now()), else_=None),
+                worker_id=None,
+            )
+            .returning(IngestionJob.id, IngestionJob.status, IngestionJob.sha256)
+        )
+        rows = result.all()
+    if rows:
+        logger.warning(f"Requeued stale ingestion jobs {[row.id for row in rows]}")
+    for row in rows:
+        if row.status in FINISHED_STATUSES:
+            await release_job_blob(row.sha256)
+    return len(rows)
+
+
+class IngestionWorkerPool:
+    """
+    `workers` asyncio tasks claiming and running ingestion jobs.
+    A worker polls every INGEST_POLL_SECONDS when idle, or sooner when a job is submitted in this process.
+    While a job runs its progress is written every INGEST_HEARTBEAT_SECONDS, which is also when a
+    cancellation request is noticed.
+    """
+    def __init__(self, workers: int = INGEST_WORKERS, pipeline: IngestionPipeline = None):
+        self.workers = workers
+        self.pipeline = pipeline or IngestionPipeline()
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self.running: Dict[int, str] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(f"{self.worker_prefix}:{i}")))
+        logger.info(f"Started {self.workers} ingestion workers")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _worker(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await claim_job(worker_id)
+            except Exception as e:
+                logger.exception(f"Claiming an ingestion job failed: {e}")
+                job = None
+            if job is not None:
+                try:
+                    await self._run(job, worker_id)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Bookkeeping failed (database unreachable); the job is requeued once its heartbeat goes stale.
+                    logger.exception(f"Ingestion job {job.id} could not be recorded: {e}")
+                continue
+            try:
+                await requeue_stale_jobs()
+            except Exception as e:
+                logger.exception(f"Requeueing stale ingestion jobs failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), INGEST_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _run(self, job, worker_id: str) -> None:
+        path = get_blob_store().local_path(job.sha256)
+        progress = IngestProgress()
+        task = asyncio.ensure_future(self.pipeline.ingest(
+            str(path),
+            job.group_id,
+            filename=job.filename,
+            content_type=job.content_type,
+            description=job.description,
+            file_id=job.file_id,
+            progress=progress,
+            sha256=job.sha256,
+        ))
+        self.running[job.id] = worker_id
+        cancelled = False
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=INGEST_HEARTBEAT_SECONDS)
+                if not task.done() and not await heartbeat(job.id, worker_id, progress):
+                    cancelled = True
+                    task.cancel()
+            result = await task
+        except asyncio.CancelledError:
+            if not cancelled:
+                # Shutdown: the ingest transaction is rolled back, so the job can start over elsewhere.
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await asyncio.shield(release_job(job.id, worker_id))
+                raise
+            logger.info(f"Ingestion job {job.id} cancelled")
+            await finish_job(job.id, worker_id, "cancelled", progress)
+            await release_job_blob(job.sha256)
+        except Exception as e:
+            logger.exception(f"Ingestion job {job.id} failed: {e}")
+            await finish_job(job.id, worker_id, "failed", progress, error=str(e) or type(e).__name__)
+            await release_job_blob(job.sha256)
+        else:
+            logger.info(f"Ingestion job {job.id} done: {result}")
+            progress.chunks_done = result.chunks
+            await finish_job(job.id, worker_id, "succeeded", progress, file_id=result.file_id)
+        finally:
+            self.running.pop(job.id, None)
+
+
+def get_worker_pool() -> Optional[IngestionWorkerPool]:
+    """The pool started by `start_worker_pool`, if any."""
+    return _worker_pool_instance
+
+
+def start_worker_pool(workers: int = INGEST_WORKERS) -> Optional[IngestionWorkerPool]:
+    global _worker_pool_instance
+    if _worker_pool_instance is None and workers > 0:
+        _worker_pool_instance = IngestionWorkerPool(workers)
+        _worker_pool_instance.start()
+    return _worker_pool_instance
+
+
+async def stop_worker_pool() -> None:
+    global _worker_pool_instance
+    if _worker_pool_instance is not None:
+        await _worker_pool_instance.stop()
+        _worker_pool_instance = None
+
+
+async def serve(workers: int) -> None:
+    start_worker_pool(workers)
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    try:
+        await stopped.wait()
+    finally:
+        await stop_worker_pool()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(int(os.getenv("INGEST_STANDALONE_WORKERS", 2))))
@@ -1,3 +1,12 @@
 settings = {
-    'model' : 'openai/gpt-oss-120b'
+    'model' : 'openai/gpt-oss-120b',
+    # Group-scoped requests: candidates retrieved, then at most rag_top_n chunks picked by MMR
+    # (mmr_lambda 1.0 = relevance only) and packed into context_token_budget prompt tokens.
+    'rag_candidates' : 20,
+    'rag_top_n' : 8,
+    'rag_mode' : 'hybrid',
+    'mmr_lambda' : 0.7,
+    'context_token_budget' : 3000,
+    # Token estimate for budgeting; Polish text averages fewer characters per token than English.
+    'chars_per_token' : 3.5,
 }
\ No newline at end of file
@@ -0,0 +1,132 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Tuple
+import numpy as np
+import logging
+import math
+
+from .schemas import RetrievedDocument
+from .agent_settings import settings
+
+from core.tracing import span
+from database.models import Document, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str, chars_per_token: float = None) -> int:
+    """Rough token count; the hosted models' tokenizers are not available locally."""
+    return math.ceil(len(text) / (chars_per_token or settings['chars_per_token']))
+
+
+def mmr_select(embeddings: np.ndarray, relevance: np.ndarray, k: int, lambda_: float) -> List[int]:
+    """
+    Maximal marginal relevance: greedily pick the candidate maximizing
+    lambda * relevance - (1 - lambda) * (max cosine similarity to the already picked ones).
+    """
+    n = len(embeddings)
+    if n == 0 or k <= 0:
+        return []
+    normalized = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    similarity = normalized @ normalized.T
+    max_similarity = np.full(n, -np.inf)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    for _ in range(min(k, n)):
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = np.where(available, lambda_ * relevance - (1 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, similarity[:, best])
+    return selected
+
+
+def _stitch(left: str, right: str, max_overlap_words: int = 100) -> str:
+    """Join two chunks, dropping the words the second repeats from the end of the first (ingest chunk overlap)."""
+    left_words, right_words = left.split(), right.split()
+    for size in range(min(len(left_words), len(right_words), max_overlap_words), 0, -1):
+        if left_words[-size:] == right_words[:size]:
+            return " ".join(left_words + right_words[size:])
+    return f"{left}\n{right}"
+
+
+def merge_adjacent(documents: List[RetrievedDocument]) -> List[List[RetrievedDocument]]:
+    """Group chunks of the same file and page, keeping the groups in the order of their best-ranked chunk."""
+    groups: Dict[tuple, List[RetrievedDocument]] = {}
+    for document in documents:
+        groups.setdefault((document.filename_id, document.page), []).append(document)
+    return [sorted(group, key=lambda document: document.id) for group in groups.values()]
+
+
+async def fetch_embeddings(db: AsyncSession, ids: List[int]) -> Dict[int, np.ndarray]:
+    rows = await db.execute(select(Document.id, Document.embedding).where(Document.id.in_(ids)))
+    return {row.id: np.asarray(row.embedding, dtype=np.float32) for row in rows}
+
+
+class ContextReport:
+    """
+    What the context builder did with each candidate, for debugging prompt contents.
+    """
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self.tokens_used = 0
+        self.decisions: List[dict] = []
+
+    def add(self, ids: List[int], action: str, **details) -> None:
+        self.decisions.append({"ids": ids, "action": action, **details})
+
+    def to_dict(self) -> dict:
+        return {"token_budget": self.token_budget, "tokens_used": self.tokens_used, "decisions": self.decisions}
+
+
+async def build_context(
+    candidates: List[RetrievedDocument],
+    max_chunks: int = None,
+    token_budget: int = None,
+    lambda_: float = None,
+) -> Tuple[List[RetrievedDocument], ContextReport]:
+    """
+    Turn ranked retrieval candidates into prompt context: MMR picks up to `max_chunks` diverse chunks,
+    chunks from the same file and page are merged into one passage, and passages are packed in
+    rank order while they fit in `token_budget`.
+    """
+    max_chunks = max_chunks or settings['rag_top_n']
+    token_budget = token_budget or settings['context_token_budget']
+    lambda_ = settings['mmr_lambda'] if lambda_ is None else lambda_
+    report = ContextReport(token_budget)
+    if not candidates:
+        return [], report
+
+    with span("context_build", candidates=len(candidates)) as attrs:
+        async with AsyncSessionLocal() as db:
+            embeddings = await fetch_embeddings(db, [document.id for document in candidates])
+        candidates = [document for document in candidates if document.id in embeddings]
+        # Rank-based relevance: candidate scores come from different scorers (cosine, RRF, cross-encoder).
+        relevance = 1.0 - np.arange(len(candidates)) / max(len(candidates), 1)
+        picked = mmr_select(np.stack([embeddings[document.id] for document in candidates]), relevance, max_chunks, lambda_) if candidates else []
+        picked_set = set(picked)
+        for i, document in enumerate(candidates):
+            if i not in picked_set:
+                report.add([document.id], "dropped_by_mmr", rank=i + 1)
+
+        passages: List[RetrievedDocument] = []
+        for group in merge_adjacent([candidates[i] for i in sorted(picked)]):
+            text = group[0].text
+            for document in group[1:]:
+                text = _stitch(text, document.text)
+            passage = group[0].model_copy(update={"text": text, "score": max(document.score for document in group)})
+            tokens = estimate_tokens(text)
+            ids = [document.id for document in group]
+            if len(group) > 1:
+                report.add(ids, "merged", filename_id=passage.filename_id, page=passage.page)
+            if report.tokens_used + tokens > token_budget:
+                report.add(ids, "over_budget", tokens=tokens)
+                continue
+            report.tokens_used += tokens
+            passages.append(passage)
+            report.add(ids, "packed", tokens=tokens)
+
+        attrs.update(passages=len(passages), tokens=report.tokens_used)
+    logger.debug(f"Context report: {report.to_dict()}")
+    return passages, report
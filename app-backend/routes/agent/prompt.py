@@ -0,0 +1,25 @@
+from typing import List
+
+from .schemas import RetrievedDocument
+
+RAG_PROMPT_TEMPLATE = """Odpowiedz na pytanie, korzystając wyłącznie z poniższych fragmentów dokumentów.
+Jeśli fragmenty nie zawierają odpowiedzi, napisz, że nie ma jej w bazie wiedzy.
+Powołuj się na fragmenty numerami w nawiasach kwadratowych, np. [1].
+
+Fragmenty:
+{context}
+
+Pytanie: {question}"""
+
+
+def format_context(documents: List[RetrievedDocument]) -> str:
+    parts = []
+    for i, document in enumerate(documents, start=1):
+        source = f"plik {document.filename_id}" + (f", strona {document.page}" if document.page is not None else "")
+        parts.append(f"[{i}] ({source})\n{document.text}")
+    return "\n\n".join(parts)
+
+
+def build_rag_prompt(question: str, documents: List[RetrievedDocument]) -> str:
+    """User prompt with the retrieved chunks, in ranking order, ahead of the question."""
+    return RAG_PROMPT_TEMPLATE.format(context=format_context(documents), question=question)
@@ -0,0 +1,262 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy import select, text, func, cast, literal, union_all, CompoundSelect
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+import numpy as np
+import asyncio
+import re
+import os
+
+from .schemas import SearchRequest, RetrievedDocument
+
+from core.models.batching import get_batching_embedder
+from core.models.reranker import get_reranker, reranker_enabled
+from core.tracing import span
+from core.settings.token import TokenData, get_current_user
+from database.db import get_async_db, run_in_session
+from database.models import Document, Group, EMBEDDING_STORAGE, GROUP_VECTOR_INDEXES, TEXT_SEARCH_CONFIG, user_group_access
+
+rag_router = APIRouter(prefix="/rag", tags=["rag"])
+
+RRF_K = 60
+# ts_rank_cd normalization 1 divides by 1 + log(document length), a BM25-like length penalty.
+LEXICAL_RANK_NORMALIZATION = 1
+# pgvector's default hnsw.ef_search.
+DEFAULT_EF_SEARCH = 40
+# Binary mode fetches top_k * BINARY_OVERFETCH Hamming candidates for full-precision re-ranking.
+BINARY_OVERFETCH = int(os.getenv("BINARY_RERANK_OVERFETCH", 10))
+# Cross-encoder stage (RERANK=1): candidates fetched for re-ranking and the time allowed to score them.
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", 30))
+RERANK_DEADLINE_MS = float(os.getenv("RERANK_DEADLINE_MS", 300))
+
+
+async def get_accessible_group_ids(db: AsyncSession, user_id: int) -> List[int]:
+    """Ids of all groups the user is a member of."""
+    stmt = select(user_group_access.c.group_id).where(user_group_access.c.user_id == user_id)
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def get_group_content_version(db: AsyncSession, group_id: int) -> Optional[int]:
+    """Version of the group's documents, bumped by every ingest; keys the semantic response cache."""
+    return (await db.execute(select(Group.content_version).where(Group.id == group_id))).scalar_one_or_none()
+
+
+async def set_ef_search(db: AsyncSession, ef_search: int) -> None:
+    """Set hnsw.ef_search for the current transaction only."""
+    await db.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(int(ef_search))})
+
+
+def _nearest_per_group(group_ids: List[int], columns, order_by, limit: int):
+    """
+    `limit` nearest rows within the groups, ordered by `order_by`.
+    With per-group partial indexes each group gets its own `group_id = N` branch, which the planner
+    can answer from that group's index; the per-group top lists are merged by the caller.
+    """
+    if len(group_ids) == 1:
+        return select(*columns).where(Document.group_id == group_ids[0]).order_by(order_by).limit(limit)
+    if not GROUP_VECTOR_INDEXES:
+        return select(*columns).where(Document.group_id.in_(group_ids)).order_by(order_by).limit(limit)
+    return union_all(*[
+        select(*columns).where(Document.group_id == group_id).order_by(order_by).limit(limit)
+        for group_id in group_ids
+    ])
+
+
+def _indexed_embedding(storage: str):
+    """The expression the storage mode's HNSW index is built on (EMBEDDING_STORAGE_INDEXES)."""
+    if storage == "halfvec":
+        return cast(Document.embedding, HALFVEC(1024))
+    if storage == "binary":
+        return cast(func.binary_quantize(Document.embedding), BIT(1024))
+    return Document.embedding
+
+
+def vector_search_statement(
+    query_embedding: np.ndarray,
+    group_ids: List[int],
+    top_k: int,
+    storage: str = EMBEDDING_STORAGE,
+):
+    """
+    Nearest-neighbour query over the index of the given storage mode.
+    Binary mode over-fetches by Hamming distance and re-ranks the candidates
+    by cosine distance on the full-precision column.
+    """
+    columns = (Document.id, Document.text, Document.page, Document.filename_id, Document.group_id)
+    if storage == "binary":
+        query_vector = cast(literal(query_embedding, Vector(1024)), Vector(1024))
+        hamming = _indexed_embedding(storage).hamming_distance(func.binary_quantize(query_vector).cast(BIT(1024)))
+        candidates = _nearest_per_group(group_ids, (Document.id,), hamming, top_k * BINARY_OVERFETCH).subquery()
+        distance = Document.embedding.cosine_distance(query_embedding).label("distance")
+        return (
+            select(*columns, distance)
+            .join(candidates, Document.id == candidates.c.id)
+            .order_by(distance)
+            .limit(top_k)
+        )
+
+    distance = _indexed_embedding(storage).cosine_distance(query_embedding).label("distance")
+    stmt = _nearest_per_group(group_ids, (*columns, distance), distance, top_k)
+    if isinstance(stmt, CompoundSelect):
+        merged = stmt.subquery()
+        return select(merged).order_by(merged.c.distance).limit(top_k)
+    return stmt
+
+
+async def vector_search(
+    db: AsyncSession,
+    query_embedding: np.ndarray,
+    group_ids: List[int],
+    top_k: int = 5,
+    ef_search: Optional[int] = None,
+    storage: str = EMBEDDING_STORAGE,
+) -> List[RetrievedDocument]:
+    """
+    Top-k chunks by cosine distance restricted to the given groups.
+    `ef_search` trades recall for latency; HNSW never returns more than ef_search rows,
+    so it is raised to at least the number of index candidates.
+    """
+    if not group_ids:
+        return []
+
+    candidates = top_k * BINARY_OVERFETCH if storage == "binary" else top_k
+    if ef_search is not None or candidates > DEFAULT_EF_SEARCH:
+        await set_ef_search(db, max(ef_search or DEFAULT_EF_SEARCH, candidates))
+
+    stmt = vector_search_statement(query_embedding, group_ids, top_k, storage)
+    return [
+        RetrievedDocument(
+            id=row.id,
+            text=row.text,
+            page=row.page,
+            filename_id=row.filename_id,
+            group_id=row.group_id,
+            score=1.0 - row.distance,
+        )
+        for row in await db.execute(stmt)
+    ]
+
+
+def build_tsquery(query: str) -> Optional[str]:
+    """
+    OR-query of prefix-matched terms, so partial inflections and identifiers still match
+    and documents containing more of the terms rank higher.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " | ".join(f"'{term}':*" for term in dict.fromkeys(terms))
+
+
+async def lexical_search(db: AsyncSession, query: str, group_ids: List[int], top_k: int = 5) -> List[RetrievedDocument]:
+    """Top-k chunks by full-text rank over the generated documents.text_search column."""
+    tsquery_text = build_tsquery(query)
+    if not group_ids or tsquery_text is None:
+        return []
+
+    tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, tsquery_text)
+    rank = func.ts_rank_cd(Document.text_search, tsquery, LEXICAL_RANK_NORMALIZATION).label("rank")
+    stmt = (
+        select(Document.id, Document.text, Document.page, Document.filename_id, Document.group_id, rank)
+        .where(Document.group_id.in_(group_ids), Document.text_search.op("@@")(tsquery))
+        .order_by(rank.desc())
+        .limit(top_k)
+    )
+    return [
+        RetrievedDocument(
+            id=row.id,
+            text=row.text,
+            page=row.page,
+            filename_id=row.filename_id,
+            group_id=row.group_id,
+            score=row.rank,
+        )
+        for row in await db.execute(stmt)
+    ]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[RetrievedDocument]], top_k: int, k: int = RRF_K) -> List[RetrievedDocument]:
+    """Merge ranked lists by summing 1 / (k + rank); the fused score replaces the per-list score."""
+    scores: Dict[int, float] = {}
+    documents: Dict[int, RetrievedDocument] = {}
+    for results in result_lists:
+        for rank, document in enumerate(results, start=1):
+            scores[document.id] = scores.get(document.id, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(document.id, document)
+
+    fused = sorted(scores, key=scores.get, reverse=True)[:top_k]
+    return [documents[doc_id].model_copy(update={"score": scores[doc_id]}) for doc_id in fused]
+
+
+async def rerank(reranker, query: str, documents: List[RetrievedDocument], top_n: int) -> List[RetrievedDocument]:
+    """Re-order candidates by cross-encoder score; candidates not scored before the deadline keep their place below."""
+    if not documents:
+        return documents
+    with span("rerank", candidates=len(documents)) as attrs:
+        result = await reranker.rerank_async(query, [document.text for document in documents], RERANK_DEADLINE_MS)
+        attrs.update(scored=result.scored, cached=result.cached, deadline_hit=result.deadline_hit)
+    return [
+        documents[i] if result.scores[i] is None else documents[i].model_copy(update={"score": result.scores[i]})
+        for i in result.order[:top_n]
+    ]
+
+
+async def retrieve(
+    query: str,
+    group_ids: List[int],
+    top_k: int = 5,
+    ef_search: Optional[int] = None,
+    mode: str = "vector",
+    candidates: Optional[int] = None,
+    use_rerank: bool = True,
+) -> List[RetrievedDocument]:
+    """
+    Retrieve chunks for a query. `mode="hybrid"` runs the lexical query while the query
+    is being embedded, fetches both candidate lists on separate sessions and fuses them with RRF.
+    With the re-ranker enabled, RERANK_CANDIDATES chunks are retrieved and the cross-encoder picks the top_k.
+    """
+    if not group_ids:
+        return []
+
+    reranker = None
+    if use_rerank and reranker_enabled():
+        # Loaded by the startup warm-up; only requests arriving before that wait for it in a thread.
+        reranker = get_reranker(load=False)
+        if reranker is None:
+            reranker = await asyncio.get_running_loop().run_in_executor(None, get_reranker)
+    fetch_k = max(top_k, RERANK_CANDIDATES) if reranker is not None else top_k
+
+    if mode != "hybrid":
+        query_embedding = await get_batching_embedder().embed(query)
+        documents = await run_in_session(vector_search, query_embedding, group_ids, fetch_k, ef_search)
+    else:
+        candidates = max(candidates or fetch_k * 4, fetch_k)
+        lexical = asyncio.ensure_future(run_in_session(lexical_search, query, group_ids, candidates))
+        try:
+            query_embedding = await get_batching_embedder().embed(query)
+            dense = await run_in_session(vector_search, query_embedding, group_ids, candidates, ef_search)
+        except BaseException:
+            # Don't leave the lexical query running, or let its outcome replace the real error.
+            lexical.cancel()
+            await asyncio.gather(lexical, return_exceptions=True)
+            raise
+        sparse = await lexical
+        documents = reciprocal_rank_fusion([dense, sparse], fetch_k)
+
+    if reranker is not None:
+        return await rerank(reranker, query, documents, top_k)
+    return documents
+
+
+@rag_router.post("/search", response_model=List[RetrievedDocument])
+async def search(
+    data: SearchRequest,
+    current_user: TokenData = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    group_ids = await get_accessible_group_ids(db, int(current_user.user_id))
+    if data.group_ids is not None:
+        requested = set(data.group_ids)
+        group_ids = [group_id for group_id in group_ids if group_id in requested]
+    return await retrieve(data.query, group_ids, data.top_k, data.ef_search, data.mode, use_rerank=data.rerank)
@@ -1,24 +1,77 @@
-from fastapi import APIRouter, HTTPException, status, Depends 
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request, status, Depends
 
-import json
+from typing import Optional
 
 from .schemas import BaseModelRequest
+from .prompt import build_rag_prompt
+from .context import build_context
+from .rag import retrieve, get_accessible_group_ids, get_group_content_version
 
 from .agent_settings import settings
 
-from core.models.llm_wrapper import BaseLLMClient
+from core.models.batching import get_batching_embedder
+from core.models.llm_wrapper import get_async_llm_client
+from core.models.response_cache import get_response_cache
+from core.streaming import framed_response
+from core.settings.token import TokenData, get_optional_user
+from database.db import run_in_session
 
 response_router = APIRouter(prefix="/llm", tags=["llm"])
-llm = BaseLLMClient()
 
 @response_router.post('/response')
-async def get_response(data: BaseModelRequest):
+async def get_response(data: BaseModelRequest, request: Request, current_user: Optional[TokenData] = Depends(get_optional_user)):
+    model = settings['model']
+    stream_format = data.stream_format
+    if stream_format is None and "text/event-stream" in request.headers.get("accept", ""):
+        stream_format = "sse"
+    if data.group_id is not None:
+        # Answers grounded in a group's documents are only for its members, cached ones included.
+        if current_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        if data.group_id not in await run_in_session(get_accessible_group_ids, int(current_user.user_id)):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this group")
+
+    cache = get_response_cache() if data.use_cache else None
+    prompt_embedding = None
+    content_version = None
+    if cache is not None:
+        if data.group_id is not None:
+            # Answers cached before the group's documents last changed are not replayed.
+            content_version = await run_in_session(get_group_content_version, data.group_id)
+        prompt_embedding = await get_batching_embedder().embed(data.prompt)
+        cached_chunks = cache.lookup(model, data.group_id, prompt_embedding, content_version)
+        if cached_chunks is not None:
+            return framed_response(cached_chunks, stream_format)
+
+    prompt = data.prompt
+    context_report = None
+    if data.group_id is not None:
+        candidates = await retrieve(data.prompt, [data.group_id], settings['rag_candidates'], mode=settings['rag_mode'])
+        documents, context_report = await build_context(candidates)
+        prompt = build_rag_prompt(data.prompt, documents)
+
     async def event_generator():
-        for chunk in llm.stream_generate(model=settings['model'], prompt=data.prompt):
-            yield json.dumps(chunk) + "\n"
-    
-    return StreamingResponse(event_generator(), media_type="application/json")
+        if data.debug and context_report is not None:
+            yield {"type": "context", "report": context_report.to_dict()}
+        chunks = []
+        # The framing layer cancels this generator when the client goes away,
+        # which closes the upstream completion stream as well.
+        async for chunk in get_async_llm_client().stream_generate(model=model, prompt=prompt):
+            if cache is not None:
+                chunks.append(chunk)
+            yield chunk
+        # Only completed answers are cached.
+        if cache is not None:
+            cache.store(model, data.group_id, prompt_embedding, chunks, content_version)
+
+    return framed_response(event_generator(), stream_format)
 
 
-    
+@response_router.get('/cache/stats')
+async def cache_stats():
+    cache = get_response_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
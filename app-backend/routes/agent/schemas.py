@@ -1,7 +1,30 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Literal, Optional
 
 
 class BaseModelRequest(BaseModel):
     prompt: str
+    group_id: Optional[int] = None
+    use_cache: bool = True
+    # Emit the context builder's packing report as a {"type": "context"} chunk before the answer.
+    debug: bool = False
+    # NDJSON or SSE framing; defaults to SSE for `Accept: text/event-stream`, otherwise STREAM_FORMAT.
+    stream_format: Optional[Literal["ndjson", "sse"]] = None
 
+
+class SearchRequest(BaseModel):
+    query: str
+    top_k: int = Field(default=5, ge=1, le=100)
+    ef_search: Optional[int] = Field(default=None, ge=1, le=1000)
+    group_ids: Optional[List[int]] = None
+    mode: Literal["vector", "hybrid"] = "vector"
+    rerank: bool = True
+
+
+class RetrievedDocument(BaseModel):
+    id: int
+    text: str
+    page: Optional[int] = None
+    filename_id: int
+    group_id: int
+    score: float
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+import asyncio
+
+from core.startup import startup_state
+from database.models import async_engine
+
+health_router = APIRouter(tags=["health"])
+
+DB_PING_TIMEOUT_SECONDS = 2
+
+
+async def _db_ready() -> bool:
+    try:
+        async with async_engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), DB_PING_TIMEOUT_SECONDS)
+        return True
+    except Exception:
+        return False
+
+
+@health_router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving the event loop."""
+    return {"status": "ok"}
+
+
+@health_router.get("/readyz")
+async def readyz():
+    """Readiness: the embedder has been loaded and the database pool hands out connections."""
+    checks = {"embedder": startup_state.embedder_ready, "database": await _db_ready()}
+    ready = all(checks.values())
+    # Reported but not required: retrieval and ingestion work without the LLM client.
+    checks["llm_client"] = startup_state.llm_ready
+    body = {"status": "ready" if ready else "starting", "checks": checks, "startup": startup_state.summary()}
+    if startup_state.error:
+        body["error"] = startup_state.error
+    if startup_state.llm_error:
+        body["llm_error"] = startup_state.llm_error
+    return JSONResponse(body, status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
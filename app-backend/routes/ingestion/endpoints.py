@@ -0,0 +1,110 @@
+from fastapi import APIRouter, HTTPException, status, Depends, File, Form, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Set
+
+from .schemas import IngestionJobOut
+from core.settings.token import TokenData, get_current_user
+from core.storage.blob_store import get_blob_store
+from database.db import get_async_db
+from database.models import Document, Files, IngestionJob
+from pipeline.ingest import release_blob
+from pipeline.jobs import IngestionBacklogFull, backlog_full, submit_job, get_job, cancel_job, queue_position
+from routes.agent.rag import get_accessible_group_ids
+
+ingestion_router = APIRouter(prefix="/ingest", tags=["ingest"])
+
+BACKLOG_RETRY_AFTER_SECONDS = 30
+
+
+def backlog_full_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Zbyt wiele dokumentów czeka na przetworzenie, spróbuj ponownie później.",
+        headers={"Retry-After": str(BACKLOG_RETRY_AFTER_SECONDS)},
+    )
+
+
+async def job_out(job) -> IngestionJobOut:
+    out = IngestionJobOut.model_validate(dict(job._mapping))
+    if job.status == "succeeded":
+        out.progress = 1.0
+    elif job.pages_total:
+        out.progress = round(job.pages_done / job.pages_total, 4)
+    if job.status == "queued":
+        out.queue_position = await queue_position(job.id)
+    return out
+
+
+async def file_group_ids(db: AsyncSession, file_id: int) -> Set[int]:
+    """Groups holding the file's chunks and the groups it was uploaded to, which a file without chunks still has."""
+    stmt = union(
+        select(Document.group_id).where(Document.filename_id == file_id),
+        select(IngestionJob.group_id).where(IngestionJob.file_id == file_id),
+    )
+    return set((await db.execute(stmt)).scalars().all())
+
+
+async def accessible_job(job_id: int, db: AsyncSession, current_user: TokenData):
+    job = await get_job(job_id)
+    # Jobs of other groups are reported as missing rather than forbidden.
+    if job is None or job.group_id not in await get_accessible_group_ids(db, int(current_user.user_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@ingestion_router.post("/jobs", response_model=IngestionJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def submit(
+    file: UploadFile = File(...),
+    group_id: int = Form(...),
+    description: Optional[str] = Form(None),
+    file_id: Optional[int] = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user),
+):
+    """Queue a document for conversion and embedding; `file_id` replaces an already ingested file."""
+    group_ids = await get_accessible_group_ids(db, int(current_user.user_id))
+    if group_id not in group_ids:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this group")
+    if file_id is not None:
+        if await db.get(Files, file_id) is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        # Re-ingestion deletes the file's chunks in every group, so the user needs the access an upload
+        # to each of them would; a file that no group can be traced to is not replaceable at all.
+        file_groups = await file_group_ids(db, file_id)
+        if not file_groups or not file_groups <= set(group_ids):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No access to this file")
+
+    # Refuse before storing the upload; submit_job checks again, as the queue may fill up meanwhile.
+    if await backlog_full():
+        raise backlog_full_error()
+    blob = await run_in_threadpool(get_blob_store().put, file.file)
+    try:
+        job_id = await submit_job(
+            blob.sha256,
+            group_id,
+            file.filename or blob.sha256,
+            content_type=file.content_type,
+            description=description,
+            file_id=file_id,
+            user_id=int(current_user.user_id),
+        )
+    except IngestionBacklogFull:
+        if blob.created:
+            await run_in_threadpool(release_blob, blob.sha256)
+        raise backlog_full_error()
+    return await job_out(await get_job(job_id))
+
+
+@ingestion_router.get("/jobs/{job_id}", response_model=IngestionJobOut)
+async def job_status(job_id: int, db: AsyncSession = Depends(get_async_db), current_user: TokenData = Depends(get_current_user)):
+    return await job_out(await accessible_job(job_id, db, current_user))
+
+
+@ingestion_router.post("/jobs/{job_id}/cancel", response_model=IngestionJobOut)
+async def cancel(job_id: int, db: AsyncSession = Depends(get_async_db), current_user: TokenData = Depends(get_current_user)):
+    """Cancel a queued job, or ask the worker running it to stop; finished jobs are returned unchanged."""
+    await accessible_job(job_id, db, current_user)
+    await cancel_job(job_id)
+    return await job_out(await get_job(job_id))
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+
+class IngestionJobOut(BaseModel):
+    id: int
+    status: str
+    group_id: int
+    filename: str
+    file_id: Optional[int] = None
+    pages_total: Optional[int] = None
+    pages_done: int
+    chunks_done: int
+    # Share of pages converted; None until the page count is known (and for formats without pages).
+    progress: Optional[float] = None
+    # Jobs queued ahead of this one, while it waits.
+    queue_position: Optional[int] = None
+    attempts: int
+    cancel_requested: bool
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -1,39 +1,56 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordRequestForm
 from .schemas import AuthRequest, AuthResponse
-from .utils import verify_password, create_access_token
-from database.db import get_db
-from sqlalchemy.orm import Session
+from .utils import verify_password_async, create_access_token, PasswordHashingBusy
+from database.db import get_async_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import schemas, utils
 from database import models
 
 register_router = APIRouter(prefix="/auth", tags=["auth"])
 
+
+def hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Serwer jest przeciążony, spróbuj ponownie za chwilę.",
+        headers={"Retry-After": "1"},
+    )
+
 @register_router.post("/", response_model=AuthResponse)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    print(user)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(models.User).where(models.User.email == form_data.username))
+    user = result.scalars().first()
+    try:
+        valid = user is not None and await verify_password_async(form_data.password, user.hashed_password)
+    except PasswordHashingBusy:
+        raise hashing_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Nieprawidłowa nazwa użytkownika lub hasło",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(data={"sub": user.name})
+    access_token = create_access_token(data={"sub": user.name, "user_id": str(user.id)})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @register_router.post("/register", response_model=schemas.RegisterResponse)
-def register_user(payload: schemas.RegisterRequest, db: Session = Depends(get_db)):
-    existing_user = db.query(models.User).filter(models.User.email == payload.email).first()
+async def register_user(payload: schemas.RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(models.User).where(models.User.email == payload.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Użytkownik o podanym adresie e-mail już istnieje."
         )
 
-    hashed_pwd = utils.hash_password(payload.password)
+    try:
+        hashed_pwd = await utils.hash_password_async(payload.password)
+    except PasswordHashingBusy:
+        raise hashing_busy()
     new_user = models.User(
         name=payload.name,
         surname=payload.surname,
@@ -42,12 +59,12 @@ def register_user(payload: schemas.RegisterRequest, db: Session = Depends(get_db
         hashed_password=hashed_pwd
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     return schemas.RegisterResponse(
         id=new_user.id,
         email=new_user.email,
         name=new_user.name,
         surname=new_user.surname
-    )
\ No newline at end of file
+    )
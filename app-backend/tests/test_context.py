@@ -0,0 +1,27 @@
+import numpy as np
+
+from routes.agent.context import _stitch, merge_adjacent, mmr_select
+
+
+def test_mmr_skips_near_duplicates():
+    embeddings = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]])
+    relevance = np.array([0.9, 0.89, 0.5])
+    assert mmr_select(embeddings, relevance, k=2, lambda_=0.5) == [0, 2]
+    # Relevance only: plain top-k.
+    assert mmr_select(embeddings, relevance, k=2, lambda_=1.0) == [0, 1]
+
+
+def test_mmr_edge_cases():
+    assert mmr_select(np.empty((0, 2)), np.empty(0), k=3, lambda_=0.5) == []
+    assert sorted(mmr_select(np.eye(2), np.array([0.1, 0.2]), k=5, lambda_=0.5)) == [0, 1]
+
+
+def test_stitch_drops_the_chunk_overlap():
+    assert _stitch("a b c d", "c d e f") == "a b c d e f"
+    assert _stitch("a b", "c d") == "a b\nc d"
+
+
+def test_merge_adjacent_groups_by_file_and_page_in_rank_order(doc):
+    ranked = [doc(7, page=2), doc(3, page=1), doc(6, page=2), doc(4, page=1, filename_id=2)]
+    groups = merge_adjacent(ranked)
+    assert [[d.id for d in group] for group in groups] == [[6, 7], [3], [4]]
@@ -0,0 +1,57 @@
+import pytest
+
+from pipeline import document
+from pipeline.document import DocumentObject, DocumentPage, stream_name
+
+
+@pytest.fixture
+def conversions(monkeypatch):
+    """Fake docling: a 10-page document whose page N reads 'page N'; records converted ranges."""
+    calls = []
+
+    def convert_pages(source, start=None, end=None, name=None):
+        calls.append((start, end))
+        return [DocumentPage(n, f"page {n}") for n in range(start or 1, (end or 10) + 1)]
+
+    monkeypatch.setattr(document, "count_pages", lambda source: 10)
+    monkeypatch.setattr(document, "convert_pages", convert_pages)
+    return calls
+
+
+def test_iter_pages_converts_window_by_window(conversions):
+    doc = DocumentObject(b"%PDF-1.7", pages_per_window=4)
+    assert [page.page_number for page in doc.iter_pages(3, 9)] == list(range(3, 10))
+    assert conversions == [(3, 6), (7, 9)]
+    # Without keep_pages only the last window is held.
+    assert sorted(doc._pages) == [7, 8, 9]
+
+
+def test_get_page_converts_only_its_window(conversions):
+    doc = DocumentObject(b"%PDF-1.7", pages_per_window=4)
+    assert doc.get_page(6).text == "page 6"
+    assert doc.get_page(5).text == "page 5"
+    assert doc.get_page(11) is None
+    assert conversions == [(5, 8)]
+
+
+def test_pages_is_converted_once(conversions):
+    doc = DocumentObject(b"%PDF-1.7", pages_per_window=4)
+    assert len(doc.pages) == 10
+    assert [page.text for page in doc.pages][-1] == "page 10"
+    assert doc.get_page(2).text == "page 2"
+    assert list(doc.iter_pages(9))[0].page_number == 9
+    assert conversions == [(1, 4), (5, 8), (9, 10)]
+
+
+def test_stream_name_of_in_memory_documents():
+    assert stream_name(b"%PDF-1.7 ...") == "document.pdf"
+    assert stream_name(b"PK\x03\x04", "report.docx") == "report.docx"
+    with pytest.raises(ValueError):
+        stream_name(b"PK\x03\x04")
+
+
+def test_non_pdf_bytes_need_a_name(monkeypatch):
+    monkeypatch.setattr(document, "count_pages", lambda source: None)
+    with pytest.raises(ValueError):
+        DocumentObject(b"PK\x03\x04")
+    assert DocumentObject(b"PK\x03\x04", name="notes.docx").name == "notes.docx"
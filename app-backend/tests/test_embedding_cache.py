@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from core.models.embedding_cache import CachedEmbedder, DiskEmbeddingStore, LRUCache, cache_key
+
+
+class CountingEmbedder:
+    model_name = "test-model"
+
+    def __init__(self):
+        self.texts = []
+
+    def embed(self, texts):
+        self.texts.extend(texts)
+        return np.array([[len(text), 1.0, 0.0] for text in texts], dtype=np.float32)
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c"), len(cache)) == (1, 3, 2)
+
+
+def test_lru_of_size_zero_stores_nothing():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
+
+
+def test_cache_key_ignores_whitespace_and_normalization_only():
+    assert cache_key("m", "Zażółć  gęślą\njaźń") == cache_key("m", "Zażółć gęślą jaźń")
+    assert cache_key("m", "é") == cache_key("m", "é")
+    assert cache_key("m", "abc") != cache_key("other", "abc")
+    assert cache_key("m", "abc") != cache_key("m", "ABC")
+
+
+def test_disk_store_round_trip_and_reopen(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    keys = [cache_key("m", "a"), cache_key("m", "b")]
+    store.put_many(keys, np.array([[1, 2], [3, 4]], dtype=np.float32))
+    assert store.get(keys[1]).tolist() == [3.0, 4.0]
+
+    reopened = DiskEmbeddingStore(tmp_path)
+    assert len(reopened) == 2
+    assert reopened.get(keys[0]).tolist() == [1.0, 2.0]
+    assert reopened.get(cache_key("m", "missing")) is None
+
+
+def test_disk_store_sees_rows_appended_by_another_writer(tmp_path):
+    reader, writer = DiskEmbeddingStore(tmp_path), DiskEmbeddingStore(tmp_path)
+    writer.put_many([cache_key("m", "a")], np.ones((1, 3), dtype=np.float32))
+    reader.dim = 3
+    assert reader.get(cache_key("m", "a")).tolist() == [1.0] * 3
+
+
+def test_disk_store_drops_a_torn_tail(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    store.put_many([cache_key("m", "a")], np.ones((1, 2), dtype=np.float32))
+    # A writer crashed after writing half of a vector.
+    with open(store._vectors_path, "ab") as f:
+        f.write(b"\0" * 4)
+    store.put_many([cache_key("m", "b")], np.full((1, 2), 2.0, dtype=np.float32))
+    reopened = DiskEmbeddingStore(tmp_path)
+    assert len(reopened) == 2
+    assert reopened.get(cache_key("m", "b")).tolist() == [2.0, 2.0]
+
+
+def test_disk_store_rejects_another_dimension(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    store.put_many([cache_key("m", "a")], np.ones((1, 2), dtype=np.float32))
+    with pytest.raises(ValueError):
+        store.put_many([cache_key("m", "b")], np.ones((1, 3), dtype=np.float32))
+
+
+def test_cached_embedder_embeds_each_distinct_text_once(tmp_path):
+    model = CountingEmbedder()
+    embedder = CachedEmbedder(model, memory_items=10, disk_dir=str(tmp_path))
+    first = embedder.embed(["aa", "b", "aa"])
+    assert model.texts == ["aa", "b"]
+    assert first.shape == (3, 3) and first[0].tolist() == first[2].tolist()
+    assert embedder.embed(" aa ").tolist() == first[0].tolist()
+    assert model.texts == ["aa", "b"]
+
+    # A new process starts with an empty memory tier and reads the disk tier.
+    restarted = CachedEmbedder(CountingEmbedder(), memory_items=10, disk_dir=str(tmp_path))
+    assert restarted.embed(["b"]).tolist() == [[1.0, 1.0, 0.0]]
+    assert restarted.embedder.texts == []
+    assert restarted.cache_stats()["hits_disk"] == 1
+
+
+def test_switching_dtype_and_back_keeps_keys_and_vectors_aligned(tmp_path):
+    a, b = cache_key("m", "a"), cache_key("m", "b")
+    DiskEmbeddingStore(tmp_path, "float32").put_many([a], np.array([[1.0, 2.0]], dtype=np.float32))
+    half = DiskEmbeddingStore(tmp_path, "float16")
+    assert half.get(a) is None
+    half.put_many([b], np.array([[3.0, 4.0]], dtype=np.float32))
+
+    full = DiskEmbeddingStore(tmp_path, "float32")
+    assert full.get(a).tolist() == [1.0, 2.0]
+    assert full.get(b) is None
+    assert DiskEmbeddingStore(tmp_path, "float16").get(b).tolist() == [3.0, 4.0]
@@ -0,0 +1,128 @@
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from core.models.embedding_server import EmbeddingClient, EmbeddingServer
+
+
+class FakeEmbedder:
+    def __init__(self, value: float):
+        self.value = value
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if isinstance(texts, str):
+            return np.full(3, self.value, dtype=np.float32)
+        return np.full((len(texts), 3), self.value, dtype=np.float32)
+
+
+class FakeBatching:
+    def __init__(self, embedder):
+        self.embedder = embedder
+
+    async def embed(self, texts):
+        return self.embedder.embed(texts)
+
+    async def stop(self):
+        pass
+
+
+class ServerThread:
+    """An EmbeddingServer answering with 1.0 on its own event loop thread."""
+    def __init__(self, socket_path: str):
+        self.server = EmbeddingServer(socket_path, batching=FakeBatching(FakeEmbedder(1.0)))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5)
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+        self.loop.close()
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "embedder.sock")
+
+
+def test_missing_server_falls_back_and_probes_until_it_is_back(socket_path):
+    local = FakeEmbedder(0.0)
+    client = EmbeddingClient(socket_path, fallback=lambda: local, timeout=5, probe_seconds=0.05, probe_max_seconds=1)
+
+    assert client.embed(["a", "b"]).tolist() == [[0.0] * 3] * 2
+    assert client._fallback is local
+
+    with ServerThread(socket_path):
+        # Before the backoff has elapsed the server is not tried.
+        assert client.embed("a").tolist() == [0.0] * 3
+        time.sleep(0.06)
+        assert client.embed("a").tolist() == [1.0] * 3
+        assert client._fallback is None
+    assert local.calls == 2
+
+
+def test_failed_probe_doubles_the_backoff(socket_path):
+    client = EmbeddingClient(socket_path, fallback=lambda: FakeEmbedder(0.0), timeout=5, probe_seconds=0.01, probe_max_seconds=0.03)
+    client.embed("a")
+    for expected in (0.02, 0.03, 0.03):
+        time.sleep(client._probe_interval + 0.005)
+        client.embed("a")
+        assert client._probe_interval == pytest.approx(expected)
+
+
+def test_dropped_connection_is_retried_without_falling_back(socket_path):
+    client = EmbeddingClient(socket_path, fallback=lambda: pytest.fail("fell back on a transient error"), timeout=5)
+    with ServerThread(socket_path) as server:
+        assert client.embed("a").tolist() == [1.0] * 3
+        # The kept-alive connection dies, e.g. when the server restarts.
+        for writer in list(server.server._writers):
+            server.loop.call_soon_threadsafe(writer.close)
+        time.sleep(0.05)
+        assert client.embed(["a"]).tolist() == [[1.0] * 3]
+    assert client._fallback is None
+
+
+def test_transient_error_twice_is_raised(socket_path, monkeypatch):
+    client = EmbeddingClient(socket_path, fallback=lambda: pytest.fail("fell back on a transient error"), timeout=5)
+    calls = []
+
+    def reset(texts):
+        calls.append(texts)
+        raise ConnectionResetError("reset by peer")
+
+    monkeypatch.setattr(client, "_request", reset)
+    with pytest.raises(ConnectionResetError):
+        client.embed("a")
+    assert len(calls) == 2
+    assert client._fallback is None
+
+
+def test_without_fallback_unavailable_server_is_an_error(socket_path):
+    with pytest.raises(FileNotFoundError):
+        EmbeddingClient(socket_path, timeout=5).embed("a")
+
+
+def test_server_refuses_a_socket_another_server_answers_on(socket_path):
+    with ServerThread(socket_path):
+        with pytest.raises(RuntimeError, match="already listening"):
+            asyncio.run(EmbeddingServer(socket_path, batching=FakeBatching(FakeEmbedder(2.0))).start())
+        assert EmbeddingClient(socket_path).embed(["a"])[0][0] == 1.0
+
+
+def test_server_replaces_a_stale_socket(socket_path):
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    with ServerThread(socket_path):
+        assert EmbeddingClient(socket_path).embed(["a"])[0][0] == 1.0
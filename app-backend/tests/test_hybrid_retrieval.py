@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from routes.agent import rag
+from routes.agent.rag import build_tsquery, reciprocal_rank_fusion
+
+
+def test_rrf_rewards_documents_ranked_by_both_lists(doc):
+    vector = [doc(1, 0.9), doc(2, 0.8), doc(3, 0.7)]
+    lexical = [doc(3, 12.0), doc(4, 9.0), doc(1, 1.0)]
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=3, k=60)
+    assert [d.id for d in fused] == [1, 3, 2]
+    assert fused[0].score == pytest.approx(1 / 61 + 1 / 63)
+    # The per-list scores are not mixed: document 4 (second place once) ties with document 2.
+    assert fused[2].score == pytest.approx(1 / 62)
+
+
+def test_rrf_of_one_list_keeps_its_order(doc):
+    results = [doc(5), doc(2), doc(9)]
+    assert [d.id for d in reciprocal_rank_fusion([results, []], top_k=10)] == [5, 2, 9]
+
+
+def test_tsquery_prefix_matches_unique_terms():
+    assert build_tsquery("Umowa najmu, umowa!") == "'umowa':* | 'najmu':*"
+    assert build_tsquery("?!") is None
+
+
+def test_retrieve_skips_the_reranker_when_rerank_is_off(monkeypatch, doc):
+    class Embedder:
+        async def embed(self, query):
+            return [0.0]
+
+    async def in_session(search, *args):
+        return [doc(1), doc(2)]
+
+    def get_reranker(load=True):
+        raise AssertionError("the re-ranker must not be looked up with RERANK=0")
+
+    monkeypatch.setenv("RERANK", "0")
+    monkeypatch.setattr(rag, "get_batching_embedder", lambda: Embedder())
+    monkeypatch.setattr(rag, "run_in_session", in_session)
+    monkeypatch.setattr(rag, "get_reranker", get_reranker)
+    documents = asyncio.run(rag.retrieve("umowa", [1], top_k=2))
+    assert [d.id for d in documents] == [1, 2]
+
+
+def test_hybrid_retrieve_cancels_the_lexical_query_when_the_dense_side_fails(monkeypatch):
+    lexical_cancelled = []
+
+    class Embedder:
+        async def embed(self, query):
+            await asyncio.sleep(0)
+            raise RuntimeError("embedding failed")
+
+    async def in_session(search, *args):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            lexical_cancelled.append(search)
+            raise
+
+    monkeypatch.setenv("RERANK", "0")
+    monkeypatch.setattr(rag, "get_batching_embedder", lambda: Embedder())
+    monkeypatch.setattr(rag, "run_in_session", in_session)
+    with pytest.raises(RuntimeError, match="embedding failed"):
+        asyncio.run(rag.retrieve("umowa", [1], mode="hybrid"))
+    assert lexical_cancelled == [rag.lexical_search]
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from core.storage.blob_store import LocalBlobStore
+from pipeline import ingest
+from pipeline.ingest import ChunkDiff, IngestionPipeline, IngestProgress, chunk_hash, chunk_text
+
+
+def test_chunk_text_respects_size_and_overlap():
+    words = [f"w{i:03d}" for i in range(300)]
+    chunks = chunk_text(" ".join(words), chunk_size=100, overlap=20)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    # Every word is kept, in order, and consecutive chunks share their boundary words.
+    assert chunks[0].split()[0] == "w000" and chunks[-1].split()[-1] == "w299"
+    for previous, current in zip(chunks, chunks[1:]):
+        shared = current.split()[:3]
+        assert " ".join(shared) in previous
+    assert chunk_text("") == []
+
+
+def test_chunk_diff_reuses_matching_rows_and_deletes_the_rest():
+    rows = [
+        (1, 1, chunk_hash("a"), 10),
+        (2, 1, chunk_hash("b"), 10),
+        (3, 2, chunk_hash("b"), 10),
+        (4, 3, chunk_hash("c"), 10),
+        (5, 1, chunk_hash("a"), 20),
+    ]
+    diff = ChunkDiff(rows, group_id=10)
+    assert diff.claim(chunk_hash("a"), 1)
+    assert diff.claim(chunk_hash("b"), 2)
+    assert diff.claim(chunk_hash("b"), 2)
+    assert not diff.claim(chunk_hash("b"), 3)
+    assert not diff.claim(chunk_hash("new"), 1)
+
+    assert diff.reused == 3
+    # Row 2 moved from page 1 to page 2; row 3 stayed on page 2.
+    assert diff.moved == [{"doc_id": 2, "new_page": 2}]
+    # Row 5 belongs to another group and is never reused.
+    assert sorted(diff.unclaimed_ids()) == [4, 5]
+
+
+def test_unchanged_diff_needs_every_row_in_the_group():
+    rows = [(1, 1, chunk_hash("a"), 10), (2, 1, chunk_hash("b"), 10)]
+    assert ChunkDiff(rows, 10, unchanged=True).unchanged
+    assert ChunkDiff(rows, 10, unchanged=True).reused == 2
+    assert not ChunkDiff(rows + [(3, 1, chunk_hash("a"), 20)], 10, unchanged=True).unchanged
+
+
+class FakeTransaction:
+    def __init__(self, events):
+        self.events = events
+
+    def commit(self):
+        self.events.append("commit")
+
+    def rollback(self):
+        self.events.append("rollback")
+
+
+class FakeConnection:
+    def __init__(self, events):
+        self.events = events
+
+    def begin(self):
+        return FakeTransaction(self.events)
+
+    def close(self):
+        self.events.append("close")
+
+
+@pytest.fixture
+def replace(monkeypatch, tmp_path):
+    """A re-ingest of file 1 against fakes; returns (events, run) where run(previous, unchanged) ingests."""
+    events = []
+    store = LocalBlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(ingest, "get_blob_store", lambda: store)
+    monkeypatch.setattr(ingest.engine, "connect", lambda: FakeConnection(events))
+    monkeypatch.setattr(ingest, "release_blob", lambda sha256: events.append(("release", sha256)))
+    monkeypatch.setattr(ingest, "count_pages", lambda source: 4)
+
+    async def run_stages(*stages):
+        for stage in stages:
+            stage.close()
+        events.append("stages")
+
+    monkeypatch.setattr(ingest, "_run_stages", run_stages)
+    monkeypatch.setattr(IngestionPipeline, "_apply_diff", lambda self, conn, diff: 0)
+    monkeypatch.setattr(IngestionPipeline, "_bump_content_versions", lambda self, conn, group_ids: events.append(("bump", sorted(group_ids))))
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.7 new version")
+
+    def run(previous: str, unchanged: bool, sha256: str = None):
+        rows = [(1, 1, chunk_hash("a"), 1), (2, 2, chunk_hash("b"), 1)]
+        monkeypatch.setattr(
+            IngestionPipeline, "_replace_file",
+            lambda self, conn, file_id, group_id, blob, *args: (ChunkDiff(rows, group_id, unchanged=unchanged), previous),
+        )
+        progress = IngestProgress()
+        result = asyncio.run(IngestionPipeline(embedder=object()).ingest(str(path), 1, file_id=1, progress=progress, sha256=sha256))
+        return result, progress
+
+    return events, run
+
+
+def test_replaced_blob_is_released_after_the_commit(replace):
+    events, run = replace
+    run("0" * 64, unchanged=False)
+    assert events == ["stages", ("bump", [1]), "commit", "close", ("release", "0" * 64)]
+
+
+def test_unchanged_reingest_reports_complete_progress(replace):
+    events, run = replace
+    result, progress = run(hashlib.sha256(b"%PDF-1.7 new version").hexdigest(), unchanged=True)
+    assert events == ["commit", "close"]
+    assert (progress.pages_total, progress.pages_done, progress.chunks_done) == (4, 4, 2)
+    assert result.reused == 2
+
+
+def test_ingest_of_a_stored_blob_skips_put(replace, monkeypatch, tmp_path):
+    events, run = replace
+    sha256 = LocalBlobStore(tmp_path / "blobs").put(b"%PDF-1.7 new version").sha256
+
+    def put(self, source):
+        raise AssertionError("the blob is already stored")
+
+    monkeypatch.setattr(LocalBlobStore, "put", put)
+    result, _ = run(sha256, unchanged=True, sha256=sha256)
+    assert result.reused == 2
+
+
+def test_failing_stage_cancels_the_others():
+    cancelled = []
+
+    async def blocked():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("conversion failed")
+
+    with pytest.raises(RuntimeError, match="conversion failed"):
+        asyncio.run(ingest._run_stages(blocked(), failing(), blocked()))
+    assert cancelled == [True, True]
+
+
+def test_embed_stage_batches_chunks_and_forwards_the_end():
+    class Embedder:
+        def __init__(self):
+            self.batches = []
+
+        def embed(self, texts):
+            self.batches.append(list(texts))
+            return [[float(len(text))] for text in texts]
+
+    async def run():
+        pipeline = IngestionPipeline(embedder=Embedder(), embed_batch_size=2)
+        chunks_q, rows_q = asyncio.Queue(), asyncio.Queue()
+        for i, text in enumerate(["a", "bb", "ccc"]):
+            chunks_q.put_nowait((i + 1, text, chunk_hash(text)))
+        chunks_q.put_nowait(None)
+        await pipeline._embed(chunks_q, rows_q, ingest.StageStats("embed"))
+        rows = []
+        while (row := rows_q.get_nowait()) is not None:
+            rows.append(row)
+        return pipeline.embedder.batches, rows
+
+    batches, rows = asyncio.run(run())
+    assert batches == [["a", "bb"], ["ccc"]]
+    assert [(page, text, embedding) for page, text, _, embedding in rows] == [(1, "a", [1.0]), (2, "bb", [2.0]), (3, "ccc", [3.0])]
@@ -0,0 +1,130 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from core.settings.token import TokenData
+from core.storage.blob_store import LocalBlobStore
+from pipeline.jobs import IngestionBacklogFull
+from routes.ingestion import endpoints
+
+
+class FakeSession:
+    def __init__(self, file_groups=(), files=(1,)):
+        self.file_groups = list(file_groups)
+        self.files = set(files)
+
+    async def get(self, model, key):
+        return SimpleNamespace(id=key) if key in self.files else None
+
+    async def execute(self, stmt):
+        groups = self.file_groups
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: groups))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalBlobStore(tmp_path / "blobs")
+    monkeypatch.setattr(endpoints, "get_blob_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def released(monkeypatch, store):
+    released = []
+
+    def release(sha256):
+        released.append(sha256)
+        store.delete(sha256)
+        return True
+
+    monkeypatch.setattr(endpoints, "release_blob", release)
+    return released
+
+
+@pytest.fixture(autouse=True)
+def member_of_group_1(monkeypatch):
+    async def accessible(db, user_id):
+        return [1]
+    monkeypatch.setattr(endpoints, "get_accessible_group_ids", accessible)
+
+
+def submit(db=None, file_id=None, content=b"%PDF-1.7 test"):
+    upload = UploadFile(io.BytesIO(content), filename="test.pdf")
+    return asyncio.run(endpoints.submit(
+        file=upload, group_id=1, description=None, file_id=file_id,
+        db=db or FakeSession(), current_user=TokenData(user_id="7"),
+    ))
+
+
+def blobs(store):
+    return [path for path in store.root.rglob("*") if path.is_file()]
+
+
+def test_full_backlog_is_refused_before_the_upload_is_stored(monkeypatch, store):
+    async def full(max_backlog=None):
+        return True
+
+    async def unexpected(*args, **kwargs):
+        pytest.fail("job submitted with a full backlog")
+
+    monkeypatch.setattr(endpoints, "backlog_full", full)
+    monkeypatch.setattr(endpoints, "submit_job", unexpected)
+    with pytest.raises(HTTPException) as error:
+        submit()
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == str(endpoints.BACKLOG_RETRY_AFTER_SECONDS)
+    assert blobs(store) == []
+
+
+def test_backlog_filled_meanwhile_releases_the_new_blob(monkeypatch, store, released):
+    async def not_full(max_backlog=None):
+        return False
+
+    async def refuse(*args, **kwargs):
+        raise IngestionBacklogFull("50 ingestion jobs are already queued")
+
+    monkeypatch.setattr(endpoints, "backlog_full", not_full)
+    monkeypatch.setattr(endpoints, "submit_job", refuse)
+    with pytest.raises(HTTPException) as error:
+        submit()
+    assert error.value.status_code == 429
+    assert len(released) == 1
+    assert blobs(store) == []
+
+
+def test_refused_upload_keeps_a_blob_it_did_not_create(monkeypatch, store, released):
+    existing = store.put(b"%PDF-1.7 test")
+
+    async def not_full(max_backlog=None):
+        return False
+
+    async def refuse(*args, **kwargs):
+        raise IngestionBacklogFull("full")
+
+    monkeypatch.setattr(endpoints, "backlog_full", not_full)
+    monkeypatch.setattr(endpoints, "submit_job", refuse)
+    with pytest.raises(HTTPException):
+        submit()
+    assert released == []
+    assert store.exists(existing.sha256)
+
+
+@pytest.mark.parametrize("file_groups", [[], [1, 2]])
+def test_reingest_needs_access_to_every_group_of_the_file(monkeypatch, store, file_groups):
+    async def unexpected(*args, **kwargs):
+        pytest.fail("re-ingest of a file outside the user's groups was accepted")
+
+    monkeypatch.setattr(endpoints, "backlog_full", unexpected)
+    with pytest.raises(HTTPException) as error:
+        submit(FakeSession(file_groups=file_groups), file_id=1)
+    assert error.value.status_code == 403
+    assert blobs(store) == []
+
+
+def test_reingest_of_unknown_file_is_not_found(store):
+    with pytest.raises(HTTPException) as error:
+        submit(FakeSession(files=()), file_id=5)
+    assert error.value.status_code == 404
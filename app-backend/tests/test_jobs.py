@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from pipeline import jobs
+from pipeline.ingest import IngestResult
+
+
+class FakePipeline:
+    def __init__(self, duration=0.0, error=None):
+        self.duration = duration
+        self.error = error
+
+    async def ingest(self, path, group_id, progress=None, **kwargs):
+        progress.pages_total, progress.pages_done = 2, 2
+        await asyncio.sleep(self.duration)
+        if self.error is not None:
+            raise self.error
+        return IngestResult(41, 2, 5, {})
+
+
+@pytest.fixture
+def recorded(monkeypatch, tmp_path):
+    finished, heartbeats, released = [], [], []
+    monkeypatch.setattr(jobs, "release_blob", released.append)
+    monkeypatch.setattr(jobs, "get_blob_store", lambda: SimpleNamespace(local_path=lambda sha256: tmp_path / sha256))
+
+    async def finish_job(job_id, worker_id, status, progress=None, error=None, file_id=None):
+        finished.append((job_id, status, error, file_id, progress.chunks_done if progress else None))
+
+    async def heartbeat(job_id, worker_id, progress):
+        heartbeats.append(job_id)
+        return not cancel_requested
+
+    cancel_requested = False
+    monkeypatch.setattr(jobs, "finish_job", finish_job)
+    monkeypatch.setattr(jobs, "heartbeat", heartbeat)
+    monkeypatch.setattr(jobs, "INGEST_HEARTBEAT_SECONDS", 0.01)
+
+    def cancel():
+        nonlocal cancel_requested
+        cancel_requested = True
+
+    return SimpleNamespace(finished=finished, heartbeats=heartbeats, released=released, cancel=cancel)
+
+
+def job(job_id=1):
+    return SimpleNamespace(id=job_id, sha256="ab" * 32, group_id=3, filename="doc.pdf", content_type=None, description=None, file_id=None)
+
+
+def run(pool, job):
+    async def go():
+        await pool._run(job, "worker")
+    asyncio.run(go())
+
+
+def test_succeeded_job_records_the_file(recorded):
+    pool = jobs.IngestionWorkerPool(workers=1, pipeline=FakePipeline())
+    run(pool, job())
+    assert recorded.finished == [(1, "succeeded", None, 41, 5)]
+    assert recorded.released == []
+    assert pool.running == {}
+
+
+def test_failed_job_records_the_error(recorded):
+    pool = jobs.IngestionWorkerPool(workers=1, pipeline=FakePipeline(error=ValueError("broken PDF")))
+    run(pool, job())
+    assert recorded.finished == [(1, "failed", "broken PDF", None, 0)]
+    # No file points at the upload of a failed job.
+    assert recorded.released == ["ab" * 32]
+
+
+def test_cancel_requested_is_noticed_at_the_heartbeat(recorded):
+    recorded.cancel()
+    pool = jobs.IngestionWorkerPool(workers=1, pipeline=FakePipeline(duration=5))
+    run(pool, job())
+    assert recorded.heartbeats == [1]
+    assert recorded.finished == [(1, "cancelled", None, None, 0)]
+    assert recorded.released == ["ab" * 32]
+
+
+def test_shutdown_puts_the_job_back(recorded, monkeypatch):
+    released = []
+
+    async def release_job(job_id, worker_id):
+        released.append(job_id)
+
+    monkeypatch.setattr(jobs, "release_job", release_job)
+    pool = jobs.IngestionWorkerPool(workers=1, pipeline=FakePipeline(duration=5))
+
+    async def go():
+        task = asyncio.ensure_future(pool._run(job(), "worker"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(go())
+    assert released == [1]
+    assert recorded.finished == []
+    # The job is queued again and still needs its upload.
+    assert recorded.released == []
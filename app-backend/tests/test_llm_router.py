@@ -0,0 +1,182 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from core.models import llm_router
+from core.models.llm_router import CircuitBreaker, LLMRouter, NoEndpointAvailable, is_retryable
+
+
+def event(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, reasoning=None))])
+
+
+def connection_error():
+    return openai.APIConnectionError(request=httpx.Request("POST", "http://llm.test/v1/chat/completions"))
+
+
+class Rejected(Exception):
+    status_code = 400
+
+
+class FakeStream:
+    def __init__(self, texts, first_delay):
+        self.texts = texts
+        self.first_delay = first_delay
+        self.closed = False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        await asyncio.sleep(self.first_delay)
+        for text in self.texts:
+            yield event(text)
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """chat.completions of one endpoint: raises `error`, or streams `texts` after `first_delay`."""
+    def __init__(self, texts=("a", "b"), first_delay=0.0, error=None):
+        self.texts = texts
+        self.first_delay = first_delay
+        self.error = error
+        self.streams = []
+
+    async def create(self, model, messages, stream):
+        if self.error is not None:
+            raise self.error()
+        self.streams.append(FakeStream(self.texts, self.first_delay))
+        return self.streams[-1]
+
+
+def make_router(behaviours, **options):
+    """Router over endpoints named by `behaviours`; the first one is picked first, the others after it failed."""
+    options = {"retry_base_ms": 1, "retry_max_ms": 5, "seed": 0, **options}
+    weights = [1.0] + [1e-9] * (len(behaviours) - 1)
+    router = LLMRouter(
+        [{"name": name, "url": "http://llm.test/v1", "api_key": "test", "weight": weight} for name, weight in zip(behaviours, weights)],
+        **options,
+    )
+    for endpoint in router.endpoints:
+        endpoint.client = SimpleNamespace(chat=SimpleNamespace(completions=behaviours[endpoint.name]))
+    return router
+
+
+async def collect(router, prompt="pytanie"):
+    try:
+        return [chunk["text"] async for chunk in router.stream_generate("model", prompt)]
+    finally:
+        await router.aclose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test-open", failures=3, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.available()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.available()
+
+
+def test_breaker_lets_one_probe_through_after_the_cooldown(clock):
+    breaker = CircuitBreaker("test-probe", failures=1, cooldown=30)
+    breaker.record_failure()
+    clock[0] += 29
+    assert not breaker.available()
+    clock[0] += 1
+    assert breaker.available() and breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.acquire()
+    assert not breaker.available()
+    # A probe cancelled without a verdict frees the slot again.
+    breaker.release()
+    assert breaker.available()
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.available()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker("test-reopen", failures=5, cooldown=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    assert breaker.available()
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.available()
+
+
+def test_retryable_errors():
+    assert is_retryable(connection_error())
+    assert is_retryable(asyncio.TimeoutError())
+    assert is_retryable(SimpleNamespace(status_code=503))
+    assert is_retryable(SimpleNamespace(status_code=429))
+    assert not is_retryable(Rejected())
+    assert not is_retryable(ValueError())
+
+
+def test_failure_before_the_first_chunk_is_retried_on_another_endpoint():
+    primary, secondary = FakeCompletions(error=connection_error), FakeCompletions(texts=("ok",))
+    router = make_router({"primary": primary, "secondary": secondary}, max_attempts=3)
+    assert asyncio.run(collect(router)) == ["ok"]
+    assert router.endpoints[0].breaker.failures == 1
+    assert secondary.streams[0].closed
+
+
+def test_non_retryable_error_is_raised_at_once():
+    secondary = FakeCompletions()
+    router = make_router({"primary": FakeCompletions(error=Rejected), "secondary": secondary}, max_attempts=3)
+    with pytest.raises(Rejected):
+        asyncio.run(collect(router))
+    assert secondary.streams == []
+    # A rejected request says nothing about the endpoint's health.
+    assert router.endpoints[0].breaker.failures == 0
+
+
+def test_attempts_are_limited():
+    router = make_router({"a": FakeCompletions(error=connection_error), "b": FakeCompletions(error=connection_error)}, max_attempts=2)
+    with pytest.raises(openai.APIConnectionError):
+        asyncio.run(collect(router))
+    assert [endpoint.breaker.failures for endpoint in router.endpoints] == [1, 1]
+
+
+def test_slow_first_chunk_is_hedged_and_the_loser_closed():
+    slow, fast = FakeCompletions(texts=("slow",), first_delay=1.0), FakeCompletions(texts=("fast",), first_delay=0.01)
+    router = make_router({"slow": slow, "fast": fast}, hedge_after_ms=50, max_attempts=2)
+    started = time.perf_counter()
+    assert asyncio.run(collect(router)) == ["fast"]
+    assert time.perf_counter() - started < 0.5
+    assert slow.streams[0].closed
+    assert not router.endpoints[0].breaker.probing
+
+
+def test_no_hedge_when_the_first_chunk_is_on_time():
+    primary, secondary = FakeCompletions(texts=("x", "y"), first_delay=0.01), FakeCompletions()
+    router = make_router({"primary": primary, "secondary": secondary}, hedge_after_ms=200, max_attempts=2)
+    assert asyncio.run(collect(router)) == ["x", "y"]
+    assert secondary.streams == []
+
+
+def test_all_breakers_open(clock):
+    router = make_router({"a": FakeCompletions(), "b": FakeCompletions()})
+    for endpoint in router.endpoints:
+        endpoint.breaker.opened_at = clock[0]
+        endpoint.breaker._set_state(CircuitBreaker.OPEN)
+    with pytest.raises(NoEndpointAvailable):
+        asyncio.run(collect(router))
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from core.models import reranker
+
+
+def test_concurrent_first_calls_load_the_model_once(monkeypatch):
+    loads = []
+
+    class SlowReranker:
+        def __init__(self):
+            loads.append(self)
+            time.sleep(0.05)
+
+    monkeypatch.setenv("RERANK", "1")
+    monkeypatch.setattr(reranker, "_reranker_instance", None)
+    monkeypatch.setattr(reranker, "CrossEncoderReranker", SlowReranker)
+    assert reranker.get_reranker(load=False) is None
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(reranker.get_reranker())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert all(result is loads[0] for result in results)
+    assert reranker.get_reranker(load=False) is loads[0]
+
+
+def test_disabled_reranker_is_never_loaded(monkeypatch):
+    monkeypatch.setenv("RERANK", "0")
+    monkeypatch.setattr(reranker, "_reranker_instance", None)
+    assert reranker.get_reranker() is None
@@ -0,0 +1,62 @@
+import numpy as np
+
+from core.models.response_cache import SemanticResponseCache
+
+A = np.array([1.0, 0.0, 0.0])
+A_NEAR = np.array([0.99, 0.05, 0.0])
+B = np.array([0.0, 1.0, 0.0])
+ANSWER = [{"type": "content", "text": "odpowiedź"}]
+
+
+def test_similar_prompt_hits_within_the_same_scope():
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("m", 1, A, ANSWER)
+    assert cache.lookup("m", 1, A_NEAR) == ANSWER
+    assert cache.lookup("m", 1, B) is None
+    assert cache.lookup("m", 2, A) is None
+    assert cache.lookup("other", 1, A) is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("core.models.response_cache.time.monotonic", lambda: now[0])
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=10, max_entries=10)
+    cache.store("m", 1, A, ANSWER)
+    now[0] += 11
+    assert cache.lookup("m", 1, A) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("core.models.response_cache.time.monotonic", lambda: now[0])
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60, max_entries=2)
+    cache.store("m", 1, A, ANSWER)
+    now[0] += 1
+    cache.store("m", 1, B, ANSWER)
+    now[0] += 1
+    cache.lookup("m", 1, A)
+    now[0] += 1
+    cache.store("m", 1, np.array([0.0, 0.0, 1.0]), ANSWER)
+    assert cache.lookup("m", 1, A) == ANSWER
+    assert cache.lookup("m", 1, B) is None
+
+
+def test_newer_content_version_drops_the_groups_answers():
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("m", 1, A, ANSWER, version=3)
+    cache.store("m", 2, A, ANSWER, version=7)
+    assert cache.lookup("m", 1, A, version=3) == ANSWER
+    # Documents of group 1 were re-ingested.
+    assert cache.lookup("m", 1, A, version=4) is None
+    assert cache.lookup("m", 1, A, version=3) is None
+    assert cache.lookup("m", 2, A, version=7) == ANSWER
+
+
+def test_answer_generated_before_a_change_is_not_stored():
+    cache = SemanticResponseCache(threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("m", 1, B, ANSWER, version=5)
+    cache.store("m", 1, A, ANSWER, version=4)
+    assert cache.lookup("m", 1, A, version=5) is None
+    assert cache.lookup("m", 1, B, version=5) == ANSWER
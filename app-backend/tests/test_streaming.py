@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from core.streaming import Framer, coalesce, framed_stream
+
+
+def content(text):
+    return {"type": "content", "text": text}
+
+
+def lines(body: bytes):
+    return [json.loads(line) for line in body.decode("utf-8").splitlines() if line]
+
+
+async def produce(chunks, delay=0.0, error=None, log=None):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        if log is not None:
+            log.append(chunk["text"])
+        yield chunk
+    if error is not None:
+        raise error
+
+
+async def drain(stream, read_delay=0.0):
+    writes = []
+    async for body in stream:
+        writes.append(body)
+        if read_delay:
+            await asyncio.sleep(read_delay)
+    return writes
+
+
+def test_framer_formats():
+    chunk = {"type": "content", "text": "zażółć"}
+    assert Framer("ndjson").frame(chunk) == '{"type":"content","text":"zażółć"}\n'.encode("utf-8")
+    assert Framer("ndjson").end() == b""
+    sse = Framer("sse")
+    assert sse.frame(chunk).startswith(b"data: {") and sse.frame(chunk).endswith(b"}\n\n")
+    assert sse.end() == b"data: [DONE]\n\n"
+    assert sse.media_type == "text/event-stream"
+    with pytest.raises(ValueError):
+        Framer("xml")
+
+
+def test_coalesce_merges_runs_of_the_same_delta_type():
+    chunks = [content("a"), content("b"), {"type": "think", "text": "t"}, {"type": "think", "text": "u"},
+              {"type": "context", "report": {}}, content("c"), content("d")]
+    assert coalesce(chunks) == [content("ab"), {"type": "think", "text": "tu"}, {"type": "context", "report": {}}, content("cd")]
+
+
+def test_coalesce_respects_max_chars():
+    assert coalesce([content("aaa"), content("bb"), content("c")], max_chars=4) == [content("aaa"), content("bbc")]
+
+
+def test_replayed_chunks_are_one_write():
+    writes = asyncio.run(drain(framed_stream([content("a"), content("b")], Framer("sse"))))
+    assert writes == [b'data: {"type":"content","text":"ab"}\n\ndata: [DONE]\n\n']
+
+
+def test_first_chunk_is_written_at_once_and_the_rest_coalesced():
+    async def run():
+        started = time.perf_counter()
+        stream = framed_stream(produce([content(str(i)) for i in range(20)], delay=0.002), coalesce_ms=1000)
+        first = await stream.__anext__()
+        first_after = time.perf_counter() - started
+        rest = [body async for body in stream]
+        return first, first_after, rest
+
+    first, first_after, rest = asyncio.run(run())
+    assert lines(first) == [content("0")]
+    assert first_after < 0.5
+    assert len(rest) == 1
+    assert lines(rest[0]) == [content("".join(str(i) for i in range(1, 20)))]
+
+
+def test_flush_at_max_chars():
+    writes = asyncio.run(drain(framed_stream(produce([content("x" * 10)] * 10), coalesce_ms=1000, max_chars=30)))
+    texts = [chunk["text"] for body in writes for chunk in lines(body)]
+    assert "".join(texts) == "x" * 100
+    assert all(len(text) <= 30 for text in texts)
+
+
+def test_source_error_is_raised_after_earlier_chunks():
+    async def run():
+        writes = []
+        with pytest.raises(RuntimeError, match="upstream"):
+            async for body in framed_stream(produce([content("a"), content("b")], error=RuntimeError("upstream")), coalesce_ms=0):
+                writes.append(body)
+        return writes
+
+    writes = asyncio.run(run())
+    assert "".join(chunk["text"] for body in writes for chunk in lines(body)) == "ab"
+
+
+def test_slow_client_holds_back_the_source():
+    produced = []
+
+    async def run():
+        stream = framed_stream(produce([content(str(i)) for i in range(1000)], log=produced), coalesce_ms=0, max_chars=1, queue_size=4)
+        await stream.__anext__()
+        await asyncio.sleep(0.05)
+        # Nothing more was read: the producer is blocked on the full queue, not buffering upstream.
+        pending = len(produced)
+        await stream.aclose()
+        return pending
+
+    pending = asyncio.run(run())
+    assert pending <= 1 + 4 + 2
+
+
+def test_closing_the_response_closes_the_source():
+    closed = []
+
+    async def source():
+        try:
+            while True:
+                await asyncio.sleep(0.001)
+                yield content("x")
+        finally:
+            closed.append(True)
+
+    async def run():
+        stream = framed_stream(source(), coalesce_ms=0)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert closed == [True]
@@ -0,0 +1,77 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from core.settings import token
+from core.settings.token import create_access_token, get_current_user
+from routes.user_auth import utils
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(token, "_token_cache", token.OrderedDict())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(token.time, "monotonic", lambda: now[0])
+    return now
+
+
+def current_user(jwt):
+    return asyncio.run(get_current_user(jwt))
+
+
+def test_validated_token_is_served_from_the_cache(monkeypatch):
+    jwt = create_access_token({"user_id": "7"})
+    assert current_user(jwt).user_id == "7"
+
+    def unexpected(*args, **kwargs):
+        pytest.fail("cached token decoded again")
+
+    monkeypatch.setattr(token.jwt, "decode", unexpected)
+    assert current_user(jwt).user_id == "7"
+
+
+def test_cached_token_expires_after_the_ttl(monkeypatch, clock):
+    monkeypatch.setattr(token, "TOKEN_CACHE_TTL_SECONDS", 60)
+    jwt = create_access_token({"user_id": "7"})
+    current_user(jwt)
+    clock[0] += 59
+    assert token._cached_token(jwt) is not None
+    clock[0] += 1
+    assert token._cached_token(jwt) is None
+    assert jwt not in token._token_cache
+
+
+def test_cache_entry_never_outlives_the_token(monkeypatch, clock):
+    monkeypatch.setattr(token, "TOKEN_CACHE_TTL_SECONDS", 3600)
+    jwt = create_access_token({"user_id": "7"}, expires_delta=timedelta(seconds=30))
+    current_user(jwt)
+    deadline = token._token_cache[jwt][1]
+    assert clock[0] + 25 < deadline <= clock[0] + 30
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(token, "TOKEN_CACHE_SIZE", 2)
+    tokens = [create_access_token({"user_id": str(i)}) for i in range(3)]
+    for jwt in tokens:
+        current_user(jwt)
+    assert list(token._token_cache) == tokens[1:]
+
+
+def test_invalid_tokens_are_rejected_and_not_cached():
+    for jwt in ("not-a-jwt", create_access_token({"sub": "no user id"})):
+        with pytest.raises(HTTPException) as error:
+            current_user(jwt)
+        assert error.value.status_code == 401
+    assert len(token._token_cache) == 0
+
+
+def test_hashing_queue_limit_is_enforced(monkeypatch):
+    monkeypatch.setattr(utils, "_hash_pending", utils.PASSWORD_HASH_WORKERS + utils.PASSWORD_HASH_QUEUE_LIMIT)
+    with pytest.raises(utils.PasswordHashingBusy):
+        asyncio.run(utils.hash_password_async("hasło"))
@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+from sqlalchemy.dialects import postgresql
+
+from routes.agent.rag import BINARY_OVERFETCH, DEFAULT_EF_SEARCH, vector_search, vector_search_statement
+
+
+def compiled(stmt) -> str:
+    return " ".join(str(stmt.compile(dialect=postgresql.dialect())).split())
+
+
+def limits(stmt):
+    params = stmt.compile(dialect=postgresql.dialect()).construct_params()
+    return sorted(value for key, value in params.items() if key.startswith("param_") and isinstance(value, int))
+
+
+class FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.ef_search = None
+
+    async def execute(self, stmt, params=None):
+        if params is not None:
+            self.ef_search = int(params["ef"])
+            return None
+        return self.rows
+
+
+def test_binary_mode_overfetches_by_hamming_and_reranks_by_cosine():
+    stmt = vector_search_statement(np.zeros(1024, dtype=np.float32), [1], 5, "binary")
+    sql = compiled(stmt)
+    inner, outer = sql.split(") AS anon_1")
+    # Candidates come from the binary index expression, the final order from the float32 column.
+    assert "ORDER BY CAST(binary_quantize(documents.embedding) AS BIT(1024)) <~>" in inner
+    assert "documents.embedding <=>" in sql.split(" FROM ")[0]
+    assert outer.strip().startswith("ON documents.id = anon_1.id ORDER BY distance LIMIT")
+    assert limits(stmt) == [5, 5 * BINARY_OVERFETCH]
+
+
+def test_halfvec_mode_orders_by_the_indexed_cast():
+    sql = compiled(vector_search_statement(np.zeros(1024, dtype=np.float32), [1], 5, "halfvec"))
+    assert "CAST(documents.embedding AS HALFVEC(1024)) <=>" in sql
+    assert "JOIN" not in sql
+
+
+def test_binary_vector_search_raises_ef_search_to_the_candidate_count():
+    rows = [SimpleNamespace(id=i, text=f"chunk {i}", page=1, filename_id=1, group_id=1, distance=0.1 * i) for i in (1, 2)]
+    db = FakeSession(rows)
+    documents = asyncio.run(vector_search(db, np.zeros(1024, dtype=np.float32), [1], top_k=5, storage="binary"))
+    assert db.ef_search == max(DEFAULT_EF_SEARCH, 5 * BINARY_OVERFETCH)
+    assert [d.id for d in documents] == [1, 2]
+    assert documents[1].score == 1.0 - 0.2